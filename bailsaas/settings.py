@@ -51,6 +51,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.QueryStatsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -63,6 +64,12 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'bailsaas.urls'
 
+AUTHENTICATION_BACKENDS = [
+    "core.auth_backends.TenantModelBackend",
+    # keeps sessions created before the switch valid (sessions record their backend)
+    "django.contrib.auth.backends.ModelBackend",
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -88,7 +95,42 @@ DATABASES = {
     }
 }
 
+# No Redis: per-process memory by default. Set CACHE_DIR to share the cache
+# between gunicorn workers on one dyno through the file backend.
+if os.environ.get("CACHE_DIR"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ["CACHE_DIR"],
+            "OPTIONS": {"MAX_ENTRIES": 5000},
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "bailsaas",
+            "OPTIONS": {"MAX_ENTRIES": 5000},
+        }
+    }
 
+# Per-view SQL query budgets (core.querystats), keyed by URL name. Views not
+# listed use QUERY_BUDGET_DEFAULT. Over-budget requests are logged, or raise
+# when QUERY_BUDGET_STRICT is on (set it in CI so the tests fail).
+QUERY_BUDGET_DEFAULT = int(os.environ.get("QUERY_BUDGET_DEFAULT", "30"))
+QUERY_BUDGETS = {
+    "people_tab_list": 5,
+    "dashboard_partial": 6,
+    "people_tab_main": 15,
+    "calendar_partial": 4,
+    "person_calendar_partial": 5,
+    "invoices_section_partial": 8,
+    "calendar_ics": 4,
+    "person_calendar_ics": 5,
+}
+QUERY_BUDGET_STRICT = os.environ.get("QUERY_BUDGET_STRICT", "False").lower() == "true"
+# append every request's stats here as JSON lines for `manage.py query_report`
+QUERY_STATS_LOG = os.environ.get("QUERY_STATS_LOG", "")
 
 AUTH_PASSWORD_VALIDATORS = []
 
@@ -104,11 +146,19 @@ STATIC_ROOT = BASE_DIR / "staticfiles"           # where collectstatic will copy
 
 # Use hashed, compressed files
 STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
     "staticfiles": {
         "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
-    }
+    },
 }
 
+# Staged import CSVs (core.importer) live under MEDIA_ROOT/imports. When
+# `manage.py run_import_jobs` runs as its own service, point MEDIA_ROOT at a
+# disk both services mount.
+MEDIA_ROOT = Path(os.environ.get("MEDIA_ROOT", BASE_DIR / "media"))
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = '/accounts/login/'
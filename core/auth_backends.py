@@ -0,0 +1,20 @@
+# core/auth_backends.py
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+UserModel = get_user_model()
+
+
+class TenantModelBackend(ModelBackend):
+    """
+    ModelBackend that loads the session user together with its tenant
+    (Tenant.user, related_name="tenant_profile"). TenantAttachMiddleware then
+    reads request.user.tenant_profile without another query.
+    """
+
+    def get_user(self, user_id):
+        try:
+            user = UserModel._default_manager.select_related("tenant_profile").get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,162 @@
+# core/billing.py
+from decimal import Decimal
+from django.db.models import Sum, Max, F, Value, DecimalField, OuterRef, Subquery, ExpressionWrapper
+from django.db.models.functions import Coalesce
+
+from .models import Person, PersonBalance, Invoice, Receipt
+
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+ZERO = Value(Decimal("0"), output_field=MONEY)
+
+
+def _paid_subquery(invoice_ref: str):
+    return (Receipt.objects
+            .filter(invoice=OuterRef(invoice_ref))
+            .values("invoice")
+            .annotate(s=Sum("amount"))
+            .values("s")[:1])
+
+
+def with_ledger(invoices):
+    """
+    Annotate an Invoice queryset with `paid` and `balance`.
+    Paid comes from a correlated SUM so it never double counts when the
+    queryset is joined/filtered further (e.g. by person or due date).
+    """
+    return (invoices
+            .annotate(paid=Coalesce(Subquery(_paid_subquery("pk"), output_field=MONEY), ZERO))
+            .annotate(balance=ExpressionWrapper(Coalesce(F("amount"), ZERO) - F("paid"), output_field=MONEY)))
+
+
+def with_person_balance(people):
+    """Annotate a Person queryset with `invoiced`, `paid` and `balance`."""
+    inv_sum_q = (Invoice.objects
+                 .filter(person=OuterRef("pk"))
+                 .values("person")
+                 .annotate(total=Sum("amount"))
+                 .values("total")[:1])
+    rec_sum_q = (Receipt.objects
+                 .filter(invoice__person=OuterRef("pk"))
+                 .values("invoice__person")
+                 .annotate(total=Sum("amount"))
+                 .values("total")[:1])
+    return (people
+            .annotate(invoiced=Coalesce(Subquery(inv_sum_q, output_field=MONEY), ZERO))
+            .annotate(paid=Coalesce(Subquery(rec_sum_q, output_field=MONEY), ZERO))
+            .annotate(balance=ExpressionWrapper(F("invoiced") - F("paid"), output_field=MONEY)))
+
+
+def person_ledger(person):
+    """
+    Invoice rows + totals for one person, from a single annotated query.
+    rows:   [{"inv": Invoice, "paid": Decimal, "balance": Decimal}, ...]
+    totals: {"amount", "paid", "balance"}
+    """
+    rows = []
+    total_amt = Decimal("0")
+    total_paid = Decimal("0")
+    for inv in with_ledger(person.invoices.all()):
+        amt = inv.amount or Decimal("0")
+        rows.append({"inv": inv, "paid": inv.paid, "balance": inv.balance})
+        total_amt += amt
+        total_paid += inv.paid
+    totals = {"amount": total_amt, "paid": total_paid, "balance": total_amt - total_paid}
+    return rows, totals
+
+
+def invoice_totals(invoice):
+    """Amount/paid/balance for a single invoice."""
+    amt = invoice.amount or Decimal("0")
+    paid = invoice.receipts.aggregate(s=Sum("amount"))["s"] or Decimal("0")
+    return {"amount": amt, "paid": paid, "balance": amt - paid}
+
+
+def with_balance_snapshot(people):
+    """with_person_balance() plus last_payment_date and oldest unpaid due date."""
+    last_q = (Receipt.objects
+              .filter(invoice__person=OuterRef("pk"), date__isnull=False)
+              .order_by("-date")
+              .values("date")[:1])
+    oldest_q = (with_ledger(Invoice.objects.filter(person=OuterRef("pk"), due_date__isnull=False))
+                .filter(balance__gt=0)
+                .order_by("due_date")
+                .values("due_date")[:1])
+    return (with_person_balance(people)
+            .annotate(last_payment_date=Subquery(last_q))
+            .annotate(oldest_due_date=Subquery(oldest_q)))
+
+
+BALANCE_FIELDS = ("invoiced", "paid", "balance", "last_payment_date", "oldest_due_date")
+
+
+def refresh_person_balance(person_id, create=True):
+    """
+    Recompute the PersonBalance row for one person from Invoice/Receipt rows.
+    Called from the Invoice/Receipt signals, so it runs inside the writer's
+    transaction. Delete signals pass create=False: during a Person cascade the
+    row may already be gone and must not be re-inserted.
+    """
+    snap = (with_balance_snapshot(Person.objects.filter(pk=person_id))
+            .values("tenant_id", *BALANCE_FIELDS)
+            .first())
+    if snap is None:
+        return None
+    tenant_id = snap.pop("tenant_id")
+    if not create:
+        PersonBalance.objects.filter(person_id=person_id).update(**snap)
+        return None
+    row, _ = PersonBalance.objects.update_or_create(
+        person_id=person_id, defaults={"tenant_id": tenant_id, **snap},
+    )
+    return row
+
+
+def get_person_balance(person):
+    """
+    PersonBalance for `person`. Someone with no billing history has no row
+    yet and gets an unsaved zero balance; reads never write (a row that
+    should exist is repaired by rebuild_person_balances).
+    """
+    try:
+        return person.ledger
+    except PersonBalance.DoesNotExist:
+        return PersonBalance(person=person, tenant_id=person.tenant_id)
+
+
+def rebuild_person_balances(tenant=None, fix=True, batch_size=500):
+    """
+    Compare every PersonBalance row with a fresh snapshot and (optionally) repair it.
+    Returns {"checked", "missing", "drifted"}.
+    """
+    people = Person.objects.all()
+    if tenant is not None:
+        people = people.filter(tenant=tenant)
+    existing = {
+        pb.person_id: pb
+        for pb in PersonBalance.objects.filter(person__in=people.values("pk"))
+    }
+
+    stats = {"checked": 0, "missing": 0, "drifted": 0}
+    to_create, to_update = [], []
+    for snap in with_balance_snapshot(people).values("pk", "tenant_id", *BALANCE_FIELDS).iterator(chunk_size=batch_size):
+        stats["checked"] += 1
+        row = existing.get(snap["pk"])
+        if row is None:
+            if not snap["invoiced"] and not snap["paid"]:
+                continue  # no billing history yet; a row appears with the first invoice
+            stats["missing"] += 1
+            to_create.append(PersonBalance(
+                person_id=snap["pk"], tenant_id=snap["tenant_id"],
+                **{f: snap[f] for f in BALANCE_FIELDS},
+            ))
+            continue
+        if any(getattr(row, f) != snap[f] for f in BALANCE_FIELDS):
+            stats["drifted"] += 1
+            for f in BALANCE_FIELDS:
+                setattr(row, f, snap[f])
+            to_update.append(row)
+
+    if fix:
+        PersonBalance.objects.bulk_create(to_create, batch_size=batch_size)
+        PersonBalance.objects.bulk_update(to_update, BALANCE_FIELDS, batch_size=batch_size)
+    return stats
@@ -0,0 +1,41 @@
+# core/calendar_cache.py
+"""
+Rendered month fragments for the global court calendar (calendar_partial).
+
+Each (tenant, month) has a version number kept in the cache. The fragment key
+includes that version, so a court date write only has to replace the version
+of the months whose 6-week grid shows the date: its own month and the two
+neighbours. The version starts from time.time_ns(), not 1, so after the
+version key is evicted a new version cannot reuse an old fragment's key.
+"""
+import datetime
+import time
+
+from django.core.cache import cache
+
+FRAGMENT_TIMEOUT = 6 * 3600
+VERSION_TIMEOUT = 7 * 24 * 3600
+
+
+def _month(d: datetime.date, delta: int = 0) -> datetime.date:
+    y = d.year + (d.month - 1 + delta) // 12
+    m = (d.month - 1 + delta) % 12 + 1
+    return datetime.date(y, m, 1)
+
+
+def _version_key(tenant_id, month_start: datetime.date) -> str:
+    return f"calgrid:v:{tenant_id}:{month_start:%Y-%m}"
+
+
+def fragment_key(tenant_id, month_start: datetime.date, today: datetime.date) -> str:
+    version = cache.get_or_set(_version_key(tenant_id, month_start), time.time_ns, VERSION_TIMEOUT)
+    # "today" is highlighted in the grid, so a new day is a new fragment
+    return f"calgrid:{tenant_id}:{month_start:%Y-%m}:{version}:{today:%Y%m%d}"
+
+
+def invalidate_months(tenant_id, dates):
+    """Drop the cached grids that show any of `dates`."""
+    months = {_month(d, delta) for d in dates if d for delta in (-1, 0, 1)}
+    if months:
+        version = time.time_ns()
+        cache.set_many({_version_key(tenant_id, m): version for m in months}, VERSION_TIMEOUT)
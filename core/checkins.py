@@ -0,0 +1,130 @@
+# core/checkins.py
+"""
+Last check-in per person, kept on Person (last_checkin_at/last_checkin_method)
+so the widget and the missed check-in report are single reads, plus the
+periodic missed check-in sweep (`manage.py flag_missed_checkins`).
+
+missed_checkins() is the one definition of "missed": no check-in since the
+cutoff, including people who have never checked in. The dashboard tile, the
+report and the sweep all count the same people.
+"""
+import datetime
+import logging
+
+from django.core.signing import TimestampSigner
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import CheckIn, NotificationOutbox, Person, PushSubscription, Tenant
+
+log = logging.getLogger(__name__)
+
+# signs the public self check-in links (views_people.self_checkin)
+SELF_CHECKIN_SIGNER = TimestampSigner(salt="self-checkin")
+BATCH_SIZE = 500
+
+
+def self_checkin_path(person) -> str:
+    return reverse("self_checkin", args=[SELF_CHECKIN_SIGNER.sign(f"{person.tenant_id}:{person.pk}")])
+
+
+def note_checkin(ci: CheckIn):
+    """post_save: move the person's last check-in forward (never backward)."""
+    (Person.objects
+     .filter(pk=ci.person_id)
+     .filter(Q(last_checkin_at__isnull=True) | Q(last_checkin_at__lte=ci.created_at))
+     .update(last_checkin_at=ci.created_at, last_checkin_method=ci.method))
+
+
+def refresh_last_checkin(person_id):
+    """Recompute from CheckIn rows (after a delete); one read on the (person, created_at) index."""
+    last = (CheckIn.objects
+            .filter(person_id=person_id)
+            .order_by("-created_at", "-id")
+            .values("created_at", "method")
+            .first()) or {"created_at": None, "method": ""}
+    Person.objects.filter(pk=person_id).update(last_checkin_at=last["created_at"], last_checkin_method=last["method"])
+
+
+def missed_checkins(people, cutoff):
+    """`people` with no check-in since `cutoff` (never checked in counts as missed)."""
+    return people.filter(Q(last_checkin_at__lt=cutoff) | Q(last_checkin_at__isnull=True))
+
+
+def flag_missed_checkins(now=None, tenant=None, batch_size=BATCH_SIZE, dry_run=False):
+    """
+    Queue a push to each person who is past the tenant's interval
+    (missed_checkins), and one summary push to the tenant's staff devices.
+    A person is alerted once per interval (checkin_alerted_at). Returns
+    {"tenants", "flagged", "queued"}.
+    """
+    now = now or timezone.now()
+    tenants = Tenant.objects.filter(checkin_interval_days__gt=0)
+    if tenant is not None:
+        tenants = tenants.filter(pk=tenant.pk)
+    has_device = Exists(PushSubscription.objects.filter(person_id=OuterRef("pk")))
+
+    stats = {"tenants": 0, "flagged": 0, "queued": 0}
+    for t in tenants.order_by("pk"):
+        interval = datetime.timedelta(days=t.checkin_interval_days)
+        people = (missed_checkins(Person.objects.filter(tenant=t), now - interval)
+                  .filter(Q(checkin_alerted_at__isnull=True)
+                          | Q(checkin_alerted_at__lt=F("last_checkin_at"))
+                          | Q(checkin_alerted_at__lt=now - interval))
+                  .annotate(has_device=has_device)
+                  .only("pk", "tenant_id", "first_name", "last_name", "last_checkin_at")
+                  .order_by(F("last_checkin_at").asc(nulls_first=True), "pk"))
+        if dry_run:
+            flagged = people.count()
+            stats["queued"] += people.filter(has_device=True).count()
+        else:
+            # alerted rows drop out of `people`, so each slice is the next batch
+            flagged = 0
+            while True:
+                batch = list(people[:batch_size])
+                if not batch:
+                    break
+                stats["queued"] += _flag_batch(batch, now)
+                flagged += len(batch)
+        if not flagged:
+            continue
+
+        stats["tenants"] += 1
+        stats["flagged"] += flagged
+        if not dry_run:
+            NotificationOutbox.objects.create(
+                tenant=t,
+                payload={
+                    "title": "Missed check-ins",
+                    "body": f"{flagged} {'person is' if flagged == 1 else 'people are'} past the "
+                            f"{t.checkin_interval_days}-day check-in interval.",
+                    "url": "/",
+                },
+                ttl=12 * 3600,
+            )
+            stats["queued"] += 1
+    if stats["flagged"]:
+        log.info("missed check-ins: tenants=%s flagged=%s queued=%s", stats["tenants"], stats["flagged"], stats["queued"])
+    return stats
+
+
+def _flag_batch(batch, now) -> int:
+    msgs = [
+        NotificationOutbox(
+            tenant_id=p.tenant_id, person_id=p.pk,
+            payload={
+                "title": "Check-in overdue",
+                "body": f"Hi {p.first_name or 'there'}, your check-in is overdue. Tap to check in now.",
+                "url": self_checkin_path(p),
+            },
+            ttl=24 * 3600,
+            urgency="high",
+        )
+        for p in batch if p.has_device
+    ]
+    with transaction.atomic():
+        NotificationOutbox.objects.bulk_create(msgs)
+        Person.objects.filter(pk__in=[p.pk for p in batch]).update(checkin_alerted_at=now)
+    return len(msgs)
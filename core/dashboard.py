@@ -0,0 +1,73 @@
+# core/dashboard.py
+"""
+Agency dashboard KPIs.
+
+Four aggregate queries per tenant: bond totals from BondDailyRollup,
+balances from PersonBalance, this week's court dates and missed check-ins.
+The result is cached per tenant for DASHBOARD_TTL seconds. core.signals
+deletes it on writes that change a tile, so the TTL only matters for tiles
+that move with the clock (this week, missed check-ins).
+"""
+import datetime
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .checkins import missed_checkins
+from .models import BondDailyRollup, CourtDate, Person, PersonBalance
+
+DASHBOARD_TTL = 60
+
+
+def dashboard_cache_key(tenant_id) -> str:
+    return f"dashboard:{tenant_id}"
+
+
+def invalidate_dashboard(tenant_id):
+    cache.delete(dashboard_cache_key(tenant_id))
+
+
+def compute_kpis(tenant) -> dict:
+    today = timezone.localdate()
+    month_start = today.replace(day=1)
+    week_end = today + datetime.timedelta(days=6)
+    checkin_days = tenant.checkin_interval_days or 14
+
+    bonds = BondDailyRollup.objects.filter(tenant=tenant).aggregate(
+        liability=Sum("total"),
+        bonds=Sum("count"),
+        month_count=Sum("count", filter=Q(date__gte=month_start, date__lte=today)),
+        month_total=Sum("total", filter=Q(date__gte=month_start, date__lte=today)),
+    )
+    balances = PersonBalance.objects.filter(tenant=tenant, balance__gt=0).aggregate(
+        outstanding=Sum("balance"),
+        owing=Count("pk"),
+    )
+    court_week = CourtDate.objects.filter(tenant=tenant, date__range=(today, week_end)).count()
+    missed = missed_checkins(Person.objects.filter(tenant=tenant),
+                             timezone.now() - datetime.timedelta(days=checkin_days)).count()
+
+    return {
+        "liability": bonds["liability"] or Decimal("0"),
+        "bonds": bonds["bonds"] or 0,
+        "month_count": bonds["month_count"] or 0,
+        "month_total": bonds["month_total"] or Decimal("0"),
+        "outstanding": balances["outstanding"] or Decimal("0"),
+        "owing": balances["owing"],
+        "court_week": court_week,
+        "missed_checkins": missed,
+        "checkin_days": checkin_days,
+        "month_start": month_start,
+        "computed_at": timezone.now(),
+    }
+
+
+def dashboard_kpis(tenant) -> dict:
+    key = dashboard_cache_key(tenant.pk)
+    kpis = cache.get(key)
+    if kpis is None:
+        kpis = compute_kpis(tenant)
+        cache.set(key, kpis, DASHBOARD_TTL)
+    return kpis
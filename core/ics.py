@@ -0,0 +1,143 @@
+# core/ics.py
+"""
+ICS court-date feeds.
+
+iter_feed() streams RFC 5545 text (escaped, folded at 75 octets) straight
+from a CourtDate .iterator(), so a feed with years of history is never built
+as one list. Rendered bodies are cached under a key that includes the tenant's
+court_dates_version. Every CourtDate write bumps that counter (core.signals),
+so a stale body is never served and nothing has to be deleted. The views
+answer conditional GETs from the same counter with no court-date query.
+"""
+import datetime
+
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CourtDate, Tenant
+from .utils import _combine_date_time_aware
+
+FEED_CACHE_TIMEOUT = 24 * 3600
+FEED_CACHE_MAX_BYTES = 2 * 1024 * 1024  # bigger feeds are streamed every time instead of cached
+FEED_FIELDS = ("date", "time", "court", "location", "person__first_name", "person__last_name")
+CHUNK_SIZE = 2000
+
+
+def bump_court_dates_version(tenant_id):
+    Tenant.objects.filter(pk=tenant_id).update(
+        court_dates_version=F("court_dates_version") + 1,
+        court_dates_changed_at=timezone.now(),
+    )
+
+
+def feed_etag(tenant, scope: str, start=None, end=None) -> str:
+    return f'"ics-{tenant.pk}-{tenant.court_dates_version}-{scope}-{start or ""}-{end or ""}"'
+
+
+def feed_cache_key(tenant, scope: str, start=None, end=None) -> str:
+    return f"ics:{tenant.pk}:{tenant.court_dates_version}:{scope}:{start or ''}:{end or ''}"
+
+
+def feed_queryset(tenant, person=None, start=None, end=None):
+    qs = (CourtDate.objects
+          .filter(tenant=tenant, date__isnull=False)
+          .select_related("person")
+          .only(*FEED_FIELDS))
+    if person is not None:
+        qs = qs.filter(person=person)
+    if start:
+        qs = qs.filter(date__gte=start)
+    if end:
+        qs = qs.filter(date__lte=end)
+    return qs.order_by("date", "time", "pk")
+
+
+# --- RFC 5545 text ---
+
+def escape_text(value) -> str:
+    """TEXT value escaping (RFC 5545 3.3.11)."""
+    return (str(value or "")
+            .replace("\\", "\\\\")
+            .replace(";", "\\;")
+            .replace(",", "\\,")
+            .replace("\r\n", "\\n")
+            .replace("\n", "\\n")
+            .replace("\r", "\\n"))
+
+
+def fold(line: str) -> str:
+    """Fold a content line to 75 octets (RFC 5545 3.1), never splitting a UTF-8 character."""
+    if len(line.encode("utf-8")) <= 75:
+        return line + "\r\n"
+    out, cur, size = [], [], 0
+    limit = 75
+    for ch in line:
+        n = len(ch.encode("utf-8"))
+        if size + n > limit:
+            out.append("".join(cur))
+            cur, size, limit = [], 0, 74  # continuation lines start with a space
+        cur.append(ch)
+        size += n
+    out.append("".join(cur))
+    return "\r\n ".join(out) + "\r\n"
+
+
+def _utc(d: datetime.datetime) -> str:
+    return d.astimezone(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _event(cd, stamp: str) -> str:
+    if cd.time:
+        start = f"DTSTART:{_utc(_combine_date_time_aware(cd.date, cd.time))}"
+    else:
+        start = f"DTSTART;VALUE=DATE:{cd.date:%Y%m%d}"  # no time: an all-day event
+    return "".join(fold(line) for line in (
+        "BEGIN:VEVENT",
+        f"UID:court-{cd.person_id}-{cd.pk}@bondkeeper",
+        f"DTSTAMP:{stamp}",
+        start,
+        f"SUMMARY:{escape_text(f'Court: {cd.person}')}",
+        f"LOCATION:{escape_text(cd.location or cd.court)}",
+        "END:VEVENT",
+    ))
+
+
+def iter_feed(court_dates, prodid: str):
+    """Yield the VCALENDAR a few events at a time; rows come from .iterator()."""
+    stamp = _utc(timezone.now())
+    yield fold("BEGIN:VCALENDAR") + fold("VERSION:2.0") + fold(f"PRODID:-//BondKeeper//{prodid}//EN")
+    buf = []
+    for cd in court_dates.iterator(chunk_size=CHUNK_SIZE):
+        buf.append(_event(cd, stamp))
+        if len(buf) >= 100:
+            yield "".join(buf)
+            buf = []
+    buf.append(fold("END:VCALENDAR"))
+    yield "".join(buf)
+
+
+def cached_feed(tenant, scope: str, court_dates, prodid: str, start=None, end=None):
+    """
+    Iterable body for (tenant version, scope, window). A cache hit is one
+    string; a miss streams from the database and stores the body at the end
+    if it stayed under FEED_CACHE_MAX_BYTES.
+    """
+    key = feed_cache_key(tenant, scope, start, end)
+    body = cache.get(key)
+    if body is not None:
+        return [body]
+    return _stream_and_cache(key, iter_feed(court_dates, prodid))
+
+
+def _stream_and_cache(key, chunks):
+    kept, size = [], 0
+    for chunk in chunks:
+        if kept is not None:
+            kept.append(chunk)
+            size += len(chunk)
+            if size > FEED_CACHE_MAX_BYTES:
+                kept = None
+        yield chunk
+    if kept is not None:
+        cache.set(key, "".join(kept), FEED_CACHE_TIMEOUT)
@@ -0,0 +1,497 @@
+# core/importer.py
+"""
+Batched CSV -> Person import.
+
+The tenant's phone index is loaded once, rows are validated a chunk at a time
+and written with bulk_create/bulk_update, so large legacy exports don't pay a
+query (or two) per row. A batch the database rejects is saved again row by
+row, so only the offending rows fail.
+
+Uploads are staged server-side (ImportUpload) and parsed lazily, so the
+preview only reads the first rows and the import streams the rest.
+"""
+import codecs
+import csv
+import datetime
+import io
+import itertools
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import DataError, IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .calendar_cache import invalidate_months
+from .dashboard import invalidate_dashboard
+from .ics import bump_court_dates_version
+from .models import Person, CourtDate, ImportUpload, ImportJob, ImportJobRow
+from .search import index_people
+
+log = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+MAX_RESULTS = 200  # row messages kept for the results table
+PREVIEW_ROWS = 8
+ENCODING_CHECK_CHUNK = 1 << 20
+STAGED_UPLOAD_TTL = datetime.timedelta(hours=24)
+
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%m-%d-%Y", "%m/%d/%y", "%Y/%m/%d", "%d-%b-%Y", "%b %d %Y")
+
+
+def clean_quotes(s: str) -> str:
+    return (s or "").strip().strip('"').strip("'").strip("“").strip("”").strip()
+
+
+def parse_date_flex(s: str):
+    s = clean_quotes(s).replace("—", "-").replace("–", "-")
+    if not s:
+        return None
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(s, fmt).date()
+        except ValueError:
+            pass
+    return None
+
+
+def stage_upload(tenant, f, user=None) -> ImportUpload:
+    """
+    Store an uploaded CSV for the later import step; expired uploads are purged here.
+    The upload is streamed to storage a chunk at a time, never read into memory whole.
+    """
+    (ImportUpload.objects
+     .filter(created_at__lt=timezone.now() - STAGED_UPLOAD_TTL)
+     .exclude(jobs__status__in=[ImportJob.STATUS_QUEUED, ImportJob.STATUS_RUNNING])
+     .delete())
+    upload = ImportUpload(
+        tenant=tenant,
+        user=user if getattr(user, "is_authenticated", False) else None,
+        filename=(getattr(f, "name", "") or "")[:255],
+        size=f.size,
+    )
+    upload.file.save(f"{upload.pk}.csv", f, save=False)
+    upload.save()
+    return upload
+
+
+def open_upload(upload: ImportUpload):
+    """The staged CSV as a binary file; use it as a context manager."""
+    return upload.file.open("rb")
+
+
+def _sniff_encoding(f) -> str:
+    """utf-8-sig if the whole file is valid UTF-8, else latin-1 (which decodes any byte)."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    try:
+        # a chunk at a time: validates without holding the file in memory
+        for chunk in iter(lambda: f.read(ENCODING_CHECK_CHUNK), b""):
+            decoder.decode(chunk)
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        return "latin-1"
+    finally:
+        f.seek(0)
+    return "utf-8-sig"
+
+
+def iter_csv_rows(f) -> Iterator[List[str]]:
+    """
+    Lazily parse a binary CSV file (header row first). The encoding is
+    checked against the whole file, so a latin-1 byte deep in an otherwise
+    ASCII export isn't mangled; the dialect is sniffed from the head. Rows
+    are decoded only as they are consumed, and `f` must stay open until then.
+    """
+    text = io.TextIOWrapper(f, encoding=_sniff_encoding(f), newline="")
+    sample = text.read(2048)
+    text.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample)
+    except Exception:
+        dialect = csv.excel
+    return csv.reader(text, dialect)
+
+
+def read_preview(upload: ImportUpload, limit: int = PREVIEW_ROWS):
+    """(headers, first `limit` data rows) without parsing the rest of the file."""
+    with open_upload(upload) as f:
+        rows = iter_csv_rows(f)
+        headers = next(rows, None)
+        if headers is None:
+            return None, []
+        return headers, list(itertools.islice(rows, limit))
+
+
+def _phone_key(phone: str) -> str:
+    # same matching rule as the old phone__iexact lookup
+    return (phone or "").strip().lower()
+
+
+@dataclass
+class RowResult:
+    ok: bool
+    msg: str
+    data: Dict[str, Any]
+    row: int = 0
+
+
+class PersonImporter:
+    """
+    importer = PersonImporter(tenant, mapping, dedupe_by_phone=True)
+    importer.run(data_rows, commit=True)
+    importer.created / .updated / .failed / .results
+
+    Background jobs drive it a batch at a time instead:
+    importer.prepare(); for first, batch in importer.batches(rows): importer.process_batch(first, batch, commit)
+    and read importer.chunk_results after each batch.
+    """
+
+    def __init__(self, tenant, mapping: Dict[int, str], dedupe_by_phone: bool = False,
+                 batch_size: Optional[int] = None,
+                 progress: Optional[Callable[[int, Optional[int]], None]] = None):
+        self.tenant = tenant
+        self.mapping = mapping
+        self.dedupe_by_phone = dedupe_by_phone
+        self.batch_size = batch_size or getattr(settings, "PERSON_IMPORT_BATCH_SIZE", DEFAULT_BATCH_SIZE)
+        self.progress = progress
+        self.created = self.updated = self.failed = 0
+        self.results: List[RowResult] = []
+        self.chunk_results: List[RowResult] = []  # every row of the last batch
+        self._phone_index: Dict[str, Any] = {}
+
+    # --- bookkeeping ---
+    def _note(self, idx: int, ok: bool, msg: str, record: Dict[str, Any]):
+        if not ok:
+            self.failed += 1
+        result = RowResult(ok, msg, record, idx)
+        self.chunk_results.append(result)
+        if len(self.results) < MAX_RESULTS:
+            self.results.append(result)
+
+    def _load_phone_index(self):
+        """phone -> Person pk for the whole tenant, one query."""
+        index = {}
+        rows = (Person.objects.filter(tenant=self.tenant)
+                .exclude(phone="")
+                .order_by("pk")
+                .values_list("phone", "pk"))
+        for phone, pk in rows.iterator(chunk_size=5000):
+            index.setdefault(_phone_key(phone), pk)
+        self._phone_index = index
+
+    # --- per-row ---
+    def build_record(self, idx: int, row: List[str]):
+        """Mapped + cleaned dict for one CSV row, or None (and a failure noted)."""
+        record = {
+            field: clean_quotes(row[i]) if i < len(row) and row[i] is not None else ""
+            for i, field in self.mapping.items()
+        }
+        if "dob" in record:
+            raw = record["dob"]
+            if not raw:
+                record["dob"] = None
+            else:
+                d = parse_date_flex(raw)
+                if d is None:
+                    self._note(idx, False, f"Row {idx}: Invalid DOB format (try YYYY-MM-DD or MM/DD/YYYY).", record)
+                    return None
+                record["dob"] = d
+        if not record.get("first_name") or not record.get("last_name"):
+            self._note(idx, False, f"Row {idx}: Missing first/last name", record)
+            return None
+        return record
+
+    # --- per-chunk ---
+    def _process_chunk(self, chunk, commit: bool):
+        # fetch existing people this chunk will update, in one query
+        wanted = set()
+        if self.dedupe_by_phone:
+            for _, record in chunk:
+                pk = self._phone_index.get(_phone_key(record.get("phone")))
+                if isinstance(pk, int):
+                    wanted.add(pk)
+        existing = Person.objects.in_bulk(wanted) if wanted else {}
+
+        rows = []  # (idx, record, verb, person or validation error), in row order
+        fields = set()
+        for idx, record in chunk:
+            key = _phone_key(record.get("phone")) if self.dedupe_by_phone else ""
+            match = self._phone_index.get(key) if key else None
+            person = existing.get(match) if isinstance(match, int) else match
+
+            if person is not None:
+                verb = "updated"
+                before = {k: getattr(person, k) for k in record}
+                for k, v in record.items():
+                    setattr(person, k, v)
+            else:
+                verb = "created"
+                before = None
+                person = Person(tenant=self.tenant, **record)
+
+            try:
+                # tenant is known-good; validating the FK would cost a query per row
+                person.full_clean(exclude=["tenant"], validate_unique=False)
+            except ValidationError as e:
+                if before is not None:
+                    # the matched person may already be queued by an earlier row
+                    for k, v in before.items():
+                        setattr(person, k, v)
+                rows.append((idx, record, verb, e))
+                continue
+
+            if verb == "created" and key:
+                # later rows with the same phone update this one, like the old per-row save
+                self._phone_index[key] = person
+            if verb == "updated":
+                fields.update(record.keys())
+            rows.append((idx, record, verb, person))
+
+        failed = {}  # id(person) -> error, for rows whose write was rejected
+        if commit:
+            failed = self._write([p for _, _, _, p in rows if isinstance(p, Person)], sorted(fields))
+
+        for idx, record, verb, person in rows:
+            error = person if isinstance(person, ValidationError) else failed.get(id(person))
+            if error is not None:
+                self._note(idx, False, f"Row {idx}: {error}", record)
+                continue
+            if verb == "created":
+                self.created += 1
+            else:
+                self.updated += 1
+            self._note(idx, True, f"Row {idx}: {verb}", record)
+
+    def _write(self, people: List[Person], fields: List[str]) -> Dict[int, str]:
+        """
+        Save a chunk's people with bulk_create/bulk_update. If the database
+        rejects the batch, save it again one person at a time, each in its own
+        savepoint, so one bad row doesn't roll back the whole import. Returns
+        {id(person): error} for the people that could not be saved.
+        """
+        people = {id(p): p for p in people}  # rows sharing a phone share a person
+        to_create = [p for p in people.values() if p.pk is None]
+        to_update = [p for p in people.values() if p.pk is not None]
+
+        failed = {}
+        try:
+            with transaction.atomic():
+                Person.objects.bulk_create(to_create, batch_size=self.batch_size)
+                if to_update:
+                    Person.objects.bulk_update(to_update, fields, batch_size=self.batch_size)
+        except (IntegrityError, DataError):
+            log.warning("person import: batch rejected, saving its %s people one at a time", len(people))
+            creating = {id(p) for p in to_create}
+            for p in to_create:
+                p.pk = None  # an earlier part of the rolled-back batch may have set it
+            to_create, to_update = [], []
+            for p in people.values():
+                try:
+                    with transaction.atomic():
+                        if id(p) in creating:
+                            Person.objects.bulk_create([p])
+                        else:
+                            Person.objects.bulk_update([p], fields)
+                except (IntegrityError, DataError) as e:
+                    failed[id(p)] = str(e)
+                    continue
+                (to_create if id(p) in creating else to_update).append(p)
+
+        # bulk writes skip post_save, so do what the Person receivers would
+        index_people(to_create, batch_size=self.batch_size, replace=False)
+        index_people(to_update, batch_size=self.batch_size)
+        if to_create or to_update:
+            self._invalidate_caches([p.pk for p in to_update])
+        if self.dedupe_by_phone:
+            for p in people.values():
+                key = _phone_key(p.phone)
+                if key and self._phone_index.get(key) is p:
+                    if id(p) in failed:
+                        del self._phone_index[key]  # never saved, so later rows can't update it
+                    else:
+                        self._phone_index[key] = p.pk
+        return failed
+
+    def _invalidate_caches(self, updated_pks: List[int]):
+        """The Person post_save invalidations (core.signals), once per batch."""
+        tenant_id = self.tenant.pk
+        if updated_pks:
+            # ICS SUMMARY lines and calendar grid items carry the person's name
+            days = list(CourtDate.objects
+                        .filter(person_id__in=updated_pks)
+                        .values_list("date", flat=True)
+                        .distinct())
+            if days:
+                bump_court_dates_version(tenant_id)
+                transaction.on_commit(lambda: invalidate_months(tenant_id, days))
+        transaction.on_commit(lambda: invalidate_dashboard(tenant_id))
+
+    def prepare(self):
+        if self.dedupe_by_phone:
+            self._load_phone_index()
+
+    def batches(self, data_rows: Iterable[List[str]], first_row_number: int = 2):
+        """Yield (row number of the first row, rows) a batch at a time, consuming data_rows lazily."""
+        rows = iter(data_rows)
+        done = 0
+        while True:
+            batch = list(itertools.islice(rows, self.batch_size))
+            if not batch:
+                return
+            yield first_row_number + done, batch
+            done += len(batch)
+
+    def process_batch(self, first_idx: int, batch: List[List[str]], commit: bool):
+        self.chunk_results = []
+        chunk = []
+        for i, row in enumerate(batch):
+            record = self.build_record(first_idx + i, row)
+            if record is not None:
+                chunk.append((first_idx + i, record))
+        self._process_chunk(chunk, commit)
+
+    def run(self, data_rows: Iterable[List[str]], commit: bool = True, first_row_number: int = 2,
+            total: Optional[int] = None):
+        """
+        Import every row in one transaction; with commit=False nothing is written
+        (preview/dry run). `data_rows` is consumed a batch at a time, so a lazy
+        reader (iter_csv_rows) never has the whole file parsed in memory.
+        `total` is only for progress.
+        """
+        self.prepare()
+        if total is None and hasattr(data_rows, "__len__"):
+            total = len(data_rows)
+
+        done = 0
+        with transaction.atomic():
+            for first_idx, batch in self.batches(data_rows, first_row_number):
+                self.process_batch(first_idx, batch, commit)
+                done += len(batch)
+                if self.progress:
+                    self.progress(done, total)
+                log.info("person import: %s/%s rows (created=%s updated=%s failed=%s)",
+                         done, total if total is not None else "?", self.created, self.updated, self.failed)
+        return self
+
+
+# --- background jobs (manage.py run_import_jobs) ---
+
+MAX_JOB_ATTEMPTS = 3
+INLINE_MAX_BYTES = 256 * 1024  # smaller uploads are imported in the request, without the worker
+JOB_STALE_AFTER = datetime.timedelta(minutes=5)  # a running job with no heartbeat for this long is reclaimed
+
+
+class ImportJobError(Exception):
+    """A job that cannot succeed on retry (e.g. its staged file is gone)."""
+
+
+def count_csv_rows(upload: ImportUpload) -> int:
+    """Data rows (excluding the header) in a staged file."""
+    with open_upload(upload) as f:
+        return max(0, sum(1 for _ in iter_csv_rows(f)) - 1)
+
+
+def claim_import_job(job_id: Optional[int] = None) -> Optional[ImportJob]:
+    """
+    Take the oldest runnable job: queued, or running with a stale heartbeat
+    (its worker died). The conditional UPDATE makes the claim safe with
+    several workers and no row locks.
+    """
+    now = timezone.now()
+    qs = ImportJob.objects.filter(
+        Q(status=ImportJob.STATUS_QUEUED)
+        | Q(status=ImportJob.STATUS_RUNNING, heartbeat_at__lt=now - JOB_STALE_AFTER)
+    )
+    if job_id is not None:
+        qs = qs.filter(pk=job_id)
+    for job in qs.order_by("created_at", "pk")[:10]:
+        claimed = (ImportJob.objects
+                   .filter(pk=job.pk, status=job.status, heartbeat_at=job.heartbeat_at)
+                   .update(status=ImportJob.STATUS_RUNNING, heartbeat_at=now,
+                           started_at=job.started_at or now, attempts=F("attempts") + 1, error=""))
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
+
+
+def run_import_job(job: ImportJob) -> ImportJob:
+    """
+    Run (or resume) a claimed job. Every batch commits in its own transaction
+    together with its ImportJobRow results and the job's rows_done/counters,
+    so whatever is committed is exactly what a resume skips.
+    """
+    try:
+        upload = job.upload
+        if upload is None or not upload.file.storage.exists(upload.file.name):
+            raise ImportJobError("The staged upload is no longer available.")
+        if job.total_rows is None:
+            job.total_rows = count_csv_rows(upload)
+            job.save(update_fields=["total_rows"])
+
+        importer = PersonImporter(job.tenant, {int(k): v for k, v in job.mapping.items()},
+                                  dedupe_by_phone=job.dedupe_by_phone)
+        importer.created, importer.updated, importer.failed = job.created_count, job.updated_count, job.failed_count
+        importer.prepare()
+
+        with open_upload(upload) as f:
+            rows = iter_csv_rows(f)
+            next(rows, None)  # header
+            rows = itertools.islice(rows, job.rows_done, None)
+            for first_idx, batch in importer.batches(rows, first_row_number=2 + job.rows_done):
+                with transaction.atomic():
+                    importer.process_batch(first_idx, batch, job.commit)
+                    ImportJobRow.objects.bulk_create([
+                        ImportJobRow(job=job, row_number=r.row, ok=r.ok, msg=r.msg[:500])
+                        for r in importer.chunk_results
+                    ])
+                    ImportJob.objects.filter(pk=job.pk).update(
+                        rows_done=F("rows_done") + len(batch),
+                        created_count=importer.created,
+                        updated_count=importer.updated,
+                        failed_count=importer.failed,
+                        heartbeat_at=timezone.now(),
+                    )
+                job.rows_done += len(batch)
+                log.info("import job %s: %s/%s rows (created=%s updated=%s failed=%s)",
+                         job.pk, job.rows_done, job.total_rows, importer.created, importer.updated, importer.failed)
+    except Exception as e:
+        log.exception("import job %s failed at row %s", job.pk, 2 + job.rows_done)
+        retry = job.attempts < MAX_JOB_ATTEMPTS and not isinstance(e, ImportJobError)
+        # only status fields: rows_done/counters stay at the last committed batch
+        ImportJob.objects.filter(pk=job.pk).update(
+            status=ImportJob.STATUS_QUEUED if retry else ImportJob.STATUS_FAILED,
+            error=str(e)[:2000],
+            finished_at=None if retry else timezone.now(),
+        )
+        job.refresh_from_db()
+        return job
+
+    ImportJob.objects.filter(pk=job.pk).update(status=ImportJob.STATUS_DONE, finished_at=timezone.now())
+    job.refresh_from_db()
+    if job.commit:
+        upload.delete()  # a dry run keeps it for the purge window
+    return job
+
+
+def run_import_job_inline(job: ImportJob) -> ImportJob:
+    """
+    Run a small job in the calling request (up to PERSON_IMPORT_INLINE_BYTES),
+    so imports work even where `manage.py run_import_jobs` isn't deployed.
+    Larger jobs are left queued for the worker.
+    """
+    limit = getattr(settings, "PERSON_IMPORT_INLINE_BYTES", INLINE_MAX_BYTES)
+    if job.upload is None or job.upload.size > limit:
+        return job
+    claimed = claim_import_job(job.pk)
+    return run_import_job(claimed) if claimed else job
+
+
+def resume_import_job(job: ImportJob) -> bool:
+    """Requeue a failed job; it picks up after its last committed batch."""
+    return bool(ImportJob.objects
+                .filter(pk=job.pk, status=ImportJob.STATUS_FAILED, upload__isnull=False)
+                .update(status=ImportJob.STATUS_QUEUED, attempts=0, finished_at=None))
@@ -0,0 +1,106 @@
+# core/lookups.py
+"""
+Bond form vocabularies (LookupValue: charge, county, offense type, jurisdiction).
+
+Each category is held in-process as (value, uses) pairs, most used first.
+The list is reloaded when the category's version in the Django cache changes
+or after VOCAB_TTL seconds. The version is only shared between workers when
+the cache is (CACHE_DIR); with the per-process default, the TTL bounds how
+long another worker serves a stale list. remember_bond_lookups() records a
+saved bond's new or changed values in two queries: one
+bulk_create(ignore_conflicts=True) and one UPDATE of the use counts. It then
+bumps the versions. The form ships only the top DATALIST_SIZE values;
+lookup_autocomplete serves the rest by prefix.
+"""
+import threading
+import time
+
+from django.core.cache import cache
+from django.db.models import F, Q
+
+from .models import LookupValue
+
+CATEGORIES = [c for c, _ in LookupValue.CATEGORY_CHOICES]
+BOND_FIELDS = {"charge": "charge", "county": "county", "offense_type": "offense_type", "jurisdiction": "jurisdiction"}
+DATALIST_SIZE = 25
+VOCAB_MAX = 20000  # larger categories are prefix-matched in the database instead
+VERSION_TIMEOUT = 7 * 24 * 3600
+VOCAB_TTL = 60  # seconds an in-process list is trusted without a version change
+
+_lock = threading.Lock()
+_vocab = {}  # category -> (version, loaded_at, [(value, uses), ...])
+
+
+def _version_key(category: str) -> str:
+    return f"lookups:v:{category}"
+
+
+def _version(category: str):
+    return cache.get_or_set(_version_key(category), time.time_ns, VERSION_TIMEOUT)
+
+
+def invalidate(categories):
+    version = time.time_ns()
+    cache.set_many({_version_key(c): version for c in categories}, VERSION_TIMEOUT)
+
+
+def vocabulary(category: str) -> list:
+    """(value, uses) pairs for a category, most used first (at most VOCAB_MAX)."""
+    version = _version(category)
+    now = time.monotonic()
+    cached = _vocab.get(category)
+    if cached and cached[0] == version and now - cached[1] < VOCAB_TTL:
+        return cached[2]
+    values = list(LookupValue.objects
+                  .filter(category=category)
+                  .order_by("-uses", "value")
+                  .values_list("value", "uses")[:VOCAB_MAX])
+    with _lock:
+        _vocab[category] = (version, now, values)
+    return values
+
+
+def top_values(category: str, limit: int = DATALIST_SIZE) -> list:
+    return [v for v, _ in vocabulary(category)[:limit]]
+
+
+def suggest(category: str, prefix: str, limit: int = 10) -> list:
+    """Top `limit` values starting with `prefix` (case-insensitive), most used first."""
+    prefix = (prefix or "").strip().lower()
+    values = vocabulary(category)
+    if len(values) >= VOCAB_MAX:
+        return list(LookupValue.objects
+                    .filter(category=category, value__istartswith=prefix)
+                    .order_by("-uses", "value")
+                    .values_list("value", flat=True)[:limit])
+    out = []
+    for value, _ in values:
+        if value.lower().startswith(prefix):
+            out.append(value)
+            if len(out) >= limit:
+                break
+    return out
+
+
+def lookup_context() -> dict:
+    """Datalist values per category for _form_bond.html."""
+    return {c: top_values(c) for c in CATEGORIES}
+
+
+def remember_bond_lookups(bond, changed=None):
+    """
+    Record the bond's non-empty values and count one use of each. For an
+    edit, pass the names of the fields that changed (form.changed_data) so
+    re-saving a bond doesn't count its unchanged values again.
+    """
+    pairs = {(cat, (getattr(bond, field) or "").strip()) for cat, field in BOND_FIELDS.items()
+             if changed is None or field in changed}
+    pairs = {(cat, val) for cat, val in pairs if val}
+    if not pairs:
+        return
+    LookupValue.objects.bulk_create([LookupValue(category=c, value=v) for c, v in pairs], ignore_conflicts=True)
+    match = Q()
+    for c, v in pairs:
+        match |= Q(category=c, value=v)
+    LookupValue.objects.filter(match).update(uses=F("uses") + 1)
+    invalidate({c for c, _ in pairs})
@@ -0,0 +1,126 @@
+import random
+import statistics
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.checkins import missed_checkins
+from core.models import Tenant, Person, Bond, CourtDate, CheckIn, Invoice
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Print query plans + timings for the tenant-scoped hot paths "
+        "(calendar, bond/overdue reports, check-ins, people list). "
+        "--seed N loads a synthetic tenant first; it is rolled back unless --keep."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0, help="Synthetic people to create (each gets bonds/court dates/invoices/check-ins).")
+        parser.add_argument("--tenant", type=int, help="Benchmark an existing tenant id instead of the seeded one.")
+        parser.add_argument("--runs", type=int, default=20)
+        parser.add_argument("--keep", action="store_true", help="Commit the seeded rows instead of rolling back.")
+
+    def handle(self, *args, **opts):
+        try:
+            with transaction.atomic():
+                tenant = self._seed(opts["seed"]) if opts["seed"] else None
+                if opts["tenant"]:
+                    tenant = Tenant.objects.get(pk=opts["tenant"])
+                if tenant is None:
+                    tenant = Tenant.objects.first()
+                if tenant is None:
+                    self.stderr.write("No tenant to benchmark; pass --seed N.")
+                    return
+                if connection.vendor in ("sqlite", "postgresql"):
+                    with connection.cursor() as cur:
+                        cur.execute("ANALYZE")
+                self._report(tenant, opts["runs"])
+                if not opts["keep"]:
+                    raise _Rollback
+        except _Rollback:
+            self.stdout.write("(seed rolled back)")
+
+    # --- hot paths, mirroring the views: (label, queryset, index the plan should use) ---
+    def _queries(self, tenant):
+        today = timezone.localdate()
+        person = Person.objects.filter(tenant=tenant).order_by("pk").first()
+        return [
+            ("calendar_partial: CourtDate(tenant, date)",
+             CourtDate.objects.filter(tenant=tenant, date__gte=today.replace(day=1),
+                                      date__lte=today.replace(day=1) + timedelta(days=41))
+                              .order_by("date", "time", "id"),
+             "core_courtdate_tenant_date_idx"),
+            ("report_bonds_by_date: Bond(tenant, date)",
+             Bond.objects.filter(tenant=tenant, date__gte=today - timedelta(days=30), date__lte=today),
+             "core_bond_tenant_date_idx"),
+            ("report_overdue_invoices: Invoice(tenant, due_date)",
+             Invoice.objects.filter(tenant=tenant, due_date__isnull=False, due_date__lte=today - timedelta(days=30)),
+             "core_invoice_tenant_due_idx"),
+            # the widget reads Person.last_checkin_at; this is the recompute after a CheckIn delete
+            ("refresh_last_checkin: CheckIn(person, created_at)",
+             CheckIn.objects.filter(person=person).order_by("-created_at", "-id")[:1],
+             "core_checkin_person_ts_idx"),
+            ("missed_checkins: Person(tenant, last_checkin_at)",
+             missed_checkins(Person.objects.filter(tenant=tenant), timezone.now() - timedelta(days=14)),
+             "core_person_tenant_lastci_idx"),
+            ("people_tab_list: Person(tenant, last_name, first_name)",
+             Person.objects.filter(tenant=tenant).order_by("last_name", "first_name")[:200],
+             "core_person_tenant_name_idx"),
+        ]
+
+    def _report(self, tenant, runs):
+        self.stdout.write(f"vendor={connection.vendor} tenant={tenant.pk} people={Person.objects.filter(tenant=tenant).count()}")
+        for label, qs, index in self._queries(tenant):
+            timings = []
+            for _ in range(runs):
+                t0 = time.perf_counter()
+                list(qs.all())
+                timings.append((time.perf_counter() - t0) * 1000)
+            plan = qs.explain()
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            self.stdout.write(f"  median {statistics.median(timings):.2f} ms over {runs} runs; {index} used: {index in plan}")
+            for line in plan.splitlines():
+                self.stdout.write(f"    {line}")
+
+    def _seed(self, n_people):
+        rnd = random.Random(42)
+        today = timezone.localdate()
+        user = get_user_model().objects.create(username=f"bench-{int(time.time())}")
+        tenant = Tenant.objects.create(name="Benchmark tenant", user=user)
+        # a few noise tenants so tenant filtering actually has to discriminate
+        others = [Tenant.objects.create(name=f"Noise {i}") for i in range(3)]
+
+        def spread_days(span):
+            return today + timedelta(days=rnd.randint(-span, span))
+
+        for t, count in [(tenant, n_people)] + [(o, n_people // 3) for o in others]:
+            people = Person.objects.bulk_create(
+                [Person(tenant=t, first_name=f"F{i:06d}", last_name=f"L{rnd.randint(0, n_people):06d}",
+                        phone=f"210555{i % 10000:04d}") for i in range(count)],
+                batch_size=1000,
+            )
+            bonds, cds, invs, cis = [], [], [], []
+            for p in people:
+                for _ in range(2):
+                    bonds.append(Bond(tenant=t, person=p, date=spread_days(730),
+                                      amount=Decimal(rnd.randint(500, 50000)), county="Bexar"))
+                    cds.append(CourtDate(tenant=t, person=p, date=spread_days(365), court="County Court"))
+                    invs.append(Invoice(tenant=t, person=p, date=spread_days(730), due_date=spread_days(730),
+                                        amount=Decimal(rnd.randint(50, 5000))))
+                    cis.append(CheckIn(tenant=t, person=p,
+                                       created_at=timezone.now() - timedelta(days=rnd.randint(0, 365))))
+            Bond.objects.bulk_create(bonds, batch_size=1000)
+            CourtDate.objects.bulk_create(cds, batch_size=1000)
+            Invoice.objects.bulk_create(invs, batch_size=1000)
+            CheckIn.objects.bulk_create(cis, batch_size=1000)
+        return tenant
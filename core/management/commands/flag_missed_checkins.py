@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.checkins import flag_missed_checkins
+from core.models import Tenant
+
+
+class Command(BaseCommand):
+    help = (
+        "Flag people past their tenant's check-in interval and queue pushes to "
+        "them and a summary to staff. Run periodically (e.g. hourly from cron); "
+        "each person is alerted at most once per interval."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tenant", type=int, help="Limit to one tenant id.")
+        parser.add_argument("--dry-run", action="store_true", help="Count without queuing or flagging.")
+
+    def handle(self, *args, **opts):
+        tenant = None
+        if opts["tenant"]:
+            tenant = Tenant.objects.filter(pk=opts["tenant"]).first()
+            if tenant is None:
+                raise CommandError(f"Tenant {opts['tenant']} not found.")
+
+        stats = flag_missed_checkins(tenant=tenant, dry_run=opts["dry_run"])
+        self.stdout.write(f"tenants={stats['tenants']} flagged={stats['flagged']} queued={stats['queued']}")
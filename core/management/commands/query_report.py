@@ -0,0 +1,69 @@
+import json
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+
+from core import querystats
+
+
+class Command(BaseCommand):
+    help = (
+        "Per-view SQL query counts, SQL time, total time and response size. "
+        "Reads the QUERY_STATS_LOG written by QueryStatsMiddleware, or requests "
+        "--url pages as --user in this process. --fail-over-budget exits with "
+        "an error when a view went over its QUERY_BUDGETS entry (for CI)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--log", default="", help="JSON-lines stats file (default: settings.QUERY_STATS_LOG).")
+        parser.add_argument("--url", action="append", default=[], help="Request this path (repeatable) instead of reading a log.")
+        parser.add_argument("--user", help="Username to log in as for --url.")
+        parser.add_argument("--repeat", type=int, default=1, help="Requests per --url.")
+        parser.add_argument("--fail-over-budget", action="store_true")
+
+    def handle(self, *args, **opts):
+        if opts["url"]:
+            rows = self._exercise(opts)
+        else:
+            path = opts["log"] or getattr(settings, "QUERY_STATS_LOG", "")
+            if not path:
+                raise CommandError("Pass --log or --url, or set QUERY_STATS_LOG.")
+            try:
+                with open(path, encoding="utf-8") as fh:
+                    rows = querystats.summarize(json.loads(line) for line in fh if line.strip())
+            except FileNotFoundError:
+                raise CommandError(f"{path} not found.")
+
+        self.stdout.write(f"{'view':<40} {'reqs':>5} {'avg q':>6} {'max q':>6} {'budget':>6} {'sql ms':>8} {'total ms':>9} {'bytes':>8}")
+        for r in rows:
+            self.stdout.write(
+                f"{r['view'][:40]:<40} {r['requests']:>5} {r['avg_queries']:>6.1f} {r['max_queries']:>6} "
+                f"{'-' if r['budget'] is None else r['budget']:>6} {r['avg_sql_ms']:>8.1f} {r['avg_total_ms']:>9.1f} "
+                f"{'-' if r['avg_bytes'] is None else int(r['avg_bytes']):>8}"
+                + ("  OVER BUDGET" if r["over_budget"] else "")
+            )
+
+        over = [r["view"] for r in rows if r["over_budget"]]
+        if over and opts["fail_over_budget"]:
+            raise CommandError(f"Over query budget: {', '.join(over)}")
+
+    def _exercise(self, opts):
+        if not opts["user"]:
+            raise CommandError("--url needs --user.")
+        user = get_user_model().objects.filter(username=opts["user"]).first()
+        if user is None:
+            raise CommandError(f"User {opts['user']} not found.")
+
+        client = Client(HTTP_HOST="localhost")  # in ALLOWED_HOSTS
+        client.force_login(user)
+        querystats.reset()
+        # the report decides what fails, so collect every request first
+        with override_settings(QUERY_BUDGET_STRICT=False):
+            for url in opts["url"]:
+                for _ in range(max(1, opts["repeat"])):
+                    resp = client.get(url, secure=True)
+                    if resp.status_code >= 400:
+                        self.stderr.write(f"{url}: HTTP {resp.status_code}")
+        return querystats.rolling_summary()
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import Tenant
+from core.rollups import rebuild_bond_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild (or --verify) the BondDailyRollup table behind the bond reports from Bond rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--verify", action="store_true",
+                            help="Only report drift; exit non-zero if any cell is missing, wrong or stale.")
+        parser.add_argument("--tenant", type=int, help="Limit to one tenant id.")
+
+    def handle(self, *args, **opts):
+        tenant = None
+        if opts["tenant"]:
+            tenant = Tenant.objects.filter(pk=opts["tenant"]).first()
+            if tenant is None:
+                raise CommandError(f"Tenant {opts['tenant']} not found.")
+
+        verify = opts["verify"]
+        with transaction.atomic():
+            stats = rebuild_bond_rollups(tenant=tenant, fix=not verify)
+
+        self.stdout.write(
+            f"checked={stats['checked']} missing={stats['missing']} drifted={stats['drifted']} stale={stats['stale']}"
+            + ("" if verify else " (repaired)")
+        )
+        if verify and (stats["missing"] or stats["drifted"] or stats["stale"]):
+            raise CommandError("BondDailyRollup drift detected; run without --verify to repair.")
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.billing import rebuild_person_balances
+from core.models import Tenant
+
+
+class Command(BaseCommand):
+    help = "Rebuild (or --verify) the denormalized PersonBalance table from invoices and receipts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--verify", action="store_true",
+                            help="Only report drift; exit non-zero if any row is missing or wrong.")
+        parser.add_argument("--tenant", type=int, help="Limit to one tenant id.")
+
+    def handle(self, *args, **opts):
+        tenant = None
+        if opts["tenant"]:
+            tenant = Tenant.objects.filter(pk=opts["tenant"]).first()
+            if tenant is None:
+                raise CommandError(f"Tenant {opts['tenant']} not found.")
+
+        verify = opts["verify"]
+        with transaction.atomic():
+            stats = rebuild_person_balances(tenant=tenant, fix=not verify)
+
+        self.stdout.write(
+            f"checked={stats['checked']} missing={stats['missing']} drifted={stats['drifted']}"
+            + ("" if verify else " (repaired)")
+        )
+        if verify and (stats["missing"] or stats["drifted"]):
+            raise CommandError("PersonBalance drift detected; run without --verify to repair.")
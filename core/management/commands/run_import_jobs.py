@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.importer import claim_import_job, run_import_job
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker for background person imports (ImportJob); uploads up to "
+        "PERSON_IMPORT_INLINE_BYTES run in the request instead. Polls the job "
+        "table; no broker needed. Run one or more alongside the web process."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Drain the queue and exit instead of polling.")
+        parser.add_argument("--sleep", type=float, default=2.0, help="Seconds between polls when idle.")
+        parser.add_argument("--job", type=int, help="Only run this job id.")
+
+    def handle(self, *args, **opts):
+        while True:
+            job = claim_import_job(opts["job"])
+            if job is None:
+                if opts["once"] or opts["job"]:
+                    return
+                time.sleep(opts["sleep"])
+                continue
+            self.stdout.write(f"import job {job.pk}: starting at row {2 + job.rows_done} (attempt {job.attempts})")
+            job = run_import_job(job)
+            self.stdout.write(
+                f"import job {job.pk}: {job.status} rows={job.rows_done}/{job.total_rows} "
+                f"created={job.created_count} updated={job.updated_count} failed={job.failed_count}"
+                + (f" error={job.error}" if job.error else "")
+            )
@@ -0,0 +1,49 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.notifications import claim_due, deliver, retry_later, purge_outbox
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker that drains NotificationOutbox: delivers queued web pushes with "
+        "retry/backoff. Claims at most --batch messages per cycle, so bursts are "
+        "spread out instead of landing on the push services all at once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Drain what is due and exit instead of polling.")
+        parser.add_argument("--batch", type=int, default=50, help="Messages claimed per cycle.")
+        parser.add_argument("--sleep", type=float, default=2.0, help="Seconds between polls when idle.")
+        parser.add_argument("--keep-days", type=int, default=30, help="Purge finished messages older than this.")
+
+    def handle(self, *args, **opts):
+        last_purge = 0.0
+        while True:
+            if time.monotonic() - last_purge > 3600:
+                purged = purge_outbox(opts["keep_days"])
+                if purged:
+                    self.stdout.write(f"outbox: purged {purged} old messages")
+                last_purge = time.monotonic()
+
+            batch = claim_due(opts["batch"])
+            for msg in batch:
+                try:
+                    msg = deliver(msg)
+                except Exception as e:
+                    log.exception("outbox %s: delivery error", msg.pk)
+                    retry_later(msg, str(e))
+                    continue
+                self.stdout.write(
+                    f"outbox {msg.pk}: {msg.status} sent={msg.sent_count} failed={msg.failed_count}"
+                    + (f" error={msg.last_error}" if msg.last_error else "")
+                )
+
+            if not batch:
+                if opts["once"]:
+                    return
+                time.sleep(opts["sleep"])
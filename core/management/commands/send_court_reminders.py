@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Tenant
+from core.reminders import send_due_reminders
+
+
+class Command(BaseCommand):
+    help = (
+        "Queue T-7d / T-1d / T-2h court-date reminders to defendants' devices. "
+        "Safe to rerun: sent reminders are recorded. Run from cron every few "
+        "minutes, or keep it running with --every."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tenant", type=int, help="Limit to one tenant id.")
+        parser.add_argument("--dry-run", action="store_true", help="Count what is due without queuing anything.")
+        parser.add_argument("--every", type=int, default=0, help="Repeat every N seconds instead of running once.")
+
+    def handle(self, *args, **opts):
+        tenant = None
+        if opts["tenant"]:
+            tenant = Tenant.objects.filter(pk=opts["tenant"]).first()
+            if tenant is None:
+                raise CommandError(f"Tenant {opts['tenant']} not found.")
+
+        while True:
+            stats = send_due_reminders(tenant=tenant, dry_run=opts["dry_run"])
+            self.stdout.write(
+                f"scanned={stats['scanned']} {'due' if opts['dry_run'] else 'queued'}={stats['queued']}"
+            )
+            if not opts["every"]:
+                return
+            time.sleep(opts["every"])
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Tenant
+from core.plans import sweep_late_installments
+
+
+class Command(BaseCommand):
+    help = (
+        "Mark unpaid plan installments past their due date as late and deactivate "
+        "plans with nothing left to pay. One UPDATE each; run nightly from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tenant", type=int, help="Limit to one tenant id.")
+        parser.add_argument("--dry-run", action="store_true", help="Count what would change without updating.")
+
+    def handle(self, *args, **opts):
+        tenant = None
+        if opts["tenant"]:
+            tenant = Tenant.objects.filter(pk=opts["tenant"]).first()
+            if tenant is None:
+                raise CommandError(f"Tenant {opts['tenant']} not found.")
+
+        stats = sweep_late_installments(tenant=tenant, dry_run=opts["dry_run"])
+        self.stdout.write(
+            f"late={stats['late']} deactivated={stats['deactivated']}" + (" (dry run)" if opts["dry_run"] else "")
+        )
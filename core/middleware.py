@@ -1,10 +1,19 @@
 
+import time
+from contextlib import ExitStack
+
+from django.db import connections
 from django.utils.deprecation import MiddlewareMixin
 from django.contrib.auth.models import AnonymousUser
 from .models import Tenant
 from django.http import HttpResponseForbidden
+from .querystats import QueryCounter, record
 
 class TenantAttachMiddleware:
+    """
+    Resolves the tenant once per request into request.tenant; views and helpers
+    read it back through core.utils.get_current_tenant.
+    """
     def __init__(self, get_response):
         self.get_response = get_response
 
@@ -12,9 +21,40 @@ class TenantAttachMiddleware:
         request.tenant = None
         if request.user.is_authenticated:
             try:
-                request.tenant = request.user.tenant_profile  # OneToOneField related_name='tenant_profile'
+                request.tenant = request.user.tenant_profile  # loaded with the user by TenantModelBackend
             except Tenant.DoesNotExist:
                 # either create on the fly or block; pick one:
                 # request.tenant = Tenant.objects.create(user=request.user, name=request.user.username)
                 return HttpResponseForbidden("No tenant configured for this user.")
         return self.get_response(request)
+
+
+class QueryStatsMiddleware:
+    """
+    Counts the SQL queries and time of each request (connection.execute_wrapper),
+    adds a Server-Timing header and records the request in core.querystats,
+    which enforces the per-view query budgets. Queries run by a streaming
+    response's iterator happen after this returns and are not counted.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(counter))
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - start) * 1000
+        sql_ms = counter.seconds * 1000
+
+        match = getattr(request, "resolver_match", None)
+        view = (match.view_name if match else "") or request.path
+        size = None if response.streaming else len(response.content)
+        response["Server-Timing"] = (
+            f'db;dur={sql_ms:.1f};desc="{counter.count} queries", '
+            f"app;dur={total_ms - sql_ms:.1f}, total;dur={total_ms:.1f}"
+        )
+        record(view, counter.count, sql_ms, total_ms, size)
+        return response
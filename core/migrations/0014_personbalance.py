@@ -0,0 +1,76 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:37
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import DecimalField, Exists, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_balances(apps, schema_editor):
+    """Same correlated aggregates as core.billing.with_balance_snapshot, one query for everyone."""
+    Person = apps.get_model("core", "Person")
+    Invoice = apps.get_model("core", "Invoice")
+    Receipt = apps.get_model("core", "Receipt")
+    PersonBalance = apps.get_model("core", "PersonBalance")
+
+    money = DecimalField(max_digits=12, decimal_places=2)
+    zero = Value(Decimal("0"), output_field=money)
+    invoice_paid = (Receipt.objects.filter(invoice=OuterRef("pk"))
+                    .values("invoice").annotate(s=Sum("amount")).values("s")[:1])
+    invoiced = (Invoice.objects.filter(person=OuterRef("pk"))
+                .values("person").annotate(s=Sum("amount")).values("s")[:1])
+    paid = (Receipt.objects.filter(invoice__person=OuterRef("pk"))
+            .values("invoice__person").annotate(s=Sum("amount")).values("s")[:1])
+    last_payment = (Receipt.objects.filter(invoice__person=OuterRef("pk"), date__isnull=False)
+                    .order_by("-date").values("date")[:1])
+    oldest_due = (Invoice.objects.filter(person=OuterRef("pk"), due_date__isnull=False)
+                  .annotate(paid=Coalesce(Subquery(invoice_paid, output_field=money), zero))
+                  .annotate(balance=ExpressionWrapper(Coalesce(F("amount"), zero) - F("paid"), output_field=money))
+                  .filter(balance__gt=0)
+                  .order_by("due_date").values("due_date")[:1])
+    snapshots = (Person.objects
+                 .filter(Exists(Invoice.objects.filter(person=OuterRef("pk"))))
+                 .annotate(invoiced_sum=Coalesce(Subquery(invoiced, output_field=money), zero),
+                           paid_sum=Coalesce(Subquery(paid, output_field=money), zero),
+                           last_payment_date=Subquery(last_payment),
+                           oldest_due_date=Subquery(oldest_due))
+                 .values_list("pk", "tenant_id", "invoiced_sum", "paid_sum", "last_payment_date", "oldest_due_date"))
+
+    rows = []
+    for pk, tenant_id, inv, pd, last, oldest in snapshots.iterator(chunk_size=500):
+        rows.append(PersonBalance(
+            person_id=pk, tenant_id=tenant_id, invoiced=inv, paid=pd,
+            balance=inv - pd, last_payment_date=last, oldest_due_date=oldest,
+        ))
+        if len(rows) >= 500:
+            PersonBalance.objects.bulk_create(rows)
+            rows = []
+    PersonBalance.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_pushsubscription_person'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PersonBalance',
+            fields=[
+                ('person', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ledger', serialize=False, to='core.person')),
+                ('invoiced', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('paid', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('balance', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('last_payment_date', models.DateField(blank=True, null=True)),
+                ('oldest_due_date', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='person_balances', to='core.tenant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tenant', 'balance'], name='core_pbal_tenant_balance_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_balances, migrations.RunPython.noop),
+    ]
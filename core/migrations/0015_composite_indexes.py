@@ -0,0 +1,33 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_personbalance'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bond',
+            index=models.Index(fields=['tenant', 'date'], name='core_bond_tenant_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='checkin',
+            index=models.Index(fields=['person', 'created_at'], name='core_checkin_person_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='courtdate',
+            index=models.Index(fields=['tenant', 'date'], name='core_courtdate_tenant_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['tenant', 'due_date'], name='core_invoice_tenant_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='person',
+            index=models.Index(fields=['tenant', 'last_name', 'first_name'], name='core_person_tenant_name_idx'),
+        ),
+    ]
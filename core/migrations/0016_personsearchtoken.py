@@ -0,0 +1,70 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:40
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Frozen copy of core.search.person_tokens as of this migration; later
+# tokenizer changes ship with their own backfill.
+_NON_ALNUM_RE = re.compile(r"[\W_]+")
+_DIGITS_RE = re.compile(r"\D+")
+
+
+def person_tokens(first_name="", last_name="", alias="", phone="", email=""):
+    pairs = set()
+    for v in (first_name, last_name, alias):
+        v = (v or "").lower()
+        pairs.update((w, "name") for w in _NON_ALNUM_RE.split(v) if w)
+        joined = _NON_ALNUM_RE.sub("", v)
+        if joined:
+            pairs.add((joined, "name"))
+    digits = _DIGITS_RE.sub("", phone or "")
+    if digits:
+        pairs.update((digits[i:], "phone") for i in range(max(len(digits) - 3, 1)))
+    email = (email or "").strip().lower()
+    if email:
+        parts = {email}
+        local, _, domain = email.rpartition("@")
+        if local and domain:
+            parts |= {local, domain, "@" + domain}
+            parts.update(w for w in domain.split(".") if w)
+        pairs.update((e[:255], "email") for e in parts)
+    return pairs
+
+
+def backfill_tokens(apps, schema_editor):
+    Person = apps.get_model("core", "Person")
+    PersonSearchToken = apps.get_model("core", "PersonSearchToken")
+    rows = []
+    for p in Person.objects.all().iterator():
+        for tok, kind in person_tokens(p.first_name, p.last_name, p.alias, p.phone, p.email):
+            rows.append(PersonSearchToken(tenant_id=p.tenant_id, person_id=p.pk, token=tok, kind=kind))
+        if len(rows) >= 1000:
+            PersonSearchToken.objects.bulk_create(rows)
+            rows = []
+    PersonSearchToken.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PersonSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=255)),
+                ('kind', models.CharField(choices=[('name', 'Name'), ('phone', 'Phone'), ('email', 'Email')], default='name', max_length=8)),
+                ('person', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='core.person')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='person_search_tokens', to='core.tenant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tenant', 'token'], name='core_pst_tenant_token_idx', opclasses=['int8_ops', 'varchar_pattern_ops'])],
+            },
+        ),
+        migrations.RunPython(backfill_tokens, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_notificationoutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourtDateReminder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('7d', '7 days before'), ('1d', '1 day before'), ('2h', '2 hours before')], max_length=2)),
+                ('event_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('court_date', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reminders', to='core.courtdate')),
+                ('outbox', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.notificationoutbox')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='court_reminders', to='core.tenant')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='courtdatereminder',
+            constraint=models.UniqueConstraint(fields=('court_date', 'kind', 'event_at'), name='core_courtreminder_once'),
+        ),
+    ]
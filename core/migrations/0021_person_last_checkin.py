@@ -0,0 +1,49 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:57
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_last_checkin(apps, schema_editor):
+    Person = apps.get_model("core", "Person")
+    CheckIn = apps.get_model("core", "CheckIn")
+    latest = CheckIn.objects.filter(person=OuterRef("pk")).order_by("-created_at", "-id")
+    (Person.objects
+     .filter(checkins__isnull=False)
+     .update(last_checkin_at=Subquery(latest.values("created_at")[:1]),
+             last_checkin_method=Subquery(latest.values("method")[:1])))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_courtdatereminder'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='person',
+            name='checkin_alerted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='person',
+            name='last_checkin_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='person',
+            name='last_checkin_method',
+            field=models.CharField(blank=True, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='tenant',
+            name='checkin_interval_days',
+            field=models.PositiveSmallIntegerField(default=14),
+        ),
+        migrations.AddIndex(
+            model_name='person',
+            index=models.Index(fields=['tenant', 'last_checkin_at'], name='core_person_tenant_lastci_idx'),
+        ),
+        migrations.RunPython(backfill_last_checkin, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_person_last_checkin'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tenant',
+            name='court_dates_changed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='tenant',
+            name='court_dates_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.0.6 on 2026-10-18 18:06
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_rollups(apps, schema_editor):
+    Bond = apps.get_model("core", "Bond")
+    BondDailyRollup = apps.get_model("core", "BondDailyRollup")
+    amount = Coalesce(F("bond_amount"), F("amount"),
+                      Value(Decimal("0"), output_field=DecimalField(max_digits=12, decimal_places=2)))
+    cells = (Bond.objects
+             .values("tenant_id", "date", "county", "jurisdiction", "offense_type")
+             .annotate(n=Count("id"), s=Sum(amount))
+             .order_by())
+    BondDailyRollup.objects.bulk_create(
+        (BondDailyRollup(tenant_id=c["tenant_id"], date=c["date"], county=c["county"],
+                         jurisdiction=c["jurisdiction"], offense_type=c["offense_type"],
+                         count=c["n"], total=c["s"] or Decimal("0"))
+         for c in cells.iterator()),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_tenant_court_dates_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BondDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(blank=True, null=True)),
+                ('county', models.CharField(blank=True, max_length=200)),
+                ('jurisdiction', models.CharField(blank=True, max_length=200)),
+                ('offense_type', models.CharField(blank=True, max_length=200)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bond_rollups', to='core.tenant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tenant', 'date'], name='core_bondrollup_tenant_date')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='bonddailyrollup',
+            constraint=models.UniqueConstraint(fields=('tenant', 'date', 'county', 'jurisdiction', 'offense_type'), name='core_bondrollup_cell'),
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
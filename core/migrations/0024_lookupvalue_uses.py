@@ -0,0 +1,36 @@
+# Generated by Django 5.0.6 on 2026-10-18 18:07
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_uses(apps, schema_editor):
+    Bond = apps.get_model("core", "Bond")
+    LookupValue = apps.get_model("core", "LookupValue")
+    for category in ("charge", "county", "offense_type", "jurisdiction"):
+        counts = (Bond.objects.exclude(**{category: ""})
+                  .values(category).annotate(n=Count("id")).order_by())
+        for row in counts.iterator():
+            (LookupValue.objects
+             .filter(category=category, value=row[category].strip())
+             .update(uses=row["n"]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_bonddailyrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lookupvalue',
+            name='uses',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='lookupvalue',
+            index=models.Index(fields=['category', '-uses'], name='core_lookup_cat_uses_idx'),
+        ),
+        migrations.RunPython(backfill_uses, migrations.RunPython.noop),
+    ]
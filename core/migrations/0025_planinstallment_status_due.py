@@ -0,0 +1,17 @@
+# Generated by Django 5.0.6 on 2026-10-18 18:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_lookupvalue_uses'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='planinstallment',
+            index=models.Index(fields=['status', 'due_date'], name='core_inst_status_due_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.6 on 2026-10-18 19:05
+
+from django.core.files.base import ContentFile
+from django.db import migrations, models
+
+
+def move_blobs_to_storage(apps, schema_editor):
+    ImportUpload = apps.get_model("core", "ImportUpload")
+    for upload in ImportUpload.objects.iterator(chunk_size=10):
+        upload.file.save(f"{upload.pk}.csv", ContentFile(bytes(upload.data)), save=False)
+        upload.save(update_fields=["file"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_planinstallment_status_due'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importupload',
+            name='file',
+            field=models.FileField(default='', max_length=255, upload_to='imports/%Y/%m/'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(move_blobs_to_storage, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='importupload',
+            name='data',
+        ),
+    ]
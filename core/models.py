@@ -1,3 +1,4 @@
+import uuid
 
 from django.db import models
 from django.conf import settings
@@ -7,6 +8,11 @@ from decimal import Decimal
 class Tenant(models.Model):
     name = models.CharField(max_length=200)
     user = models.OneToOneField(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.CASCADE, related_name='tenant_profile')
+    # people not checked in for this many days are flagged by `manage.py flag_missed_checkins` (0 = off)
+    checkin_interval_days = models.PositiveSmallIntegerField(default=14)
+    # bumped on every CourtDate write (core.signals); keys the cached ICS feeds
+    court_dates_version = models.PositiveIntegerField(default=0, editable=False)
+    court_dates_changed_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     def __str__(self):
         return self.name
@@ -24,6 +30,18 @@ class Person(models.Model):
     dob = models.DateField(null=True, blank=True)
     alias = models.CharField(max_length=100, blank=True)
     notes = models.TextField(blank=True)
+    # maintained from CheckIn writes by core.signals (see core.checkins)
+    last_checkin_at = models.DateTimeField(null=True, blank=True, editable=False)
+    last_checkin_method = models.CharField(max_length=20, blank=True, editable=False)
+    checkin_alerted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # people_tab_list: tenant-scoped, ordered by last/first name
+            models.Index(fields=["tenant", "last_name", "first_name"], name="core_person_tenant_name_idx"),
+            # missed check-in report + flag_missed_checkins
+            models.Index(fields=["tenant", "last_checkin_at"], name="core_person_tenant_lastci_idx"),
+        ]
 
     @property
     def full_name(self):
@@ -32,6 +50,38 @@ class Person(models.Model):
     def __str__(self):
         return self.full_name or f"Person {self.pk}"
 
+class PersonSearchToken(models.Model):
+    """
+    Normalized search terms for a Person (lowercase name words, digits-only
+    phone and its tails, lowercase email and its parts). Rebuilt on every
+    Person save by core.signals; people_tab_list prefix-matches against the
+    (tenant, token) index.
+    """
+    KIND_NAME = "name"
+    KIND_PHONE = "phone"
+    KIND_EMAIL = "email"
+    KIND_CHOICES = [
+        (KIND_NAME, "Name"),
+        (KIND_PHONE, "Phone"),
+        (KIND_EMAIL, "Email"),
+    ]
+
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name="person_search_tokens")
+    person = models.ForeignKey(Person, on_delete=models.CASCADE, related_name="search_tokens")
+    token = models.CharField(max_length=255)
+    kind = models.CharField(max_length=8, choices=KIND_CHOICES, default=KIND_NAME)
+
+    class Meta:
+        indexes = [
+            # pattern_ops so Postgres serves LIKE 'term%' from the index under any collation
+            # (opclasses are ignored on SQLite)
+            models.Index(fields=["tenant", "token"], name="core_pst_tenant_token_idx",
+                         opclasses=["int8_ops", "varchar_pattern_ops"]),
+        ]
+
+    def __str__(self):
+        return f"{self.person_id}: {self.token}"
+
 class Indemnitor(models.Model):
     tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='indemnitors')
     person = models.ForeignKey(Person, on_delete=models.CASCADE, related_name='indemnitors')
@@ -68,6 +118,11 @@ class Bond(models.Model):
     county = models.CharField(max_length=200, blank=True)
     charge = models.CharField(max_length=255, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["tenant", "date"], name="core_bond_tenant_date_idx"),
+        ]
+
     def __str__(self):
         base = self.offense_type or self.charge or 'Bond'
         return f"{base} - {self.person.full_name if hasattr(self.person, 'full_name') else self.person_id}"
@@ -83,6 +138,11 @@ class CourtDate(models.Model):
     case_number = models.CharField(max_length=100, blank=True)
     notes = models.TextField(blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["tenant", "date"], name="core_courtdate_tenant_date_idx"),
+        ]
+
     def __str__(self):
         base = self.court or 'Court'
         return f"{self.date or ''} {self.time or ''} - {base}"
@@ -107,6 +167,10 @@ class CheckIn(models.Model):
 
     class Meta:
         ordering = ['-id']  # newest first
+        indexes = [
+            # last check-in per person (widget + missed check-in report)
+            models.Index(fields=["person", "created_at"], name="core_checkin_person_ts_idx"),
+        ]
 
     def __str__(self):
         return f"{self.person_id} - {self.get_method_display()}"
@@ -132,6 +196,9 @@ class Invoice(models.Model):
 
     class Meta:
         ordering = ["-date", "-id"]
+        indexes = [
+            models.Index(fields=["tenant", "due_date"], name="core_invoice_tenant_due_idx"),
+        ]
 
     def __str__(self):
         return f"{self.number or 'Invoice'} - {self.person_id}"
@@ -162,6 +229,51 @@ class Receipt(models.Model):
     def __str__(self):
         return f"Receipt {self.pk} - {self.invoice_id}"
 
+class PersonBalance(models.Model):
+    """
+    Denormalized billing totals per person. Kept current by core.signals on
+    every Invoice/Receipt write; `manage.py rebuild_person_balances` repairs drift.
+    """
+    person = models.OneToOneField(Person, on_delete=models.CASCADE, primary_key=True, related_name="ledger")
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name="person_balances")
+    invoiced = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+    paid = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+    balance = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+    last_payment_date = models.DateField(null=True, blank=True)
+    oldest_due_date = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["tenant", "balance"], name="core_pbal_tenant_balance_idx")]
+
+    def __str__(self):
+        return f"{self.person_id}: {self.balance}"
+
+class BondDailyRollup(models.Model):
+    """
+    Bond count and total (Coalesce(bond_amount, amount)) per tenant, day, county,
+    jurisdiction and offense type. Kept current by core.signals on every Bond
+    write; `manage.py rebuild_bond_rollups` repairs drift. The bond reports read
+    from here instead of grouping Bond rows.
+    """
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name="bond_rollups")
+    date = models.DateField(null=True, blank=True)
+    county = models.CharField(max_length=200, blank=True)
+    jurisdiction = models.CharField(max_length=200, blank=True)
+    offense_type = models.CharField(max_length=200, blank=True)
+    count = models.PositiveIntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["tenant", "date", "county", "jurisdiction", "offense_type"],
+                                    name="core_bondrollup_cell"),
+        ]
+        indexes = [models.Index(fields=["tenant", "date"], name="core_bondrollup_tenant_date")]
+
+    def __str__(self):
+        return f"{self.date} {self.county}: {self.count} / {self.total}"
+
 class PaymentPlan(models.Model):
     FREQ_WEEKLY = "weekly"
     FREQ_BIWEEKLY = "biweekly"
@@ -189,12 +301,7 @@ class PaymentPlan(models.Model):
         return self.installment_amount * self.n_payments
 
     def next_due(self):
-        return self.installments.filter(status=PlanInstallment.STATUS_DUE).order_by("due_date").first()
-
-    def recalc_status(self):
-        if not self.installments.exclude(status=PlanInstallment.STATUS_PAID).exists():
-            self.active = False
-            self.save(update_fields=["active"])
+        return self.installments.exclude(status=PlanInstallment.STATUS_PAID).order_by("due_date").first()
 
 
 class PlanInstallment(models.Model):
@@ -217,6 +324,8 @@ class PlanInstallment(models.Model):
     class Meta:
         unique_together = [("plan", "sequence")]
         ordering = ["due_date"]
+        # late sweep (core.plans.sweep_late_installments)
+        indexes = [models.Index(fields=["status", "due_date"], name="core_inst_status_due_idx")]
 
     def __str__(self):
         return f"{self.plan} / #{self.sequence} {self.due_date} {self.amount}"
@@ -225,7 +334,6 @@ class PlanInstallment(models.Model):
         self.status = self.STATUS_PAID
         self.paid_at = timezone.now()
         self.save(update_fields=["status", "paid_at"])
-        self.plan.recalc_status()
 
 class LookupValue(models.Model):
     CATEGORY_CHOICES = [
@@ -236,12 +344,15 @@ class LookupValue(models.Model):
     ]
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
     value = models.CharField(max_length=255)
+    # bonds saved with this value; suggestions are ranked by it (core.lookups)
+    uses = models.PositiveIntegerField(default=0)
 
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         unique_together = ("category", "value")
         ordering = ["category", "value"]
+        indexes = [models.Index(fields=["category", "-uses"], name="core_lookup_cat_uses_idx")]
 
     def __str__(self):
         return f"{self.category}: {self.value}"
@@ -256,3 +367,180 @@ class PushSubscription(models.Model):
     auth     = models.CharField(max_length=255)
     created_at = models.DateTimeField(auto_now_add=True)
 
+
+
+class ImportUpload(models.Model):
+    """
+    A CSV staged server-side between the import preview and import steps.
+    The form only carries the id; the upload is streamed to `file` (default
+    storage, under MEDIA_ROOT/imports) and rows are parsed from it on demand.
+    core.signals deletes the file with the row.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name="import_uploads")
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL)
+    filename = models.CharField(max_length=255, blank=True)
+    size = models.PositiveIntegerField(default=0)
+    file = models.FileField(upload_to="imports/%Y/%m/", max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.filename or 'upload'} ({self.size} bytes)"
+
+
+class ImportJob(models.Model):
+    """
+    A person import run by `manage.py run_import_jobs` instead of in the request.
+    Each chunk commits together with rows_done and the counters, so a failed or
+    interrupted job resumes from its last committed chunk.
+    """
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name="import_jobs")
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL)
+    upload = models.ForeignKey(ImportUpload, null=True, blank=True, on_delete=models.SET_NULL, related_name="jobs")
+    filename = models.CharField(max_length=255, blank=True)
+    mapping = models.JSONField(default=dict)  # {"<csv column index>": "<Person field>"}
+    dedupe_by_phone = models.BooleanField(default=False)
+    commit = models.BooleanField(default=True)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    total_rows = models.PositiveIntegerField(null=True, blank=True)
+    rows_done = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    updated_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at", "-id"]
+        indexes = [models.Index(fields=["status", "heartbeat_at"], name="core_importjob_status_idx")]
+
+    def __str__(self):
+        return f"Import #{self.pk} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
+
+    @property
+    def waiting_minutes(self):
+        """Minutes a queued job has gone without a worker picking it up (again)."""
+        if self.status != self.STATUS_QUEUED:
+            return 0
+        return int((timezone.now() - (self.heartbeat_at or self.created_at)).total_seconds() // 60)
+
+    @property
+    def percent(self):
+        if not self.total_rows:
+            return 100 if self.status == self.STATUS_DONE else 0
+        return min(100, int(self.rows_done * 100 / self.total_rows))
+
+
+class ImportJobRow(models.Model):
+    """Per-row outcome of an ImportJob (replaces the in-memory first-200 list)."""
+    job = models.ForeignKey(ImportJob, on_delete=models.CASCADE, related_name="rows")
+    row_number = models.PositiveIntegerField()
+    ok = models.BooleanField(default=True)
+    msg = models.CharField(max_length=500)
+
+    class Meta:
+        ordering = ["row_number"]
+        indexes = [models.Index(fields=["job", "ok", "row_number"], name="core_importjobrow_job_idx")]
+
+    def __str__(self):
+        return f"#{self.job_id} row {self.row_number}: {self.msg}"
+
+
+class NotificationOutbox(models.Model):
+    """
+    A queued web push. Views only insert rows; `manage.py run_outbox` delivers
+    them with retry/backoff. person=None means the tenant's staff devices
+    (subscriptions without a person).
+    """
+    STATUS_PENDING = "pending"
+    STATUS_SENDING = "sending"
+    STATUS_SENT = "sent"
+    STATUS_FAILED = "failed"
+    STATUS_EXPIRED = "expired"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_SENDING, "Sending"),
+        (STATUS_SENT, "Sent"),
+        (STATUS_FAILED, "Failed"),
+        (STATUS_EXPIRED, "Expired"),
+    ]
+    URGENCY_CHOICES = [
+        ("very-low", "Very low"),
+        ("low", "Low"),
+        ("normal", "Normal"),
+        ("high", "High"),
+    ]
+
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name="outbox")
+    person = models.ForeignKey(Person, null=True, blank=True, on_delete=models.CASCADE, related_name="outbox")
+    payload = models.JSONField(default=dict)
+    ttl = models.PositiveIntegerField(default=86400)  # seconds the message stays deliverable
+    urgency = models.CharField(max_length=10, choices=URGENCY_CHOICES, default="normal")
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)  # also the lease while sending
+    sent_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    outcomes = models.JSONField(default=dict, blank=True)  # {"<subscription id>": [http status, error]}
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "next_attempt_at"], name="core_outbox_due_idx")]
+
+    def __str__(self):
+        return f"Outbox #{self.pk} ({self.status})"
+
+
+class CourtDateReminder(models.Model):
+    """
+    One reminder sent for a court date, so `manage.py send_court_reminders`
+    never sends the same one twice. event_at is part of the key: moving the
+    court date makes its reminders due again.
+    """
+    KIND_7D = "7d"
+    KIND_1D = "1d"
+    KIND_2H = "2h"
+    KIND_CHOICES = [
+        (KIND_7D, "7 days before"),
+        (KIND_1D, "1 day before"),
+        (KIND_2H, "2 hours before"),
+    ]
+
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name="court_reminders")
+    court_date = models.ForeignKey(CourtDate, on_delete=models.CASCADE, related_name="reminders")
+    kind = models.CharField(max_length=2, choices=KIND_CHOICES)
+    event_at = models.DateTimeField()
+    outbox = models.ForeignKey(NotificationOutbox, null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["court_date", "kind", "event_at"], name="core_courtreminder_once"),
+        ]
+
+    def __str__(self):
+        return f"{self.court_date_id} {self.kind} @ {self.event_at}"
@@ -0,0 +1,122 @@
+# core/notifications.py
+"""
+Outbound notification queue (NotificationOutbox).
+
+Views call enqueue_push() and return; `manage.py run_outbox` claims due rows
+and delivers them through core.push. Endpoints that fail transiently are
+retried with exponential backoff, and endpoints that already got a message are
+skipped on the retry. A message whose TTL has run out is marked expired instead
+of being delivered late.
+"""
+import datetime
+import logging
+
+from django.db.models import F
+from django.utils import timezone
+
+from .models import NotificationOutbox, PushSubscription
+from .push import send_push, DEAD_STATUSES
+
+log = logging.getLogger(__name__)
+
+DEFAULT_TTL = 24 * 3600
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 30  # seconds: 30s, 1m, 2m, 4m, ...
+BACKOFF_MAX = 3600
+LEASE = datetime.timedelta(minutes=5)  # a "sending" row older than this is reclaimed
+
+
+def enqueue_push(tenant, payload: dict, person=None, ttl: int = DEFAULT_TTL,
+                 urgency: str = "normal", send_at=None) -> NotificationOutbox:
+    """Queue a push to a person's devices, or to the tenant's staff devices when person is None."""
+    return NotificationOutbox.objects.create(
+        tenant=tenant,
+        person=person,
+        payload=payload,
+        ttl=ttl,
+        urgency=urgency,
+        next_attempt_at=send_at or timezone.now(),
+    )
+
+
+def _backoff(attempts: int) -> datetime.timedelta:
+    return datetime.timedelta(seconds=min(BACKOFF_MAX, BACKOFF_BASE * 2 ** max(0, attempts - 1)))
+
+
+def claim_due(limit: int = 50):
+    """
+    Claim up to `limit` due messages (pending, or sending with an expired lease).
+    Each claim is a conditional UPDATE, so concurrent workers never share a row.
+    """
+    now = timezone.now()
+    due = (NotificationOutbox.objects
+           .filter(status__in=[NotificationOutbox.STATUS_PENDING, NotificationOutbox.STATUS_SENDING],
+                   next_attempt_at__lte=now)
+           .order_by("next_attempt_at", "pk")
+           .values_list("pk", "status", "next_attempt_at")[:limit])
+    claimed = []
+    for pk, status, next_at in due:
+        if (NotificationOutbox.objects
+                .filter(pk=pk, status=status, next_attempt_at=next_at)
+                .update(status=NotificationOutbox.STATUS_SENDING, next_attempt_at=now + LEASE,
+                        attempts=F("attempts") + 1)):
+            claimed.append(pk)
+    return list(NotificationOutbox.objects.filter(pk__in=claimed).order_by("pk"))
+
+
+def deliver(msg: NotificationOutbox) -> NotificationOutbox:
+    """Send one claimed message and record the outcome on the row."""
+    now = timezone.now()
+    remaining = msg.ttl - int((now - msg.created_at).total_seconds())
+    if remaining <= 0:
+        msg.status = NotificationOutbox.STATUS_EXPIRED
+        msg.save(update_fields=["status"])
+        return msg
+
+    subs = PushSubscription.objects.filter(tenant_id=msg.tenant_id, person_id=msg.person_id)
+    delivered = [int(pk) for pk, (_, error) in msg.outcomes.items() if not error]
+    if delivered:
+        subs = subs.exclude(pk__in=delivered)
+
+    # the push service keeps it only for what is left of our TTL
+    res = send_push(subs, msg.payload, ttl=remaining, urgency=msg.urgency)
+
+    outcomes = dict(msg.outcomes)
+    outcomes.update({str(pk): [status, error] for pk, (status, error) in res["outcomes"].items()})
+    retryable = [error for status, error in res["outcomes"].values() if error and status not in DEAD_STATUSES]
+
+    msg.outcomes = outcomes
+    msg.sent_count += res["sent"]
+    msg.failed_count = sum(1 for _, error in outcomes.values() if error)
+    msg.last_error = retryable[0] if retryable else ""
+    if not retryable:
+        msg.status = NotificationOutbox.STATUS_SENT
+        msg.sent_at = now
+    elif msg.attempts < MAX_ATTEMPTS:
+        msg.status = NotificationOutbox.STATUS_PENDING
+        msg.next_attempt_at = now + _backoff(msg.attempts)
+    else:
+        msg.status = NotificationOutbox.STATUS_FAILED
+    msg.save(update_fields=["outcomes", "sent_count", "failed_count", "last_error",
+                            "status", "sent_at", "next_attempt_at"])
+    return msg
+
+
+def retry_later(msg: NotificationOutbox, error: str):
+    """Put a message back after an unexpected error in deliver()."""
+    give_up = msg.attempts >= MAX_ATTEMPTS
+    NotificationOutbox.objects.filter(pk=msg.pk).update(
+        status=NotificationOutbox.STATUS_FAILED if give_up else NotificationOutbox.STATUS_PENDING,
+        next_attempt_at=timezone.now() + _backoff(msg.attempts),
+        last_error=error[:2000],
+    )
+
+
+def purge_outbox(days: int = 30) -> int:
+    """Delete finished messages older than `days`."""
+    cutoff = timezone.now() - datetime.timedelta(days=days)
+    deleted, _ = (NotificationOutbox.objects
+                  .filter(created_at__lt=cutoff)
+                  .exclude(status__in=[NotificationOutbox.STATUS_PENDING, NotificationOutbox.STATUS_SENDING])
+                  .delete())
+    return deleted
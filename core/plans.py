@@ -0,0 +1,111 @@
+# core/plans.py
+"""
+Payment plan schedules.
+
+schedule() gives every due date of a plan in one pass. Each date is computed
+from the start date and the sequence number, never from the previous
+installment, so a plan starting on Jan 31 is due Feb 28/29, Mar 31, Apr 30 and
+so on, with no day-of-month drift. create_installments() inserts them with a
+single bulk_create; reschedule() diffs an edited plan against its existing
+installments and touches only the rows that changed. Paid installments are
+never modified. sweep_late_installments() (`manage.py sweep_payment_plans`,
+nightly) marks overdue installments late and retires finished plans with one
+set-based UPDATE each.
+"""
+import calendar
+import datetime
+
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import PaymentPlan, PlanInstallment
+
+STEP_DAYS = {PaymentPlan.FREQ_WEEKLY: 7, PaymentPlan.FREQ_BIWEEKLY: 14}
+
+
+def add_months(d: datetime.date, months: int) -> datetime.date:
+    """Same day `months` calendar months later, clamped to the end of shorter months."""
+    y, m = divmod(d.month - 1 + months, 12)
+    y += d.year
+    m += 1
+    return datetime.date(y, m, min(d.day, calendar.monthrange(y, m)[1]))
+
+
+def schedule(start: datetime.date, frequency: str, n: int) -> list:
+    """Due dates for installments 1..n."""
+    if frequency == PaymentPlan.FREQ_MONTHLY:
+        return [add_months(start, i) for i in range(n)]
+    step = datetime.timedelta(days=STEP_DAYS[frequency])
+    return [start + step * i for i in range(n)]
+
+
+def create_installments(plan: PaymentPlan) -> list:
+    return PlanInstallment.objects.bulk_create([
+        PlanInstallment(plan=plan, sequence=i, due_date=due, amount=plan.installment_amount)
+        for i, due in enumerate(schedule(plan.start_date, plan.frequency, plan.n_payments), start=1)
+    ])
+
+
+def reschedule(plan: PaymentPlan) -> dict:
+    """
+    Bring the plan's installments in line with its start date, frequency,
+    count and amount. Unpaid rows that moved are updated in place and set back
+    to due (the late sweep re-marks them if needed). Missing ones are created,
+    and unpaid ones past the new count are deleted. Returns
+    {"created", "updated", "deleted"}.
+    """
+    wanted = dict(enumerate(schedule(plan.start_date, plan.frequency, plan.n_payments), start=1))
+    existing = {it.sequence: it for it in plan.installments.all()}
+
+    to_create, to_update, to_delete = [], [], []
+    for seq, due in wanted.items():
+        it = existing.get(seq)
+        if it is None:
+            to_create.append(PlanInstallment(plan=plan, sequence=seq, due_date=due, amount=plan.installment_amount))
+        elif it.status != PlanInstallment.STATUS_PAID and (it.due_date != due or it.amount != plan.installment_amount):
+            it.due_date, it.amount, it.status = due, plan.installment_amount, PlanInstallment.STATUS_DUE
+            to_update.append(it)
+    for seq, it in existing.items():
+        if seq not in wanted and it.status != PlanInstallment.STATUS_PAID:
+            to_delete.append(it.pk)
+
+    PlanInstallment.objects.bulk_create(to_create)
+    PlanInstallment.objects.bulk_update(to_update, ["due_date", "amount", "status"])
+    PlanInstallment.objects.filter(pk__in=to_delete).delete()
+    return {"created": len(to_create), "updated": len(to_update), "deleted": len(to_delete)}
+
+
+def _unpaid():
+    return Exists(PlanInstallment.objects
+                  .filter(plan_id=OuterRef("pk"))
+                  .exclude(status=PlanInstallment.STATUS_PAID))
+
+
+def deactivate_finished_plans(plans=None) -> int:
+    """Set active=False on every active plan with nothing left to pay, in one UPDATE."""
+    qs = PaymentPlan.objects.filter(active=True)
+    if plans is not None:
+        qs = qs.filter(pk__in=plans)
+    return qs.exclude(_unpaid()).update(active=False)
+
+
+def sweep_late_installments(today=None, tenant=None, dry_run=False) -> dict:
+    """
+    Mark every unpaid installment due before today as late (one UPDATE) and
+    deactivate finished plans (one UPDATE). Returns {"late", "deactivated"}.
+    """
+    today = today or timezone.localdate()
+    late = PlanInstallment.objects.filter(status=PlanInstallment.STATUS_DUE, due_date__lt=today)
+    plans = None
+    if tenant is not None:
+        late = late.filter(plan__person__tenant=tenant)
+        plans = PaymentPlan.objects.filter(person__tenant=tenant).values("pk")
+    if dry_run:
+        finished = PaymentPlan.objects.filter(active=True).exclude(_unpaid())
+        if plans is not None:
+            finished = finished.filter(pk__in=plans)
+        return {"late": late.count(), "deactivated": finished.count()}
+    return {
+        "late": late.update(status=PlanInstallment.STATUS_LATE),
+        "deactivated": deactivate_finished_plans(plans),
+    }
@@ -0,0 +1,124 @@
+# core/push.py
+"""
+Web-push fan-out.
+
+Sends go out concurrently from a bounded thread pool. Each push-service host
+(fcm.googleapis.com, updates.push.services.mozilla.com, web.push.apple.com, ...)
+gets one keep-alive requests.Session, reused across calls in this process, and
+the signed VAPID header is cached per host until shortly before it expires.
+A tenant with hundreds of devices is notified in about one round trip instead
+of one per device.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+from django.conf import settings
+from py_vapid import Vapid
+from pywebpush import WebPusher
+
+from .models import PushSubscription
+
+log = logging.getLogger(__name__)
+
+MAX_WORKERS = 16
+TIMEOUT = 10  # seconds per push-service request
+VAPID_TTL = 12 * 3600  # JWT lifetime; re-signed an hour before expiry
+DEAD_STATUSES = (404, 410)  # the push service says the subscription is gone
+
+_lock = threading.Lock()
+_sessions = {}
+_vapid_headers = {}
+_vapid_key = None
+
+
+def _max_workers():
+    return getattr(settings, "PUSH_MAX_WORKERS", MAX_WORKERS)
+
+
+def _session_for(origin: str) -> requests.Session:
+    with _lock:
+        session = _sessions.get(origin)
+        if session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=_max_workers())
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[origin] = session
+        return session
+
+
+def _auth_headers(origin: str) -> dict:
+    """VAPID Authorization header for one push-service origin (aud), cached."""
+    global _vapid_key
+    now = int(time.time())
+    with _lock:
+        cached = _vapid_headers.get(origin)
+        if cached and cached[0] - 3600 > now:
+            return dict(cached[1])
+        if _vapid_key is None:
+            key = settings.VAPID_PRIVATE_KEY
+            # same forms webpush() accepts: a key file path or the key itself
+            _vapid_key = Vapid.from_file(key) if os.path.isfile(key) else Vapid.from_string(private_key=key)
+        exp = now + VAPID_TTL
+        headers = _vapid_key.sign({"sub": settings.VAPID_CLAIM_EMAIL, "aud": origin, "exp": exp})
+        _vapid_headers[origin] = (exp, headers)
+        return dict(headers)
+
+
+def _send_one(sub: PushSubscription, data: str, ttl: int, urgency: str):
+    """(subscription pk, HTTP status or None, error text) for one endpoint."""
+    url = urlparse(sub.endpoint)
+    origin = f"{url.scheme}://{url.netloc}"
+    try:
+        headers = _auth_headers(origin)
+        if urgency:
+            headers["Urgency"] = urgency
+        resp = WebPusher(
+            {"endpoint": sub.endpoint, "keys": {"p256dh": sub.p256dh, "auth": sub.auth}},
+            requests_session=_session_for(origin),
+        ).send(data, headers, ttl=ttl, timeout=TIMEOUT)
+    except Exception as e:  # network errors, bad keys
+        return sub.pk, None, str(e)
+    if resp.status_code > 202:
+        return sub.pk, resp.status_code, f"Push failed: {resp.status_code} {resp.reason}"
+    return sub.pk, resp.status_code, ""
+
+
+def send_push(subscriptions, payload: dict, ttl: int = 0, urgency: str = ""):
+    """
+    Send `payload` to every subscription concurrently. Endpoints the push
+    service reports as gone (404/410) are deleted in one query.
+    Returns {"sent", "failed", "errors", "removed", "outcomes"}; outcomes is
+    {subscription pk: (status, error)}.
+    """
+    subs = list(subscriptions)
+    result = {"sent": 0, "failed": 0, "errors": [], "removed": 0, "outcomes": {}}
+    if not subs:
+        return result
+
+    data = json.dumps(payload)
+    workers = max(1, min(_max_workers(), len(subs)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="webpush") as pool:
+        outcomes = list(pool.map(lambda s: _send_one(s, data, ttl, urgency), subs))
+
+    dead = []
+    for pk, status, error in outcomes:
+        result["outcomes"][pk] = (status, error)
+        if not error:
+            result["sent"] += 1
+            continue
+        result["failed"] += 1
+        result["errors"].append(error)
+        if status in DEAD_STATUSES:
+            dead.append(pk)
+    if dead:
+        result["removed"], _ = PushSubscription.objects.filter(pk__in=dead).delete()
+    if result["failed"]:
+        log.info("web push: sent=%s failed=%s removed=%s", result["sent"], result["failed"], result["removed"])
+    return result
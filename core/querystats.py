@@ -0,0 +1,135 @@
+# core/querystats.py
+"""
+Per-request SQL accounting for QueryStatsMiddleware.
+
+QueryCounter is a connection.execute_wrapper that counts the queries and SQL
+time of one request. record() adds each request to a rolling in-process
+summary, keyed by URL name and keeping the last ROLLING_WINDOW samples per
+view. If settings.QUERY_STATS_LOG is set, record() also writes the request as
+a JSON line to that file, so `manage.py query_report` can summarise traffic
+served by other processes. The file is written through a WatchedFileHandler,
+which serialises writers within the process and reopens the file after
+logrotate moves it.
+
+Budgets: settings.QUERY_BUDGETS maps URL names to a maximum query count. Views
+not listed there use settings.QUERY_BUDGET_DEFAULT (None means no limit). A
+request over budget is logged. With settings.QUERY_BUDGET_STRICT it raises
+QueryBudgetExceeded instead, which fails the test that made the request.
+"""
+import json
+import logging
+import logging.handlers
+import statistics
+import threading
+import time
+from collections import defaultdict, deque
+
+from django.conf import settings
+
+log = logging.getLogger(__name__)
+
+ROLLING_WINDOW = 200
+
+_lock = threading.Lock()
+_samples = defaultdict(lambda: deque(maxlen=ROLLING_WINDOW))
+
+_stats_log = logging.getLogger("core.querystats.samples")
+_stats_log.propagate = False
+_stats_log.setLevel(logging.INFO)
+_stats_path = None
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+def budget_for(view: str):
+    return getattr(settings, "QUERY_BUDGETS", {}).get(view, getattr(settings, "QUERY_BUDGET_DEFAULT", None))
+
+
+def record(view: str, queries: int, sql_ms: float, total_ms: float, size) -> dict:
+    sample = {
+        "view": view,
+        "queries": queries,
+        "sql_ms": round(sql_ms, 2),
+        "total_ms": round(total_ms, 2),
+        "bytes": size,
+        "budget": budget_for(view),
+    }
+    with _lock:
+        _samples[view].append(sample)
+    path = getattr(settings, "QUERY_STATS_LOG", "")
+    if path:
+        _stats_logger(path).info(json.dumps(sample))
+
+    budget = sample["budget"]
+    if budget is not None and queries > budget:
+        msg = f"{view}: {queries} queries (budget {budget})"
+        if getattr(settings, "QUERY_BUDGET_STRICT", False):
+            raise QueryBudgetExceeded(msg)
+        log.warning("query budget exceeded: %s", msg)
+    return sample
+
+
+def _stats_logger(path: str) -> logging.Logger:
+    """The samples logger, with its one handler pointed at `path`."""
+    global _stats_path
+    with _lock:
+        if path != _stats_path:
+            for handler in list(_stats_log.handlers):
+                _stats_log.removeHandler(handler)
+                handler.close()
+            handler = logging.handlers.WatchedFileHandler(path, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            _stats_log.addHandler(handler)
+            _stats_path = path
+    return _stats_log
+
+
+def summarize(samples) -> list:
+    """Per-view rows (most queries first) from an iterable of record() samples."""
+    by_view = defaultdict(list)
+    for s in samples:
+        by_view[s["view"]].append(s)
+    rows = []
+    for view, group in by_view.items():
+        queries = [s["queries"] for s in group]
+        budget = group[-1].get("budget")
+        sizes = [s["bytes"] for s in group if s["bytes"] is not None]  # streamed responses have no size
+        rows.append({
+            "view": view,
+            "requests": len(group),
+            "avg_queries": statistics.fmean(queries),
+            "max_queries": max(queries),
+            "avg_sql_ms": statistics.fmean(s["sql_ms"] for s in group),
+            "avg_total_ms": statistics.fmean(s["total_ms"] for s in group),
+            "avg_bytes": statistics.fmean(sizes) if sizes else None,
+            "budget": budget,
+            "over_budget": sum(1 for q in queries if budget is not None and q > budget),
+        })
+    return sorted(rows, key=lambda r: (-r["max_queries"], r["view"]))
+
+
+def rolling_summary() -> list:
+    with _lock:
+        samples = [s for group in _samples.values() for s in group]
+    return summarize(samples)
+
+
+def reset():
+    with _lock:
+        _samples.clear()
@@ -0,0 +1,130 @@
+# core/reminders.py
+"""
+Court-date reminders (T-7d, T-1d, T-2h) for defendants with push devices.
+
+send_due_reminders() scans a sliding window (today .. today+7d) per tenant
+on the CourtDate(tenant, date) index. At any moment at most one reminder
+kind is "current" for a court date. A court date added two days out gets
+the 1-day reminder, not a late 7-day one. Each sent reminder is recorded in
+CourtDateReminder, so reruns are idempotent. Messages go out through the
+notification outbox.
+"""
+import datetime
+import logging
+
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import CourtDate, CourtDateReminder, NotificationOutbox, PushSubscription, Tenant
+
+log = logging.getLogger(__name__)
+
+# (kind, lead time), longest lead first
+REMINDERS = [
+    (CourtDateReminder.KIND_7D, datetime.timedelta(days=7)),
+    (CourtDateReminder.KIND_1D, datetime.timedelta(days=1)),
+    (CourtDateReminder.KIND_2H, datetime.timedelta(hours=2)),
+]
+URGENCY = {CourtDateReminder.KIND_7D: "low", CourtDateReminder.KIND_1D: "normal", CourtDateReminder.KIND_2H: "high"}
+WHEN_TEXT = {CourtDateReminder.KIND_7D: "in one week", CourtDateReminder.KIND_1D: "tomorrow", CourtDateReminder.KIND_2H: "in 2 hours"}
+ALL_DAY_AT = datetime.time(9, 0)  # court dates without a time are scheduled as if at 9:00
+BATCH_SIZE = 500
+
+
+def court_datetime(d: datetime.date, t) -> datetime.datetime:
+    return timezone.make_aware(datetime.datetime.combine(d, t or ALL_DAY_AT), timezone.get_current_timezone())
+
+
+def current_kind(event_at: datetime.datetime, now: datetime.datetime):
+    """The reminder whose window [event - lead, event - next lead) contains now, if any."""
+    for i, (kind, lead) in enumerate(REMINDERS):
+        next_lead = REMINDERS[i + 1][1] if i + 1 < len(REMINDERS) else datetime.timedelta(0)
+        if event_at - lead <= now < event_at - next_lead:
+            return kind
+    return None
+
+
+def _payload(cd: CourtDate, kind: str, event_at: datetime.datetime) -> dict:
+    local = timezone.localtime(event_at)
+    when = f"{local:%a %b} {local.day}"
+    if cd.time:
+        when += f" at {local:%I:%M %p}".replace(" 0", " ")
+    where = ", ".join(x for x in (cd.court, cd.location) if x) or "court"
+    return {
+        "title": f"Court {WHEN_TEXT[kind]}",
+        "body": f"{where}: {when}" + (f" (case {cd.case_number})" if cd.case_number else ""),
+        "url": "/",
+        "tag": f"court-{cd.pk}",
+    }
+
+
+def _send_batch(batch, now, dry_run=False) -> int:
+    due = []
+    for cd in batch:
+        event_at = court_datetime(cd.date, cd.time)
+        kind = current_kind(event_at, now)
+        if kind:
+            due.append((cd, kind, event_at))
+    if not due:
+        return 0
+
+    sent = set(CourtDateReminder.objects
+               .filter(court_date_id__in=[cd.pk for cd, _, _ in due])
+               .values_list("court_date_id", "kind", "event_at"))
+    due = [(cd, kind, event_at) for cd, kind, event_at in due if (cd.pk, kind, event_at) not in sent]
+    if not due or dry_run:
+        return len(due)
+
+    try:
+        with transaction.atomic():
+            msgs = NotificationOutbox.objects.bulk_create([
+                NotificationOutbox(
+                    tenant_id=cd.tenant_id, person_id=cd.person_id,
+                    payload=_payload(cd, kind, event_at),
+                    # not worth delivering once the hearing has started
+                    ttl=max(60, int((event_at - now).total_seconds())),
+                    urgency=URGENCY[kind],
+                )
+                for cd, kind, event_at in due
+            ])
+            CourtDateReminder.objects.bulk_create([
+                CourtDateReminder(tenant_id=cd.tenant_id, court_date_id=cd.pk, kind=kind,
+                                  event_at=event_at, outbox=msg)
+                for (cd, kind, event_at), msg in zip(due, msgs)
+            ])
+    except IntegrityError:
+        # another run recorded some of these first; the next pass picks up the rest
+        log.warning("court reminders: concurrent run detected, batch skipped")
+        return 0
+    return len(due)
+
+
+def send_due_reminders(now=None, tenant=None, batch_size=BATCH_SIZE, dry_run=False):
+    """Queue every reminder that is due now. Returns {"scanned", "queued"}."""
+    now = now or timezone.now()
+    start = timezone.localtime(now).date()
+    end = timezone.localtime(now + REMINDERS[0][1]).date()
+    has_device = Exists(PushSubscription.objects.filter(person_id=OuterRef("person_id")))
+
+    stats = {"scanned": 0, "queued": 0}
+    tenant_ids = [tenant.pk] if tenant is not None else Tenant.objects.order_by("pk").values_list("pk", flat=True)
+    for tenant_id in tenant_ids:
+        qs = (CourtDate.objects
+              .filter(tenant_id=tenant_id, date__range=(start, end))
+              .filter(has_device)
+              .only("pk", "tenant_id", "person_id", "date", "time", "court", "location", "case_number")
+              .order_by("date", "time", "pk"))
+        batch = []
+        for cd in qs.iterator(chunk_size=batch_size):
+            batch.append(cd)
+            if len(batch) >= batch_size:
+                stats["queued"] += _send_batch(batch, now, dry_run)
+                stats["scanned"] += len(batch)
+                batch = []
+        if batch:
+            stats["queued"] += _send_batch(batch, now, dry_run)
+            stats["scanned"] += len(batch)
+    if stats["queued"]:
+        log.info("court reminders: scanned=%s queued=%s", stats["scanned"], stats["queued"])
+    return stats
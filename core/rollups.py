@@ -0,0 +1,83 @@
+# core/rollups.py
+"""
+BondDailyRollup maintenance.
+
+A rollup cell is (tenant, date, county, jurisdiction, offense_type). A Bond
+write recomputes only the cells the bond left and entered, from the Bond rows
+of that day, which is a short scan on the Bond(tenant, date) index. The
+reports then sum a few cells per day instead of grouping every bond.
+"""
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Bond, BondDailyRollup
+
+ROLLUP_KEY = ("date", "county", "jurisdiction", "offense_type")
+BOND_AMOUNT = Coalesce(F("bond_amount"), F("amount"),
+                       Value(Decimal("0"), output_field=DecimalField(max_digits=12, decimal_places=2)))
+
+
+def rollup_cell(tenant_id, date, county, jurisdiction, offense_type) -> tuple:
+    return (tenant_id, date, county or "", jurisdiction or "", offense_type or "")
+
+
+def bond_cell(bond) -> tuple:
+    return rollup_cell(bond.tenant_id, bond.date, bond.county, bond.jurisdiction, bond.offense_type)
+
+
+def refresh_bond_rollup(tenant_id, date, county, jurisdiction, offense_type):
+    """Recompute one cell from Bond rows; an emptied cell is deleted."""
+    key = {"date": date, "county": county, "jurisdiction": jurisdiction, "offense_type": offense_type}
+    agg = (Bond.objects
+           .filter(tenant_id=tenant_id, **key)
+           .aggregate(count=Count("id"), total=Sum(BOND_AMOUNT)))
+    if not agg["count"]:
+        BondDailyRollup.objects.filter(tenant_id=tenant_id, **key).delete()
+        return None
+    row, _ = BondDailyRollup.objects.update_or_create(
+        tenant_id=tenant_id, **key,
+        defaults={"count": agg["count"], "total": agg["total"] or Decimal("0")},
+    )
+    return row
+
+
+def rebuild_bond_rollups(tenant=None, fix=True, batch_size=500):
+    """
+    Compare every rollup cell with a fresh GROUP BY over Bond and (optionally)
+    repair it. Returns {"checked", "missing", "drifted", "stale"}.
+    """
+    bonds = Bond.objects.all()
+    rollups = BondDailyRollup.objects.all()
+    if tenant is not None:
+        bonds = bonds.filter(tenant=tenant)
+        rollups = rollups.filter(tenant=tenant)
+    existing = {(r.tenant_id, r.date, r.county, r.jurisdiction, r.offense_type): r for r in rollups}
+
+    stats = {"checked": 0, "missing": 0, "drifted": 0, "stale": 0}
+    to_create, to_update = [], []
+    fresh = (bonds.values("tenant_id", *ROLLUP_KEY)
+             .annotate(n=Count("id"), amount=Sum(BOND_AMOUNT))
+             .order_by())
+    for cell in fresh.iterator(chunk_size=batch_size):
+        stats["checked"] += 1
+        key = (cell["tenant_id"], *(cell[f] for f in ROLLUP_KEY))
+        amount = cell["amount"] or Decimal("0")
+        row = existing.pop(key, None)
+        if row is None:
+            stats["missing"] += 1
+            to_create.append(BondDailyRollup(tenant_id=cell["tenant_id"], **{f: cell[f] for f in ROLLUP_KEY},
+                                             count=cell["n"], total=amount))
+        elif row.count != cell["n"] or row.total != amount:
+            stats["drifted"] += 1
+            row.count, row.total = cell["n"], amount
+            to_update.append(row)
+    # whatever is left has no bonds any more
+    stats["stale"] = len(existing)
+
+    if fix:
+        BondDailyRollup.objects.filter(pk__in=[r.pk for r in existing.values()]).delete()
+        BondDailyRollup.objects.bulk_create(to_create, batch_size=batch_size)
+        BondDailyRollup.objects.bulk_update(to_update, ["count", "total"], batch_size=batch_size)
+    return stats
@@ -0,0 +1,122 @@
+# core/search.py
+import re
+from django.db.models import Count, Q
+
+from .models import Person, PersonSearchToken
+
+_WORD_RE = re.compile(r"[^\w@.+-]+", re.UNICODE)
+_NON_ALNUM_RE = re.compile(r"[\W_]+")
+_DIGITS_RE = re.compile(r"\D+")
+PHONE_MIN_TAIL = 4
+
+
+def _name_words(*values):
+    words = set()
+    for v in values:
+        v = (v or "").lower()
+        words.update(w for w in _NON_ALNUM_RE.split(v) if w)
+        joined = _NON_ALNUM_RE.sub("", v)  # "O'Neil" -> "oneil", "De la Cruz" -> "delacruz"
+        if joined:
+            words.add(joined)
+    return words
+
+
+def _phone_digits(phone):
+    """
+    Digits-only phone plus every tail of PHONE_MIN_TAIL or more digits, so a
+    prefix match on the tails finds any run of digits inside the number
+    ('1234' and '5551234' both find '(210) 555-1234').
+    """
+    digits = _DIGITS_RE.sub("", phone or "")
+    return {digits[i:] for i in range(max(len(digits) - PHONE_MIN_TAIL + 1, 1))} if digits else set()
+
+
+def _email_parts(email):
+    """Whole address, local part, domain ('@domain' too) and each domain label."""
+    email = (email or "").strip().lower()
+    if not email:
+        return set()
+    out = {email}
+    local, _, domain = email.rpartition("@")
+    if local and domain:
+        out |= {local, domain, "@" + domain}
+        out.update(w for w in domain.split(".") if w)
+    return {e[:255] for e in out}
+
+
+def person_tokens(first_name="", last_name="", alias="", phone="", email=""):
+    """(token, kind) pairs for one person. Keep 0016_personsearchtoken's copy in step."""
+    pairs = {(w, PersonSearchToken.KIND_NAME) for w in _name_words(first_name, last_name, alias)}
+    pairs |= {(d, PersonSearchToken.KIND_PHONE) for d in _phone_digits(phone)}
+    pairs |= {(e, PersonSearchToken.KIND_EMAIL) for e in _email_parts(email)}
+    return pairs
+
+
+def _tokens_for(person):
+    return [
+        PersonSearchToken(tenant_id=person.tenant_id, person_id=person.pk, token=tok, kind=kind)
+        for tok, kind in person_tokens(person.first_name, person.last_name, person.alias, person.phone, person.email)
+    ]
+
+
+def index_people(people, batch_size=1000, replace=True):
+    """
+    Rebuild search tokens for an iterable of saved Person rows (bulk import path).
+    replace=False skips the delete for rows that were just created.
+    """
+    people = list(people)
+    if not people:
+        return
+    if replace:
+        PersonSearchToken.objects.filter(person_id__in=[p.pk for p in people]).delete()
+    rows = []
+    for p in people:
+        rows.extend(_tokens_for(p))
+    PersonSearchToken.objects.bulk_create(rows, batch_size=batch_size)
+
+
+def index_person(person):
+    index_people([person])
+
+
+def query_terms(q):
+    """
+    Normalize a search box string the same way tokens are built.
+    A query with no letters is treated as one phone number ('210-555-1234').
+    """
+    q = (q or "").strip().lower()
+    if not q:
+        return []
+    if not re.search(r"[^\W\d_]|@", q):
+        digits = _DIGITS_RE.sub("", q)
+        return [digits] if digits else []
+    terms = []
+    for raw in _WORD_RE.split(q):
+        if not raw:
+            continue
+        if "@" in raw:
+            terms.append(raw)
+        else:
+            terms.extend(w for w in _NON_ALNUM_RE.split(raw) if w)
+    return terms
+
+
+def search_people(people, tenant, q):
+    """
+    Filter a Person queryset to rows where every query term prefix-matches one
+    of their tokens, ranked by exact-token hits. Phone tails and email parts
+    are tokens too, so the last digits of a number or a bare domain still
+    match the way the old icontains search did. On Postgres each term is a
+    LIKE 'term%' scan of the (tenant, token varchar_pattern_ops) index.
+    """
+    terms = query_terms(q)
+    if not terms:
+        return people.none()
+    for term in terms:
+        hits = (PersonSearchToken.objects
+                .filter(tenant=tenant, token__startswith=term)
+                .values("person_id"))
+        people = people.filter(pk__in=hits)
+    return (people
+            .annotate(search_rank=Count("search_tokens", filter=Q(search_tokens__token__in=terms)))
+            .order_by("-search_rank", "last_name", "first_name", "pk"))
@@ -1,9 +1,17 @@
 from decimal import Decimal
 from django.utils import timezone
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
-from .models import Bond, Invoice
+from .models import Bond, CheckIn, CourtDate, ImportUpload, Invoice, Person, Receipt, Tenant
+from .billing import refresh_person_balance
+from .calendar_cache import invalidate_months
+from .checkins import note_checkin, refresh_last_checkin
+from .dashboard import invalidate_dashboard
+from .ics import bump_court_dates_version
+from .rollups import ROLLUP_KEY, bond_cell, refresh_bond_rollup, rollup_cell
+from .search import index_person
 
 @receiver(post_save, sender=Bond)
 def create_invoice_for_new_bond(sender, instance: Bond, created: bool, **kwargs):
@@ -34,3 +42,148 @@ def create_invoice_for_new_bond(sender, instance: Bond, created: bool, **kwargs)
         due_date=getattr(instance, 'date', None),
         status=Invoice.STATUS_UNPAID,
     )
+
+
+# ---- PersonBalance maintenance ----
+
+@receiver(post_save, sender=Invoice)
+def refresh_balance_for_invoice(sender, instance: Invoice, **kwargs):
+    refresh_person_balance(instance.person_id)
+
+
+@receiver(post_delete, sender=Invoice)
+def refresh_balance_for_deleted_invoice(sender, instance: Invoice, **kwargs):
+    refresh_person_balance(instance.person_id, create=False)
+
+
+def _receipt_person_id(receipt: Receipt):
+    return Invoice.objects.filter(pk=receipt.invoice_id).values_list("person_id", flat=True).first()
+
+
+@receiver(post_save, sender=Receipt)
+def refresh_balance_for_receipt(sender, instance: Receipt, **kwargs):
+    person_id = _receipt_person_id(instance)
+    if person_id:
+        refresh_person_balance(person_id)
+
+
+@receiver(post_delete, sender=Receipt)
+def refresh_balance_for_deleted_receipt(sender, instance: Receipt, **kwargs):
+    person_id = _receipt_person_id(instance)
+    if person_id:
+        refresh_person_balance(person_id, create=False)
+
+
+# ---- People search index ----
+
+@receiver(post_save, sender=Person)
+def reindex_person(sender, instance: Person, **kwargs):
+    index_person(instance)
+
+
+# ---- Person.last_checkin_at ----
+
+@receiver(post_save, sender=CheckIn)
+def track_last_checkin(sender, instance: CheckIn, **kwargs):
+    note_checkin(instance)
+
+
+@receiver(post_delete, sender=CheckIn)
+def track_deleted_checkin(sender, instance: CheckIn, **kwargs):
+    refresh_last_checkin(instance.person_id)
+
+
+# ---- ICS feed version ----
+
+@receiver(post_save, sender=CourtDate)
+@receiver(post_delete, sender=CourtDate)
+def bump_court_dates(sender, instance: CourtDate, **kwargs):
+    bump_court_dates_version(instance.tenant_id)
+
+
+@receiver(post_save, sender=Person)
+def bump_court_dates_for_person(sender, instance: Person, created: bool, **kwargs):
+    # feed SUMMARY lines carry the person's name
+    if not created and CourtDate.objects.filter(person_id=instance.pk).exists():
+        bump_court_dates_version(instance.tenant_id)
+
+
+# ---- Calendar month fragments ----
+
+@receiver(pre_save, sender=CourtDate)
+def remember_court_date_day(sender, instance: CourtDate, **kwargs):
+    # an edit can move the date to another month; both grids go stale
+    instance._calendar_old_date = (
+        CourtDate.objects.filter(pk=instance.pk).values_list("date", flat=True).first() if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=CourtDate)
+@receiver(post_delete, sender=CourtDate)
+def invalidate_calendar_months(sender, instance: CourtDate, **kwargs):
+    # after commit, so a request can't re-cache the old grid before the write is visible
+    # popped, so deleting the same instance later doesn't also drop the months it used to be in
+    old_date = instance.__dict__.pop("_calendar_old_date", None)
+    tenant_id, days = instance.tenant_id, [instance.date, old_date]
+    transaction.on_commit(lambda: invalidate_months(tenant_id, days))
+
+
+@receiver(post_save, sender=Person)
+def invalidate_calendar_months_for_person(sender, instance: Person, created: bool, **kwargs):
+    # grid items show the person's name
+    if not created:
+        tenant_id, days = instance.tenant_id, CourtDate.objects.filter(person_id=instance.pk).values_list("date", flat=True).distinct()
+        transaction.on_commit(lambda: invalidate_months(tenant_id, days))
+
+
+# ---- Bond report rollups ----
+
+@receiver(pre_save, sender=Bond)
+def remember_bond_cell(sender, instance: Bond, **kwargs):
+    # an edit can move the bond to another rollup cell; the old one is recomputed too
+    old = Bond.objects.filter(pk=instance.pk).values_list("tenant_id", *ROLLUP_KEY).first() if instance.pk else None
+    instance._rollup_old_cell = rollup_cell(*old) if old else None
+
+
+@receiver(post_save, sender=Bond)
+@receiver(post_delete, sender=Bond)
+def refresh_bond_rollups(sender, instance: Bond, **kwargs):
+    cells = {bond_cell(instance), instance.__dict__.pop("_rollup_old_cell", None)} - {None}
+    for cell in cells:
+        refresh_bond_rollup(*cell)
+
+
+# ---- Dashboard KPIs ----
+
+@receiver(post_save, sender=Bond)
+@receiver(post_delete, sender=Bond)
+@receiver(post_save, sender=Invoice)
+@receiver(post_delete, sender=Invoice)
+@receiver(post_save, sender=Receipt)
+@receiver(post_delete, sender=Receipt)
+@receiver(post_save, sender=CourtDate)
+@receiver(post_delete, sender=CourtDate)
+@receiver(post_save, sender=CheckIn)
+@receiver(post_delete, sender=CheckIn)
+@receiver(post_save, sender=Person)
+@receiver(post_delete, sender=Person)
+def invalidate_dashboard_kpis(sender, instance, **kwargs):
+    tenant_id = instance.tenant_id
+    transaction.on_commit(lambda: invalidate_dashboard(tenant_id))
+
+
+@receiver(post_save, sender=Tenant)
+def invalidate_dashboard_for_tenant(sender, instance: Tenant, **kwargs):
+    # checkin_interval_days drives the missed check-ins tile
+    tenant_id = instance.pk
+    transaction.on_commit(lambda: invalidate_dashboard(tenant_id))
+
+
+# ---- Staged import files ----
+
+@receiver(post_delete, sender=ImportUpload)
+def delete_staged_import_file(sender, instance: ImportUpload, **kwargs):
+    # after commit, so a rolled-back delete keeps its file
+    storage, name = instance.file.storage, instance.file.name
+    if name:
+        transaction.on_commit(lambda: storage.delete(name))
@@ -0,0 +1,981 @@
+import datetime
+import importlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection
+from django.db.models import Count, Sum
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import lookups
+from .billing import get_person_balance, rebuild_person_balances
+from .calendar_cache import fragment_key
+from .checkins import flag_missed_checkins
+from .dashboard import compute_kpis, dashboard_cache_key, dashboard_kpis
+from .ics import escape_text, feed_queryset, fold, iter_feed
+from .importer import PersonImporter, claim_import_job, iter_csv_rows, read_preview, run_import_job, stage_upload
+from .models import (
+    Bond, BondDailyRollup, CheckIn, CourtDate, CourtDateReminder, ImportJob, ImportUpload, Invoice, NotificationOutbox, PaymentPlan, Person, PersonBalance,
+    LookupValue, PersonSearchToken, PlanInstallment, PushSubscription, Receipt, Tenant,
+)
+from .notifications import MAX_ATTEMPTS, claim_due, deliver, enqueue_push, purge_outbox, retry_later
+from .plans import create_installments, reschedule, schedule, sweep_late_installments
+from .push import send_push
+from .rollups import BOND_AMOUNT, ROLLUP_KEY, rebuild_bond_rollups
+from .reminders import court_datetime, send_due_reminders
+from .search import person_tokens, search_people
+
+MAPPING = {0: "first_name", 1: "last_name", 2: "phone", 3: "email"}
+
+
+@override_settings(
+    SECURE_SSL_REDIRECT=False,
+    QUERY_BUDGET_STRICT=True,
+    STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    },
+)
+class ViewTestCase(TestCase):
+    """Logged-in staff user of self.tenant. Views over their QUERY_BUDGETS raise."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("staff", password="x")
+        self.tenant = Tenant.objects.create(name="T", user=self.user)
+        self.client.force_login(self.user)
+
+
+class PersonImporterTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="T")
+
+    def run_import(self, rows, **kwargs):
+        kwargs.setdefault("dedupe_by_phone", True)
+        return PersonImporter(self.tenant, MAPPING, **kwargs).run(rows)
+
+    def people(self):
+        return list(Person.objects.filter(tenant=self.tenant)
+                    .order_by("pk").values_list("first_name", "last_name", "email"))
+
+    def test_rows_sharing_a_phone_update_one_person(self):
+        imp = self.run_import([
+            ["Ann", "One", "555-0100", "a@example.com"],
+            ["Ann", "Two", "555-0100", "b@example.com"],
+        ])
+        self.assertEqual((imp.created, imp.updated, imp.failed), (1, 1, 0))
+        self.assertEqual(self.people(), [("Ann", "Two", "b@example.com")])
+
+    def test_existing_person_is_matched_by_phone(self):
+        Person.objects.create(tenant=self.tenant, first_name="Old", last_name="Name", phone=" 555-0100 ")
+        imp = self.run_import([["New", "Name", "555-0100", ""]])
+        self.assertEqual((imp.created, imp.updated), (0, 1))
+        self.assertEqual(self.people(), [("New", "Name", "")])
+        self.assertTrue(PersonSearchToken.objects.filter(tenant=self.tenant, token="new").exists())
+
+    def test_invalid_row_does_not_touch_the_matched_person(self):
+        imp = self.run_import([
+            ["Zed", "One", "555-0100", "z@example.com"],
+            ["Zed", "Two", "555-0100", "not-an-email"],
+        ])
+        self.assertEqual((imp.created, imp.updated, imp.failed), (1, 0, 1))
+        self.assertEqual([(r.row, r.ok) for r in imp.results], [(2, True), (3, False)])
+        self.assertEqual(self.people(), [("Zed", "One", "z@example.com")])
+
+    def test_invalid_row_does_not_touch_an_existing_person(self):
+        Person.objects.create(tenant=self.tenant, first_name="Old", last_name="Name", phone="555-0100")
+        imp = self.run_import([["New", "Name", "555-0100", "not-an-email"]])
+        self.assertEqual((imp.updated, imp.failed), (0, 1))
+        self.assertEqual(self.people(), [("Old", "Name", "")])
+
+    def test_batches_invalidate_what_the_person_signals_would(self):
+        old = Person.objects.create(tenant=self.tenant, first_name="Old", last_name="Name", phone="555-0100")
+        CourtDate.objects.create(tenant=self.tenant, person=old, date=datetime.date(2026, 3, 10))
+        self.tenant.refresh_from_db()
+        version = self.tenant.court_dates_version
+        march, today = datetime.date(2026, 3, 1), datetime.date(2026, 3, 2)
+        grid = fragment_key(self.tenant.pk, march, today)
+        cache.set(dashboard_cache_key(self.tenant.pk), {"stale": True})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.run_import([["New", "Name", "555-0100", ""]])
+
+        self.tenant.refresh_from_db()
+        self.assertEqual(self.tenant.court_dates_version, version + 1)
+        self.assertNotEqual(fragment_key(self.tenant.pk, march, today), grid)
+        self.assertIsNone(cache.get(dashboard_cache_key(self.tenant.pk)))
+
+    def test_rejected_batch_is_saved_row_by_row(self):
+        bulk_create = Person.objects.bulk_create
+
+        def reject_boom(objs, *args, **kwargs):
+            if any(p.last_name == "Boom" for p in objs):
+                raise IntegrityError("boom")
+            return bulk_create(objs, *args, **kwargs)
+
+        with mock.patch.object(Person.objects, "bulk_create", side_effect=reject_boom):
+            imp = self.run_import([
+                ["Ann", "Lee", "555-0100", ""],
+                ["Bob", "Boom", "555-0101", ""],
+                ["Bob", "Boom", "555-0101", ""],
+                ["Cy", "Ray", "555-0102", ""],
+                ["Bob", "Ok", "555-0101", ""],
+            ], batch_size=3)
+        # rows 3-4 share a person that the database rejects; row 6 is a new batch
+        self.assertEqual((imp.created, imp.updated, imp.failed), (3, 0, 2))
+        self.assertEqual([(r.row, r.ok) for r in imp.results],
+                         [(2, True), (3, False), (4, False), (5, True), (6, True)])
+        self.assertIn("boom", imp.results[1].msg)
+        self.assertEqual(self.people(), [("Ann", "Lee", ""), ("Cy", "Ray", ""), ("Bob", "Ok", "")])
+        self.assertEqual(
+            set(PersonSearchToken.objects.filter(tenant=self.tenant, kind=PersonSearchToken.KIND_NAME)
+                .values_list("token", flat=True)),
+            {"ann", "lee", "cy", "ray", "bob", "ok"},
+        )
+
+
+class IterCsvRowsTests(TestCase):
+    def test_latin1_past_the_head_of_the_file(self):
+        data = b"first,last\r\n" + b"Ann,Lee\r\n" * 40000 + "José,München\r\n".encode("latin-1")
+        self.assertEqual(list(iter_csv_rows(io.BytesIO(data)))[-1], ["José", "München"])
+
+    def test_utf8_with_bom(self):
+        data = "\ufefffirst,last\r\nJosé,München\r\n".encode("utf-8")
+        self.assertEqual(list(iter_csv_rows(io.BytesIO(data))), [["first", "last"], ["José", "München"]])
+
+
+class StagedImportTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.tenant = Tenant.objects.create(name="T")
+
+    def stage(self, text):
+        return stage_upload(self.tenant, SimpleUploadedFile("people.csv", text.encode("utf-8")))
+
+    def test_upload_is_stored_as_a_file(self):
+        upload = self.stage("first,last\r\nAnn,Lee\r\n")
+        self.assertTrue(os.path.isfile(upload.file.path))
+        self.assertTrue(upload.file.path.startswith(self.media))
+        self.assertEqual(upload.size, len("first,last\r\nAnn,Lee\r\n"))
+        self.assertEqual(read_preview(upload), (["first", "last"], [["Ann", "Lee"]]))
+
+    def test_job_runs_from_the_file_and_deletes_it(self):
+        upload = self.stage("first,last,phone\r\nAnn,Lee,555\r\nBob,Ray,556\r\n")
+        path = upload.file.path
+        job = ImportJob.objects.create(tenant=self.tenant, upload=upload, mapping={"0": "first_name", "1": "last_name"})
+        with self.captureOnCommitCallbacks(execute=True):
+            job = run_import_job(claim_import_job(job.pk))
+        self.assertEqual((job.status, job.total_rows, job.created_count), (ImportJob.STATUS_DONE, 2, 2))
+        self.assertFalse(ImportUpload.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+    def test_job_without_its_file_fails(self):
+        upload = self.stage("first,last\r\nAnn,Lee\r\n")
+        os.remove(upload.file.path)
+        job = ImportJob.objects.create(tenant=self.tenant, upload=upload, mapping={"0": "first_name", "1": "last_name"})
+        job = run_import_job(claim_import_job(job.pk))
+        self.assertEqual(job.status, ImportJob.STATUS_FAILED)
+
+
+class PlanScheduleTests(TestCase):
+    def setUp(self):
+        tenant = Tenant.objects.create(name="T")
+        person = Person.objects.create(tenant=tenant, first_name="Ann", last_name="Lee")
+        self.plan = PaymentPlan.objects.create(
+            person=person, start_date=datetime.date(2024, 1, 31), frequency=PaymentPlan.FREQ_MONTHLY,
+            n_payments=4, installment_amount=Decimal("50.00"),
+        )
+        create_installments(self.plan)
+
+    def installments(self):
+        return list(self.plan.installments.order_by("sequence").values_list("sequence", "due_date", "status"))
+
+    def test_monthly_dates_clamp_to_month_end_without_drift(self):
+        self.assertEqual(schedule(datetime.date(2024, 1, 31), PaymentPlan.FREQ_MONTHLY, 4), [
+            datetime.date(2024, 1, 31), datetime.date(2024, 2, 29),
+            datetime.date(2024, 3, 31), datetime.date(2024, 4, 30),
+        ])
+
+    def test_weekly_and_biweekly_steps(self):
+        start = datetime.date(2024, 2, 26)
+        self.assertEqual(schedule(start, PaymentPlan.FREQ_WEEKLY, 3),
+                         [start, datetime.date(2024, 3, 4), datetime.date(2024, 3, 11)])
+        self.assertEqual(schedule(start, PaymentPlan.FREQ_BIWEEKLY, 3),
+                         [start, datetime.date(2024, 3, 11), datetime.date(2024, 3, 25)])
+
+    def test_shrinking_keeps_paid_installments_past_the_new_count(self):
+        self.plan.installments.filter(sequence=4).update(status=PlanInstallment.STATUS_PAID)
+        self.plan.n_payments = 2
+        self.assertEqual(reschedule(self.plan), {"created": 0, "updated": 0, "deleted": 1})
+        self.assertEqual(self.installments(), [
+            (1, datetime.date(2024, 1, 31), PlanInstallment.STATUS_DUE),
+            (2, datetime.date(2024, 2, 29), PlanInstallment.STATUS_DUE),
+            (4, datetime.date(2024, 4, 30), PlanInstallment.STATUS_PAID),
+        ])
+
+    def test_moved_late_installment_is_due_again(self):
+        self.plan.installments.filter(sequence=1).update(status=PlanInstallment.STATUS_PAID)
+        self.plan.installments.filter(sequence=2).update(status=PlanInstallment.STATUS_LATE)
+        self.plan.start_date = datetime.date(2024, 3, 15)
+        self.plan.n_payments = 5
+        self.assertEqual(reschedule(self.plan), {"created": 1, "updated": 3, "deleted": 0})
+        self.assertEqual(self.installments(), [
+            (1, datetime.date(2024, 1, 31), PlanInstallment.STATUS_PAID),
+            (2, datetime.date(2024, 4, 15), PlanInstallment.STATUS_DUE),
+            (3, datetime.date(2024, 5, 15), PlanInstallment.STATUS_DUE),
+            (4, datetime.date(2024, 6, 15), PlanInstallment.STATUS_DUE),
+            (5, datetime.date(2024, 7, 15), PlanInstallment.STATUS_DUE),
+        ])
+
+
+class PersonBalanceTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="T")
+        self.person = Person.objects.create(tenant=self.tenant, first_name="Ann", last_name="Lee")
+
+    def invoice(self, amount, due_date=None):
+        return Invoice.objects.create(tenant=self.tenant, person=self.person, amount=Decimal(amount), due_date=due_date)
+
+    def receipt(self, invoice, amount, date=None):
+        return Receipt.objects.create(tenant=self.tenant, invoice=invoice, amount=Decimal(amount), date=date)
+
+    def ledger(self):
+        return PersonBalance.objects.filter(person=self.person).values_list(
+            "invoiced", "paid", "balance", "last_payment_date", "oldest_due_date").get()
+
+    def test_invoice_writes_keep_the_balance_current(self):
+        jan, feb = datetime.date(2026, 1, 1), datetime.date(2026, 2, 1)
+        first = self.invoice("100.00", due_date=feb)
+        second = self.invoice("50.00", due_date=jan)
+        self.assertEqual(self.ledger(), (Decimal("150"), Decimal("0"), Decimal("150"), None, jan))
+        first.amount = Decimal("80.00")
+        first.save()
+        self.assertEqual(self.ledger(), (Decimal("130"), Decimal("0"), Decimal("130"), None, jan))
+        second.delete()
+        self.assertEqual(self.ledger(), (Decimal("80"), Decimal("0"), Decimal("80"), None, feb))
+
+    def test_receipt_writes_keep_the_balance_current(self):
+        due = datetime.date(2026, 1, 1)
+        inv = self.invoice("100.00", due_date=due)
+        r1 = self.receipt(inv, "40.00", date=datetime.date(2026, 1, 5))
+        self.assertEqual(self.ledger(), (Decimal("100"), Decimal("40"), Decimal("60"), datetime.date(2026, 1, 5), due))
+        r2 = self.receipt(inv, "60.00", date=datetime.date(2026, 1, 9))
+        # fully paid: no unpaid due date left
+        self.assertEqual(self.ledger(), (Decimal("100"), Decimal("100"), Decimal("0"), datetime.date(2026, 1, 9), None))
+        r1.amount = Decimal("30.00")
+        r1.save()
+        self.assertEqual(self.ledger(), (Decimal("100"), Decimal("90"), Decimal("10"), datetime.date(2026, 1, 9), due))
+        r2.delete()
+        self.assertEqual(self.ledger(), (Decimal("100"), Decimal("30"), Decimal("70"), datetime.date(2026, 1, 5), due))
+
+    def test_get_person_balance_never_writes(self):
+        ledger = get_person_balance(self.person)
+        self.assertTrue(ledger._state.adding)
+        self.assertEqual(ledger.balance, Decimal("0"))
+        self.assertFalse(PersonBalance.objects.exists())
+
+    def test_rebuild_reports_and_repairs_drift(self):
+        self.invoice("100.00")
+        other = Person.objects.create(tenant=self.tenant, first_name="Bob", last_name="Ray")
+        Invoice.objects.create(tenant=self.tenant, person=other, amount=Decimal("25.00"))
+        Person.objects.create(tenant=self.tenant, first_name="No", last_name="Invoices")
+        # queryset writes bypass the signals
+        PersonBalance.objects.filter(person=self.person).update(balance=Decimal("999"))
+        PersonBalance.objects.filter(person=other).delete()
+
+        self.assertEqual(rebuild_person_balances(fix=False), {"checked": 3, "missing": 1, "drifted": 1})
+        self.assertEqual(rebuild_person_balances(), {"checked": 3, "missing": 1, "drifted": 1})
+        self.assertEqual(rebuild_person_balances(fix=False), {"checked": 3, "missing": 0, "drifted": 0})
+        self.assertEqual(self.ledger()[2], Decimal("100"))
+        self.assertEqual(PersonBalance.objects.get(person=other).balance, Decimal("25"))
+
+
+class SearchPeopleTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="T")
+        self.ann = Person.objects.create(tenant=self.tenant, first_name="Ann", last_name="Lee",
+                                         phone="(210) 555-1234", email="Ann.Lee@Gmail.com")
+        self.annabel = Person.objects.create(tenant=self.tenant, first_name="Annabel", last_name="Leeds",
+                                             phone="512-555-9876", email="ab@work.org")
+        self.bob = Person.objects.create(tenant=self.tenant, first_name="Bob", last_name="O'Neil")
+        other = Tenant.objects.create(name="Other")
+        Person.objects.create(tenant=other, first_name="Ann", last_name="Lee", phone="210-555-1234")
+
+    def search(self, q):
+        return list(search_people(Person.objects.all(), self.tenant, q))
+
+    def test_name_prefixes(self):
+        self.assertEqual(self.search("ann"), [self.ann, self.annabel])
+        self.assertEqual(self.search("annab le"), [self.annabel])
+        self.assertEqual(self.search("oneil"), [self.bob])
+        self.assertEqual(self.search("zed"), [])
+
+    def test_exact_tokens_rank_first(self):
+        leeann = Person.objects.create(tenant=self.tenant, first_name="Leeann", last_name="Abbot")
+        # alphabetically Abbot would come first; Lee is the only exact hit
+        self.assertEqual(self.search("lee"), [self.ann, leeann, self.annabel])
+        self.assertEqual(self.search("lee ann"), [self.ann, self.annabel])
+
+    def test_phone_tails(self):
+        self.assertEqual(self.search("1234"), [self.ann])
+        self.assertEqual(self.search("555-9876"), [self.annabel])
+        self.assertEqual(self.search("(210) 555-1234"), [self.ann])
+        self.assertEqual(self.search("555"), [self.ann, self.annabel])
+
+    def test_email_parts(self):
+        self.assertEqual(self.search("gmail"), [self.ann])
+        self.assertEqual(self.search("gmail.com"), [self.ann])
+        self.assertEqual(self.search("@work.org"), [self.annabel])
+        self.assertEqual(self.search("ann.lee@gmail.com"), [self.ann])
+
+    def test_other_tenants_are_never_matched(self):
+        self.assertEqual(self.search("210-555-1234"), [self.ann])
+        self.assertEqual(self.search("ann lee"), [self.ann, self.annabel])
+
+    def test_tokens_follow_person_edits(self):
+        self.ann.last_name = "Moss"
+        self.ann.save()
+        self.assertEqual(self.search("moss"), [self.ann])
+        self.assertEqual(self.search("lee"), [self.annabel])
+
+    def test_migration_tokenizer_matches_core_search(self):
+        migration = importlib.import_module("core.migrations.0016_personsearchtoken")
+        for args in [
+            ("Ann", "O'Neil", "Nan", "(210) 555-1234", "Ann.X@Gmail.com"),
+            ("De la", "Cruz", "", "12", "no-at-sign"),
+            ("José", "Müller-Lüdenscheidt", "", "+1 210 555 1234 x99", " a@b.co.uk "),
+            ("", "", "", "", ""),
+        ]:
+            self.assertEqual(migration.person_tokens(*args), person_tokens(*args), args)
+
+
+class PeopleListTests(ViewTestCase):
+    def setUp(self):
+        super().setUp()
+        # shared last names and repeated full names, so the cursor has to fall back to the pk
+        for i in range(11):
+            Person.objects.create(tenant=self.tenant, first_name=f"P{i // 2}", last_name="Smith" if i < 8 else "Jones")
+        Person.objects.create(tenant=Tenant.objects.create(name="Other"), first_name="P0", last_name="Smith")
+
+    def test_cursor_walks_every_person_once(self):
+        expected = list(Person.objects.filter(tenant=self.tenant)
+                        .order_by("last_name", "first_name", "pk").values_list("pk", flat=True))
+        seen, after, pages = [], "", 0
+        with mock.patch("core.views_people.PEOPLE_PAGE_SIZE", 4):
+            while True:
+                r = self.client.get(reverse("people_tab_list"), {"after": after} if after else {})
+                self.assertEqual(r.status_code, 200)
+                seen += [p.pk for p in r.context["people"]]
+                pages += 1
+                after = r.context["next_cursor"]
+                if not after:
+                    break
+        self.assertEqual(seen, expected)
+        self.assertEqual(pages, 3)
+
+    def test_bad_cursor_is_rejected(self):
+        for after in ["nope", "WzEsMl0=", "W3t9LCJhIiwxXQ=="]:  # garbage, [1,2], [{},"a",1]
+            r = self.client.get(reverse("people_tab_list"), {"after": after})
+            self.assertEqual(r.status_code, 400, after)
+
+    def test_search_skips_pagination(self):
+        r = self.client.get(reverse("people_tab_list"), {"q": "jones p5"})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual([(p.first_name, p.last_name) for p in r.context["people"]], [("P5", "Jones")])
+        self.assertNotIn("next_cursor", r.context)
+
+
+class ImportViewTests(ViewTestCase):
+    def setUp(self):
+        super().setUp()
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def start_import(self):
+        upload = stage_upload(self.tenant, SimpleUploadedFile("people.csv", b"First,Last\r\nAnn,Lee\r\n"))
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse("people_import"), {
+                "step": "import", "upload_id": upload.pk, "commit": "1",
+                "map_field_0": "first_name", "map_field_1": "last_name",
+            })
+
+    def test_small_upload_is_imported_in_the_request(self):
+        r = self.start_import()
+        self.assertTemplateUsed(r, "people/_subtab_import_results.html")
+        self.assertEqual(ImportJob.objects.get().status, ImportJob.STATUS_DONE)
+        self.assertTrue(Person.objects.filter(tenant=self.tenant, first_name="Ann").exists())
+
+    @override_settings(PERSON_IMPORT_INLINE_BYTES=0)
+    def test_large_upload_waits_for_the_worker(self):
+        r = self.start_import()
+        self.assertTemplateUsed(r, "people/_subtab_import_progress.html")
+        self.assertNotContains(r, "run_import_jobs")
+        job = ImportJob.objects.get()
+        self.assertEqual(job.status, ImportJob.STATUS_QUEUED)
+
+        ImportJob.objects.filter(pk=job.pk).update(created_at=timezone.now() - datetime.timedelta(minutes=7))
+        r = self.client.get(reverse("people_import_job", args=[job.pk]))
+        self.assertContains(r, "Queued for 7 minutes")
+        self.assertContains(r, "run_import_jobs")
+
+
+class QueryBudgetTests(ViewTestCase):
+    """Enough related rows per person that a per-row query would blow the budget."""
+
+    def setUp(self):
+        super().setUp()
+        today = datetime.date.today()
+        for i in range(12):
+            p = Person.objects.create(tenant=self.tenant, first_name=f"P{i}", last_name="Smith", phone=f"210555{i:04d}")
+            Bond.objects.create(tenant=self.tenant, person=p, date=today, amount=Decimal("100"), county="Bexar")
+            CourtDate.objects.create(tenant=self.tenant, person=p, date=today + datetime.timedelta(days=i))
+            CheckIn.objects.create(tenant=self.tenant, person=p)
+            inv = Invoice.objects.create(tenant=self.tenant, person=p, amount=Decimal("50"), due_date=today)
+            Receipt.objects.create(tenant=self.tenant, invoice=inv, amount=Decimal("20"), date=today)
+        self.person = p
+        cache.clear()
+
+    def test_people_tab_list(self):
+        self.assertEqual(self.client.get(reverse("people_tab_list")).status_code, 200)
+        self.assertEqual(self.client.get(reverse("people_tab_list"), {"q": "smith"}).status_code, 200)
+
+    def test_dashboard_partial(self):
+        self.assertEqual(self.client.get(reverse("dashboard_partial")).status_code, 200)
+
+    def test_people_tab_main(self):
+        self.assertEqual(self.client.get(reverse("people_tab_main", args=[self.person.pk])).status_code, 200)
+
+
+class SendPushTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="T")
+        self.subs = [
+            PushSubscription.objects.create(tenant=self.tenant, endpoint=url, p256dh="k", auth="a")
+            for url in (
+                "https://fcm.googleapis.com/fcm/send/ok1",
+                "https://fcm.googleapis.com/fcm/send/ok2",
+                "https://updates.push.services.mozilla.com/gone",
+                "https://web.push.apple.com/unknown",
+                "https://web.push.apple.com/down",
+            )
+        ]
+        self.status = {"gone": 410, "unknown": 404, "down": 503}
+        self.sessions = {}
+        auth = mock.patch("core.push._auth_headers", return_value={"Authorization": "vapid t=x, k=y"})
+        auth.start()
+        self.addCleanup(auth.stop)
+
+    def stub_pusher(self, barrier=None):
+        test = self
+
+        class StubPusher:
+            def __init__(self, info, requests_session=None):
+                self.endpoint = info["endpoint"]
+                test.sessions[self.endpoint] = requests_session
+
+            def send(self, data, headers, ttl=0, timeout=None):
+                if barrier is not None:
+                    barrier.wait(timeout=5)  # raises unless every send is in flight at once
+                return mock.Mock(status_code=test.status.get(self.endpoint.rsplit("/", 1)[1], 201), reason="")
+
+        return mock.patch("core.push.WebPusher", StubPusher)
+
+    def test_sends_run_concurrently_on_one_session_per_host(self):
+        with self.stub_pusher(threading.Barrier(len(self.subs))):
+            result = send_push(PushSubscription.objects.all(), {"title": "x"})
+        self.assertEqual(result["sent"], 2)
+        self.assertEqual(result["failed"], 3)
+        s = self.sessions
+        self.assertIs(s[self.subs[0].endpoint], s[self.subs[1].endpoint])
+        self.assertIsNot(s[self.subs[0].endpoint], s[self.subs[2].endpoint])
+
+    def test_gone_endpoints_are_deleted_in_one_query(self):
+        with self.stub_pusher(), CaptureQueriesContext(connection) as ctx:
+            result = send_push(self.subs, {"title": "x"})
+        self.assertEqual(result["removed"], 2)
+        self.assertEqual(result["outcomes"][self.subs[4].pk][0], 503)
+        self.assertEqual(sum(q["sql"].startswith("DELETE") for q in ctx.captured_queries), 1)
+        self.assertEqual(
+            sorted(PushSubscription.objects.values_list("endpoint", flat=True)),
+            [self.subs[0].endpoint, self.subs[1].endpoint, self.subs[4].endpoint],
+        )
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="T")
+        self.person = Person.objects.create(tenant=self.tenant, first_name="Ann", last_name="Lee")
+        self.ok, self.flaky = (
+            PushSubscription.objects.create(tenant=self.tenant, person=self.person, endpoint=f"https://push.test/{n}", p256dh="k", auth="a")
+            for n in ("ok", "flaky")
+        )
+        self.sent_to = []
+
+    def fake_send_push(self, subs, payload, ttl=0, urgency=""):
+        """self.ok always succeeds, self.flaky gets a 503."""
+        subs = list(subs)
+        self.sent_to.append(sorted(s.pk for s in subs))
+        outcomes = {s.pk: (201, "") if s == self.ok else (503, "Push failed: 503") for s in subs}
+        return {"outcomes": outcomes, "sent": sum(1 for _, e in outcomes.values() if not e)}
+
+    def age(self, msg, **delta):
+        NotificationOutbox.objects.filter(pk=msg.pk).update(created_at=timezone.now() - datetime.timedelta(**delta))
+
+    def make_due(self, msg):
+        NotificationOutbox.objects.filter(pk=msg.pk).update(next_attempt_at=timezone.now())
+
+    def test_a_claimed_message_is_not_claimed_again_until_its_lease_runs_out(self):
+        msg = enqueue_push(self.tenant, {"title": "x"}, person=self.person)
+        self.assertEqual(claim_due(), [msg])
+        self.assertEqual(claim_due(), [])
+        self.make_due(msg)  # the worker died holding it
+        [again] = claim_due()
+        self.assertEqual(again.attempts, 2)
+
+    def test_expired_message_is_dropped(self):
+        msg = enqueue_push(self.tenant, {"title": "x"}, person=self.person, ttl=60)
+        self.age(msg, minutes=2)
+        with mock.patch("core.notifications.send_push") as send:
+            [claimed] = claim_due()
+            self.assertEqual(deliver(claimed).status, NotificationOutbox.STATUS_EXPIRED)
+        send.assert_not_called()
+        self.assertEqual(claim_due(), [])
+
+    def test_retries_back_off_and_skip_delivered_endpoints(self):
+        msg = enqueue_push(self.tenant, {"title": "x"}, person=self.person)
+        waits = []
+        with mock.patch("core.notifications.send_push", self.fake_send_push):
+            for _ in range(3):
+                [claimed] = claim_due()
+                before = timezone.now()
+                msg = deliver(claimed)
+                self.assertEqual(msg.status, NotificationOutbox.STATUS_PENDING)
+                waits.append(round((msg.next_attempt_at - before).total_seconds()))
+                self.make_due(msg)
+        self.assertEqual(waits, [30, 60, 120])
+        self.assertEqual(self.sent_to, [sorted([self.ok.pk, self.flaky.pk]), [self.flaky.pk], [self.flaky.pk]])
+        self.assertEqual((msg.sent_count, msg.failed_count), (1, 1))
+
+    def test_retry_later_gives_up_after_max_attempts(self):
+        msg = enqueue_push(self.tenant, {"title": "x"}, person=self.person)
+        NotificationOutbox.objects.filter(pk=msg.pk).update(attempts=MAX_ATTEMPTS - 1)
+        [claimed] = claim_due()
+        retry_later(claimed, "boom")
+        claimed.refresh_from_db()
+        self.assertEqual((claimed.status, claimed.last_error), (NotificationOutbox.STATUS_FAILED, "boom"))
+
+    def test_purge_removes_only_old_finished_messages(self):
+        old_sent, old_pending, new_sent = (enqueue_push(self.tenant, {}) for _ in range(3))
+        NotificationOutbox.objects.exclude(pk=old_pending.pk).update(status=NotificationOutbox.STATUS_SENT)
+        self.age(old_sent, days=31)
+        self.age(old_pending, days=31)
+        self.assertEqual(purge_outbox(days=30), 1)
+        self.assertEqual(set(NotificationOutbox.objects.all()), {old_pending, new_sent})
+
+
+class CourtReminderTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="T")
+        self.person = Person.objects.create(tenant=self.tenant, first_name="Ann", last_name="Lee")
+        PushSubscription.objects.create(tenant=self.tenant, person=self.person, endpoint="https://push.test/1", p256dh="k", auth="a")
+        self.today = datetime.date(2026, 3, 2)
+        self.now = court_datetime(self.today, datetime.time(12, 0))
+        self.cd = CourtDate.objects.create(tenant=self.tenant, person=self.person, court="County Court 3",
+                                           date=self.today + datetime.timedelta(days=3), time=datetime.time(10, 0))
+
+    def event_in(self, days):
+        return court_datetime(self.today + datetime.timedelta(days=days), datetime.time(10, 0))
+
+    def queued(self):
+        return list(CourtDateReminder.objects.order_by("pk").values_list("kind", "event_at"))
+
+    def test_second_run_queues_nothing(self):
+        self.assertEqual(send_due_reminders(now=self.now)["queued"], 1)
+        self.assertEqual(send_due_reminders(now=self.now + datetime.timedelta(minutes=5))["queued"], 0)
+        self.assertEqual(NotificationOutbox.objects.count(), 1)
+
+    def test_concurrent_run_is_stopped_by_the_unique_reminder(self):
+        send_due_reminders(now=self.now)
+        # a run that read CourtDateReminder before the first one wrote it
+        with mock.patch.object(CourtDateReminder.objects, "filter", return_value=CourtDateReminder.objects.none()):
+            self.assertEqual(send_due_reminders(now=self.now)["queued"], 0)
+        self.assertEqual(NotificationOutbox.objects.count(), 1)
+
+    def test_rescheduled_court_date_is_reminded_again(self):
+        send_due_reminders(now=self.now)
+        self.cd.date += datetime.timedelta(days=2)
+        self.cd.save()
+        self.assertEqual(send_due_reminders(now=self.now)["queued"], 1)
+
+        # moved up to tomorrow: the 1-day reminder, not a late 7-day one
+        self.cd.date = self.today + datetime.timedelta(days=1)
+        self.cd.save()
+        self.assertEqual(send_due_reminders(now=self.now)["queued"], 1)
+        self.assertEqual(self.queued(), [("7d", self.event_in(3)), ("7d", self.event_in(5)), ("1d", self.event_in(1))])
+        self.assertEqual(NotificationOutbox.objects.latest("pk").urgency, "normal")
+
+
+class CheckInTests(ViewTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tenant.checkin_interval_days = 7
+        self.tenant.save()
+        self.now = timezone.now()
+        self.never = Person.objects.create(tenant=self.tenant, first_name="Never", last_name="A")
+        self.late = Person.objects.create(tenant=self.tenant, first_name="Late", last_name="B")
+        self.recent = Person.objects.create(tenant=self.tenant, first_name="Recent", last_name="C")
+        PushSubscription.objects.create(tenant=self.tenant, person=self.late, endpoint="https://push.test/1", p256dh="k", auth="a")
+        self.checkin(self.late, days_ago=10)
+        self.checkin(self.recent, days_ago=1)
+
+    def checkin(self, person, days_ago):
+        return CheckIn.objects.create(tenant=self.tenant, person=person,
+                                      created_at=self.now - datetime.timedelta(days=days_ago))
+
+    def last(self, person):
+        person.refresh_from_db()
+        return person.last_checkin_at
+
+    def test_last_checkin_moves_forward_and_is_recomputed_on_delete(self):
+        newest = self.checkin(self.late, days_ago=2)
+        self.checkin(self.late, days_ago=5)  # backdated entry, older than the newest
+        self.assertEqual(self.last(self.late), newest.created_at)
+        newest.delete()
+        self.assertEqual(self.last(self.late), self.now - datetime.timedelta(days=5))
+        CheckIn.objects.filter(person=self.recent).delete()  # queryset delete sends post_delete per row too
+        self.assertIsNone(self.last(self.recent))
+
+    def test_dashboard_report_and_sweep_agree_on_who_missed(self):
+        self.assertEqual(compute_kpis(self.tenant)["missed_checkins"], 2)
+        r = self.client.get(reverse("report_people_without_recent_checkin"))
+        self.assertContains(r, "Never A")
+        self.assertContains(r, "Late B")
+        self.assertNotContains(r, "Recent C")
+        self.assertEqual(flag_missed_checkins(now=self.now)["flagged"], 2)
+
+    def test_alerted_once_per_interval(self):
+        stats = flag_missed_checkins(now=self.now)
+        self.assertEqual((stats["flagged"], stats["queued"]), (2, 2))  # Late's device + the staff summary
+        self.assertEqual(flag_missed_checkins(now=self.now + datetime.timedelta(days=6))["flagged"], 0)
+        # a week on: Never and Late are alerted again, and Recent has now missed too
+        self.assertEqual(flag_missed_checkins(now=self.now + datetime.timedelta(days=7, hours=1))["flagged"], 3)
+
+
+class DashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tenant = Tenant.objects.create(name="T")
+        self.person = Person.objects.create(tenant=self.tenant, first_name="Ann", last_name="Lee")
+        self.key = dashboard_cache_key(self.tenant.pk)
+
+    def add_person(self, i):
+        p = Person.objects.create(tenant=self.tenant, first_name=f"P{i}", last_name="Smith")
+        Bond.objects.create(tenant=self.tenant, person=p, date=datetime.date.today(), amount=Decimal("100"))
+        CourtDate.objects.create(tenant=self.tenant, person=p, date=datetime.date.today())
+        CheckIn.objects.create(tenant=self.tenant, person=p)
+
+    def test_kpis_take_four_queries_whatever_the_size(self):
+        for size in (1, 20):
+            for i in range(size):
+                self.add_person(i)
+            with self.assertNumQueries(4):
+                kpis = compute_kpis(self.tenant)
+        self.assertEqual(kpis["bonds"], 21)
+        self.assertEqual(kpis["liability"], Decimal("2100"))
+
+    def test_kpis_are_cached(self):
+        dashboard_kpis(self.tenant)
+        with self.assertNumQueries(0):
+            dashboard_kpis(self.tenant)
+
+    def test_writes_clear_the_cached_kpis_on_commit(self):
+        today = datetime.date.today()
+        invoice = Invoice.objects.create(tenant=self.tenant, person=self.person, amount=Decimal("80"))
+        writes = {
+            "bond": lambda: Bond.objects.create(tenant=self.tenant, person=self.person, date=today, amount=Decimal("500")),
+            "invoice": lambda: Invoice.objects.create(tenant=self.tenant, person=self.person, amount=Decimal("40")),
+            "receipt": lambda: Receipt.objects.create(tenant=self.tenant, invoice=invoice, amount=Decimal("30")),
+            "court date": lambda: CourtDate.objects.create(tenant=self.tenant, person=self.person, date=today),
+            "court date delete": lambda: CourtDate.objects.filter(person=self.person).delete(),
+            "check-in": lambda: CheckIn.objects.create(tenant=self.tenant, person=self.person),
+        }
+        tiles = lambda: {k: v for k, v in dashboard_kpis(self.tenant).items() if k != "computed_at"}
+        for name, write in writes.items():
+            with self.subTest(name):
+                before = tiles()
+                with self.captureOnCommitCallbacks() as callbacks:
+                    write()
+                self.assertIsNotNone(cache.get(self.key), "cleared before commit")
+                for callback in callbacks:
+                    callback()
+                self.assertIsNone(cache.get(self.key))
+                self.assertNotEqual(tiles(), before)
+
+
+class IcsTextTests(TestCase):
+    def unfold(self, text):
+        """The logical lines of `text`, after checking every physical line fits in 75 octets."""
+        self.assertTrue(text.endswith("\r\n"))
+        for line in text[:-2].split("\r\n"):
+            self.assertLessEqual(len(line.encode("utf-8")), 75, line)
+        return text[:-2].replace("\r\n ", "").split("\r\n")
+
+    def test_short_line_is_not_folded(self):
+        self.assertEqual(fold("SUMMARY:x"), "SUMMARY:x\r\n")
+        self.assertEqual(fold("X:" + "a" * 73), "X:" + "a" * 73 + "\r\n")
+
+    def test_multibyte_text_folds_at_75_octets_between_characters(self):
+        for ch in ("é", "€", "😀"):  # 2, 3 and 4 bytes in UTF-8
+            with self.subTest(ch):
+                line = "LOCATION:" + ch * 60
+                folded = fold(line)
+                self.assertGreater(folded.count("\r\n "), 0)
+                self.assertEqual(self.unfold(folded), [line])
+
+    def test_escaping(self):
+        self.assertEqual(escape_text("Lee, Ann; 2nd\nfloor\r\nroom\\5"), r"Lee\, Ann\; 2nd\nfloor\nroom\\5")
+        self.assertEqual(escape_text(None), "")
+
+    def test_feed_lines_are_escaped_and_folded(self):
+        tenant = Tenant.objects.create(name="T")
+        person = Person.objects.create(tenant=tenant, first_name="Zoë", last_name="Ávila, Jr.")
+        CourtDate.objects.create(tenant=tenant, person=person, date=datetime.date(2026, 5, 4),
+                                 location="Palais de justice; salle 4\n" + "é" * 50)
+        lines = self.unfold("".join(iter_feed(feed_queryset(tenant), "Test")))
+        self.assertIn(r"SUMMARY:Court: Zoë Ávila\, Jr.", lines)
+        self.assertIn(r"LOCATION:Palais de justice\; salle 4\n" + "é" * 50, lines)
+
+
+class CalendarFeedTests(ViewTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.person = Person.objects.create(tenant=self.tenant, first_name="Ann", last_name="Lee")
+        self.cd = CourtDate.objects.create(tenant=self.tenant, person=self.person, date=datetime.date(2026, 5, 4), court="Court 1")
+
+    def get(self, url, **headers):
+        r = self.client.get(url, headers=headers)
+        body = b"".join(r.streaming_content).decode() if r.streaming else r.content.decode()
+        return r, body
+
+    def test_repeated_request_with_matching_etag_is_a_304(self):
+        for url in (reverse("calendar_ics"), reverse("person_calendar_ics", args=[self.person.pk])):
+            with self.subTest(url):
+                r, body = self.get(url)
+                self.assertEqual(r.status_code, 200)
+                self.assertIn("SUMMARY:Court: Ann Lee", body)
+                r, _ = self.get(url, if_none_match=r["ETag"])
+                self.assertEqual(r.status_code, 304)
+
+    def test_court_date_save_changes_the_etag_and_the_body(self):
+        url = reverse("calendar_ics")
+        first, _ = self.get(url)
+        self.cd.court = "Court 2"
+        self.cd.save()
+        r, body = self.get(url, if_none_match=first["ETag"])
+        self.assertEqual(r.status_code, 200)
+        self.assertNotEqual(r["ETag"], first["ETag"])
+        self.assertIn("LOCATION:Court 2", body)
+
+
+class CalendarFragmentTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tenant = Tenant.objects.create(name="T")
+        self.other = Tenant.objects.create(name="Other")
+        self.person = Person.objects.create(tenant=self.tenant, first_name="Ann", last_name="Lee")
+        self.today = datetime.date(2026, 1, 10)
+        self.months = [datetime.date(2025, 11, 1)] + [datetime.date(2026, m, 1) for m in range(1, 9)]
+
+    def keys(self, tenant=None):
+        tenant_id = (tenant or self.tenant).pk
+        return {m: fragment_key(tenant_id, m, self.today) for m in self.months}
+
+    def changed_months(self, write):
+        before, other_before = self.keys(), self.keys(self.other)
+        with self.captureOnCommitCallbacks(execute=True):
+            write()
+        self.assertEqual(self.keys(self.other), other_before)
+        after = self.keys()
+        return sorted(f"{m:%Y-%m}" for m in self.months if after[m] != before[m])
+
+    def test_save_move_and_delete_change_the_month_and_its_neighbours(self):
+        cd = CourtDate(tenant=self.tenant, person=self.person, date=datetime.date(2026, 3, 15))
+        self.assertEqual(self.changed_months(cd.save), ["2026-02", "2026-03", "2026-04"])
+
+        cd.date = datetime.date(2026, 6, 2)
+        self.assertEqual(self.changed_months(cd.save), ["2026-02", "2026-03", "2026-04", "2026-05", "2026-06", "2026-07"])
+
+        self.assertEqual(self.changed_months(cd.delete), ["2026-05", "2026-06", "2026-07"])
+
+    def test_neighbours_across_a_year_boundary(self):
+        cd = CourtDate(tenant=self.tenant, person=self.person, date=datetime.date(2025, 12, 31))
+        self.assertEqual(self.changed_months(cd.save), ["2025-11", "2026-01"])  # 2025-12 is not in self.months
+
+    def test_new_day_is_a_new_fragment(self):
+        month = self.months[1]
+        self.assertNotEqual(fragment_key(self.tenant.pk, month, self.today),
+                            fragment_key(self.tenant.pk, month, self.today + datetime.timedelta(days=1)))
+
+
+class BondRollupTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="T")
+        self.person = Person.objects.create(tenant=self.tenant, first_name="Ann", last_name="Lee")
+        self.day = datetime.date(2026, 4, 1)
+
+    def bond(self, **fields):
+        fields = {"date": self.day, "county": "Bexar", "offense_type": "DWI", "amount": Decimal("100"), **fields}
+        return Bond.objects.create(tenant=self.tenant, person=self.person, **fields)
+
+    def assertRollupsMatchBonds(self):
+        fresh = {
+            tuple(c[f] for f in ROLLUP_KEY): (c["n"], c["total"])
+            for c in Bond.objects.values(*ROLLUP_KEY).annotate(n=Count("id"), total=Sum(BOND_AMOUNT)).order_by()
+        }
+        rolled = {tuple(getattr(r, f) for f in ROLLUP_KEY): (r.count, r.total) for r in BondDailyRollup.objects.all()}
+        self.assertEqual(rolled, fresh)
+
+    def test_rollups_follow_bond_writes(self):
+        a = self.bond()
+        b = self.bond(bond_amount=Decimal("2500"))  # bond_amount wins over amount
+        self.bond(county="Travis")
+        self.assertRollupsMatchBonds()
+
+        a.amount = Decimal("175")
+        a.save()
+        self.assertRollupsMatchBonds()
+
+        b.county, b.date = "Travis", self.day + datetime.timedelta(days=1)
+        b.save()
+        self.assertRollupsMatchBonds()
+
+        a.delete()
+        self.assertRollupsMatchBonds()
+        b.delete()
+        self.assertRollupsMatchBonds()
+        self.assertEqual(BondDailyRollup.objects.count(), 1)
+        self.assertEqual(rebuild_bond_rollups(fix=False), {"checked": 1, "missing": 0, "drifted": 0, "stale": 0})
+
+    def test_rebuild_reports_and_repairs_drift(self):
+        self.bond()
+        self.bond(county="Travis")
+        self.bond(county="Hays")
+        BondDailyRollup.objects.filter(county="Bexar").update(total=Decimal("1"))
+        BondDailyRollup.objects.filter(county="Travis").delete()
+        BondDailyRollup.objects.create(tenant=self.tenant, date=self.day, county="Nowhere", count=3, total=Decimal("9"))
+
+        self.assertEqual(rebuild_bond_rollups(fix=False), {"checked": 3, "missing": 1, "drifted": 1, "stale": 1})
+        rebuild_bond_rollups()
+        self.assertRollupsMatchBonds()
+        self.assertEqual(rebuild_bond_rollups(fix=False), {"checked": 3, "missing": 0, "drifted": 0, "stale": 0})
+
+
+class LookupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        vocab = mock.patch.dict(lookups._vocab, clear=True)
+        vocab.start()
+        self.addCleanup(vocab.stop)
+
+    def remember(self, changed=None, **fields):
+        lookups.remember_bond_lookups(Bond(**fields), changed)
+
+    def uses(self, category):
+        return dict(LookupValue.objects.filter(category=category).values_list("value", "uses"))
+
+    def test_each_saved_value_counts_one_use(self):
+        with self.assertNumQueries(2):
+            self.remember(county="Bexar ", charge="DWI", offense_type="", jurisdiction="")
+        self.remember(county="Bexar", charge="Theft", offense_type="Felony")
+        # an edit that only changed the county
+        self.remember(changed=["county"], county="Travis", charge="Theft", offense_type="Felony")
+        self.assertEqual(self.uses("county"), {"Bexar": 2, "Travis": 1})
+        self.assertEqual(self.uses("charge"), {"DWI": 1, "Theft": 1})
+        self.assertEqual(self.uses("jurisdiction"), {})
+
+    def test_most_used_first_then_alphabetical(self):
+        for county in ("Hays", "Bexar", "Travis", "Bexar", "Harris", "Harris"):
+            self.remember(county=county)
+        self.assertEqual(lookups.top_values("county"), ["Bexar", "Harris", "Hays", "Travis"])
+        self.assertEqual(lookups.suggest("county", "ha"), ["Harris", "Hays"])
+        self.assertEqual(lookups.suggest("county", "H", limit=1), ["Harris"])
+
+    def test_other_workers_writes_are_seen_after_a_version_bump_or_the_ttl(self):
+        self.remember(county="Bexar")
+        self.assertEqual(lookups.top_values("county"), ["Bexar"])
+        # written without bumping the version, as a worker with its own cache would
+        LookupValue.objects.create(category="county", value="Travis", uses=5)
+        with self.assertNumQueries(0):
+            self.assertEqual(lookups.top_values("county"), ["Bexar"])
+
+        later = time.monotonic() + lookups.VOCAB_TTL + 1
+        with mock.patch("core.lookups.time.monotonic", return_value=later):
+            self.assertEqual(lookups.top_values("county"), ["Travis", "Bexar"])
+
+        LookupValue.objects.filter(value="Bexar").update(uses=9)
+        lookups.invalidate(["county"])
+        with mock.patch("core.lookups.time.monotonic", return_value=later):
+            self.assertEqual(lookups.top_values("county"), ["Bexar", "Travis"])
+
+
+class PlanSweepTests(ViewTestCase):
+    """Installments due 2026-01-01, 02-01 and 03-01."""
+
+    def setUp(self):
+        super().setUp()
+        self.plan = self.make_plan(Person.objects.create(tenant=self.tenant, first_name="Ann", last_name="Lee"))
+
+    def make_plan(self, person):
+        plan = PaymentPlan.objects.create(
+            person=person, start_date=datetime.date(2026, 1, 1), frequency=PaymentPlan.FREQ_MONTHLY,
+            n_payments=3, installment_amount=Decimal("50.00"),
+        )
+        create_installments(plan)
+        return plan
+
+    def statuses(self, plan):
+        return list(plan.installments.order_by("sequence").values_list("status", flat=True))
+
+    def test_sweep_marks_past_due_installments_late(self):
+        self.plan.installments.get(sequence=1).mark_paid()
+        other = self.make_plan(Person.objects.create(tenant=Tenant.objects.create(name="Other")))
+        feb_15 = datetime.date(2026, 2, 15)
+
+        with self.assertNumQueries(2):
+            stats = sweep_late_installments(today=feb_15, tenant=self.tenant)
+        self.assertEqual(stats, {"late": 1, "deactivated": 0})
+        self.assertEqual(self.statuses(self.plan), ["paid", "late", "due"])
+        self.assertEqual(self.statuses(other), ["due", "due", "due"])
+
+        self.assertEqual(sweep_late_installments(today=feb_15, dry_run=True), {"late": 2, "deactivated": 0})
+        self.assertEqual(sweep_late_installments(today=feb_15)["late"], 2)
+        self.assertEqual(self.statuses(other), ["late", "late", "due"])
+
+    def test_plan_is_deactivated_only_by_its_last_payment(self):
+        sweep_late_installments(today=datetime.date(2026, 4, 1))  # all three late
+        for inst in self.plan.installments.order_by("sequence"):
+            self.plan.refresh_from_db()
+            self.assertTrue(self.plan.active)
+            self.assertEqual(self.client.post(reverse("installment_mark_paid", args=[inst.pk])).status_code, 200)
+        self.plan.refresh_from_db()
+        self.assertFalse(self.plan.active)
+        self.assertEqual(self.statuses(self.plan), ["paid", "paid", "paid"])
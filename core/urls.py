@@ -5,6 +5,7 @@ from . import views_people as views
 urlpatterns = [
     path('', views.people_home, name='people_home'),
     path('tab/list/', views.people_tab_list, name='people_tab_list'),
+    path('tab/list/row/<int:pk>/', views.people_list_row, name='people_list_row'),
     path('tab/main/<int:pk>/', views.person_main_panel, name='people_tab_main'),
     path('new/partial/', views.person_new_partial, name='person_new_partial'),
     path('edit/<int:pk>/', views.person_edit_partial, name='person_edit_partial'),
@@ -34,6 +35,7 @@ urlpatterns = [
     # Bonds
     path("people/<int:person_pk>/bonds/new/partial/", views.bond_new_partial, name="bond_new_partial"),
     path("bonds/<int:pk>/edit/partial/", views.bond_edit_partial, name="bond_edit_partial"),
+    path("lookups/autocomplete/", views.lookup_autocomplete, name="lookup_autocomplete"),
     path("people/bonds/<int:pk>/delete/", views.bond_delete, name="bond_delete"),
     path("people/<int:person_pk>/checkins/new/partial/", views.checkin_new_partial, name="checkin_new_partial"),
     path("checkins/<int:pk>/edit/partial/",              views.checkin_edit_partial, name="checkin_edit_partial"),
@@ -54,6 +56,7 @@ urlpatterns = [
     # Payment plans
     path("people/<int:person_pk>/plans/section/partial/", views.payment_plan_section_partial, name="payment_plan_section_partial"),
     path("people/<int:person_pk>/plans/new/partial/", views.payment_plan_new_partial, name="payment_plan_new_partial"),
+    path("plans/<int:pk>/edit/partial/", views.payment_plan_edit_partial, name="payment_plan_edit_partial"),
     path("plans/<int:pk>/cancel/", views.payment_plan_cancel, name="payment_plan_cancel"),
     path("installments/<int:pk>/mark-paid/", views.installment_mark_paid, name="installment_mark_paid"),
 
@@ -63,6 +66,8 @@ urlpatterns = [
     path("people/<int:person_pk>/calendar/partial/", views.person_calendar_partial, name="person_calendar_partial"),
     # Global Calendar (all people)
     path("calendar/partial/", views.calendar_partial, name="calendar_partial"),
+    path("calendar/feed.ics", views.calendar_ics, name="calendar_ics"),
+    path("people/<int:person_pk>/calendar.ics", views.person_calendar_ics, name="person_calendar_ics"),
 
     # Court date printable notice
     path("court-dates/<int:pk>/notice/", views.court_date_notice, name="court_date_notice"),
@@ -71,6 +76,11 @@ urlpatterns = [
     path("receipts/<int:pk>/print/", views.receipt_print, name="receipt_print"),
 
     path("people/import/", views.person_import, name="people_import"),
+    path("people/import/jobs/<int:pk>/", views.person_import_job, name="people_import_job"),
+    path("people/import/jobs/<int:pk>/resume/", views.person_import_job_resume, name="people_import_job_resume"),
+
+    # Dashboard KPI tiles (lazy-loaded into home.html)
+    path("dashboard/partial/", views.dashboard_partial, name="dashboard_partial"),
 
     # Reports menu + endpoints
     path("reports/panel/", views.reports_panel, name="reports_panel"),
@@ -1,26 +1,36 @@
 # core/utils.py
+import datetime as dt
+
 from django.http import Http404
-from .models import Tenant
+from django.utils import timezone
 
 def get_current_tenant(request, required=True):
     """
-    Tries a few ways to find a tenant for the current request.
-    Falls back to the first Tenant row if present.
+    The tenant for this request. TenantAttachMiddleware resolves it once per
+    request (the user and its tenant_profile come from one query, see
+    core.auth_backends) and stores it as request.tenant. Requests that did not
+    go through the middleware look it up here and memoize it the same way.
+    There is no fallback to another tenant.
     """
-    u = getattr(request, "user", None)
+    if not hasattr(request, "tenant"):
+        user = getattr(request, "user", None)
+        request.tenant = getattr(user, "tenant_profile", None) if user is not None and user.is_authenticated else None
+
+    if request.tenant is None and required:
+        raise Http404("No tenant is configured for this user.")
+    return request.tenant
 
-    # 1) direct attr (works if you *do* have a custom user with .tenant someday)
-    if u is not None:
-        t = getattr(u, "tenant", None)
-        if t:
-            return t
 
-    # 2) simple fallback: first tenant in DB (common single-tenant setup)
-    t = Tenant.objects.first()
-    if t:
-        return t
+def _ensure_aware(d: dt.datetime | None) -> dt.datetime | None:
+    if d is None:
+        return None
+    if timezone.is_naive(d):
+        return timezone.make_aware(d, timezone.get_current_timezone())
+    return d
 
-    if required:
-        # No tenant exists at all — guide the admin to create one
-        raise Http404("No Tenant configured yet. Create one in the admin (core.Tenant).")
-    return None
+def _combine_date_time_aware(d: dt.date | None, t: dt.time | None) -> dt.datetime | None:
+    if not d:
+        return None
+    if t is None:
+        t = dt.time(0, 0)
+    return _ensure_aware(dt.datetime.combine(d, t))
@@ -1,33 +1,43 @@
 from __future__ import annotations
 import base64, csv, io, json
-from dataclasses import dataclass
 from typing import Dict, List, Any, Optional
 from django.contrib import messages
 from django.shortcuts import render, get_object_or_404
-from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseNotAllowed, HttpRequest, JsonResponse
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseNotAllowed, HttpRequest, JsonResponse, StreamingHttpResponse
 from django.contrib.auth.decorators import login_required
-from .models import Person, Indemnitor, Reference, Bond, CourtDate, CheckIn, Invoice, Receipt, PaymentPlan, PlanInstallment, LookupValue
+from .models import Person, Indemnitor, Reference, Bond, CourtDate, CheckIn, Invoice, Receipt, PaymentPlan, PlanInstallment, PersonBalance, ImportUpload, ImportJob, BondDailyRollup
 from .forms import PersonForm, IndemnitorForm, ReferenceForm, BondForm, CourtDateForm, CheckInForm, InvoiceForm, ReceiptForm, PaymentPlanForm
 from .utils import get_current_tenant
+from .billing import with_ledger, person_ledger, invoice_totals, get_person_balance
+from .search import search_people
+from .notifications import enqueue_push
+from .checkins import SELF_CHECKIN_SIGNER, missed_checkins
+from .ics import feed_etag, feed_queryset, cached_feed
+from .calendar_cache import fragment_key, FRAGMENT_TIMEOUT
+from .dashboard import dashboard_kpis
+from .plans import create_installments, reschedule, deactivate_finished_plans
+from .lookups import CATEGORIES as LOOKUP_CATEGORIES, lookup_context, remember_bond_lookups, suggest
+from .importer import stage_upload, read_preview, resume_import_job, run_import_job_inline, MAX_RESULTS
 from decimal import Decimal
-from django.db.models import Sum, Count, F, Q, Value, DecimalField, OuterRef, Subquery, ExpressionWrapper, Max
+from django.db.models import Sum, Count, F, Q, Value, DecimalField, OuterRef, Subquery, ExpressionWrapper, Max, Exists, Prefetch
 from django.utils import timezone
 from django.db import transaction
 from django.urls import reverse
 from datetime import datetime, timedelta, date
-from django.views.decorators.http import require_POST, require_http_methods
+from django.views.decorators.http import require_POST, require_http_methods, condition
 from django.db.models.deletion import ProtectedError
 from calendar import monthrange
 from django.core.exceptions import ValidationError
 from django.template.loader import render_to_string
+from django.core.paginator import Paginator
+from django.core.cache import cache
 from django.utils.html import escape
 from django.db.models.functions import Coalesce
-from pywebpush import webpush, WebPushException
 from .models import PushSubscription
 from django.conf import settings
 from django.middleware.csrf import get_token
 from django.views.decorators.csrf import csrf_exempt
-from django.core.signing import TimestampSigner, BadSignature, SignatureExpired
+from django.core.signing import BadSignature, SignatureExpired
 from django.core.files.uploadedfile import UploadedFile
 import datetime as dt
 from django.template import loader, TemplateDoesNotExist
@@ -53,25 +63,78 @@ ALLOWED_FIELDS = ["first_name","last_name","phone","email","dob","address","city
 def people_home(request):
     return render(request, 'people/home.html', {})
 
+PEOPLE_PAGE_SIZE = 50
+
+def _people_cursor(p) -> str:
+    raw = json.dumps([p.last_name, p.first_name, p.pk]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+def _people_after(qs, cursor: str):
+    """
+    Keyset filter: rows strictly after (last_name, first_name, id) in list order.
+    Returns None for a cursor _people_cursor didn't produce.
+    """
+    try:
+        last, first, pk = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError, UnicodeError):
+        return None
+    if not (isinstance(last, str) and isinstance(first, str) and isinstance(pk, int)):
+        return None
+    return qs.filter(
+        Q(last_name__gt=last)
+        | Q(last_name=last, first_name__gt=first)
+        | Q(last_name=last, first_name=first, pk__gt=pk)
+    )
+
 @login_required
 def people_tab_list(request):
     q = request.GET.get('q', '').strip()
+    after = request.GET.get('after', '')
     qs = Person.objects.filter(tenant=request.tenant)
     if q:
-        qs = qs.filter(Q(first_name__icontains=q) | Q(last_name__icontains=q) | Q(phone__icontains=q) | Q(email__icontains=q))
-    return render(request, 'people/_list.html', {'people': qs.order_by('last_name','first_name')[:200]})
+        # ranked prefix match over the PersonSearchToken index (see core.search)
+        return render(request, 'people/_list.html', {'people': search_people(qs, request.tenant, q)[:200], 'q': q})
+
+    # keyset pagination on (last_name, first_name, id) -> Person(tenant, last_name, first_name) index
+    qs = qs.order_by('last_name', 'first_name', 'pk')
+    if after:
+        qs = _people_after(qs, after)
+        if qs is None:
+            return HttpResponseBadRequest("Invalid cursor")
+    page = list(qs[:PEOPLE_PAGE_SIZE + 1])
+    ctx = {
+        'people': page[:PEOPLE_PAGE_SIZE],
+        'next_cursor': _people_cursor(page[PEOPLE_PAGE_SIZE - 1]) if len(page) > PEOPLE_PAGE_SIZE else "",
+    }
+    # "load more" requests only need the next rows + sentinel
+    return render(request, 'people/_list_page.html' if after else 'people/_list.html', ctx)
+
+@login_required
+def people_list_row(request, pk):
+    """Single list row, used to patch the list after a person is created/edited."""
+    person = get_object_or_404(Person, pk=pk, tenant=request.tenant)
+    return render(request, 'people/_list_row.html', {'p': person})
 
 def person_main_panel(request, pk):
     tenant = get_current_tenant(request)
     person = get_object_or_404(Person, pk=pk, tenant=tenant)
+    return render(request, "people/_tab_main.html", _person_panel_context(person))
+
+def _person_panel_context(person):
+    """
+    Everything _tab_main.html needs in one go: the inline field editors are
+    rendered server-side (bulk mode) so the panel doesn't fan out one
+    person_field_edit request per field on load.
+    """
     invoice_rows, invoice_totals = _invoice_context(person)
     receipt_list = _receipts_for_person(person)
-    return render(request, "people/_tab_main.html", {
+    return {
         "person": person,
+        "inline_fields": _inline_fields_ctx(person),
         "invoice_rows": invoice_rows,
         "invoice_totals": invoice_totals,
         "receipt_list": receipt_list,
-    })
+    }
 
 
 @login_required
@@ -84,10 +147,9 @@ def person_new_partial(request):
             person.tenant = tenant
             person.save()
             # Return the main tab for the new person and trigger list refresh + auto-select + close modal
-            resp = render(request, "people/_tab_main.html", {"person": person})
+            resp = render(request, "people/_tab_main.html", _person_panel_context(person))
             resp["HX-Trigger"] = json.dumps({
-                "people_list_refresh": True,
-                "people_select": {"pk": person.pk},
+                "people_row_changed": {"pk": person.pk},
                 "modal_close": True,
             })
             return resp
@@ -114,10 +176,9 @@ def person_save_partial(request, pk):
     form = PersonForm(request.POST, instance=person)
     if form.is_valid():
         person = form.save()
-        resp = render(request, "people/_tab_main.html", {"person": person})
+        resp = render(request, "people/_tab_main.html", _person_panel_context(person))
         resp["HX-Trigger"] = json.dumps({
-            "people_list_refresh": True,
-            "people_select": {"pk": person.pk},
+            "people_row_changed": {"pk": person.pk},
             "modal_close": True,
         })
         return resp
@@ -139,17 +200,13 @@ def person_delete(request, pk):
           </div>
         """)
 
-    # OOB updates: clear the main panel and refresh the people list
-    from django.urls import reverse
+    # OOB updates: clear the main panel and drop just this row from the people list
     html = f"""
       <div id="tab-main" hx-swap-oob="true">
         <div class="muted">Person deleted. Select a person or create a new one.</div>
       </div>
 
-      <div id="people-list"
-           hx-get="{reverse('people_tab_list')}"
-           hx-trigger="load"
-           hx-swap-oob="true"></div>
+      <a id="person-row-{pk}" hx-swap-oob="delete"></a>
     """
     return HttpResponse(html)
 
@@ -284,7 +341,7 @@ def bond_new_partial(request, person_pk):
             resp["HX-Trigger"] = json.dumps({"modal_close": True, "billing_changed": True})
             return resp
 
-        return render(request, "people/_form_bond.html", {"form": form, "person": person})
+        return render(request, "people/_form_bond.html", {"form": form, "person": person, "lookups": _lookup_ctx()})
     else:
         form = BondForm()
     return render(
@@ -303,7 +360,7 @@ def bond_edit_partial(request, pk):
         form = BondForm(request.POST, instance=bond)
         if form.is_valid():
             bond = form.save()
-            _remember_lookups_from_bond(bond)
+            _remember_lookups_from_bond(bond, changed=form.changed_data)
             return render(request, "people/_section_bonds.html", {"person": person})
     else:
         form = BondForm(instance=bond)
@@ -326,26 +383,25 @@ def bond_delete(request, pk):
     return render(request, "people/_section_bonds.html", {"person": person})
 
 def _lookup_ctx():
-    """Fetch lookup values grouped by category for the template."""
-    qs = LookupValue.objects.all()
-    return {
-        "charge":       qs.filter(category="charge"),
-        "county":       qs.filter(category="county"),
-        "offense_type": qs.filter(category="offense_type"),
-        "jurisdiction": qs.filter(category="jurisdiction"),
-    }
+    """Top datalist values per category (cached in-process, see core.lookups)."""
+    return lookup_context()
+
+def _remember_lookups_from_bond(bond: Bond, changed=None):
+    """Store any non-empty text into the LookupValue table (only `changed` fields on edit)."""
+    remember_bond_lookups(bond, changed)
 
-def _remember_lookups_from_bond(bond: Bond):
-    """Store any non-empty text into the LookupValue table."""
-    pairs = [
-        ("charge",       bond.charge),
-        ("county",       bond.county),
-        ("offense_type", bond.offense_type),
-        ("jurisdiction", bond.jurisdiction),
-    ]
-    for cat, val in pairs:
-        if val:
-            LookupValue.objects.get_or_create(category=cat, value=val.strip())
+@login_required
+@require_http_methods(["GET"])
+def lookup_autocomplete(request):
+    """?category=charge&q=ag -> {"results": [...]}, most used first."""
+    category = request.GET.get("category", "")
+    if category not in LOOKUP_CATEGORIES:
+        return HttpResponseBadRequest("Unknown category")
+    try:
+        limit = max(1, min(int(request.GET.get("limit") or 10), 50))
+    except ValueError:
+        limit = 10
+    return JsonResponse({"results": suggest(category, request.GET.get("q", ""), limit)})
 
 @login_required
 def court_date_new_partial(request, person_pk):
@@ -491,13 +547,11 @@ def checkin_last_widget(request, person_pk):
     tenant = get_current_tenant(request)
     person = get_object_or_404(Person, pk=person_pk, tenant=tenant)
 
-    last_ci = CheckIn.objects.filter(person=person, tenant=tenant)\
-                             .order_by('-created_at', '-id').first()
-
+    # last_checkin_at is kept current by the CheckIn signals (core.checkins)
     days_since = None
     last_date = None
-    if last_ci and last_ci.created_at:
-        last_date = timezone.localdate(last_ci.created_at)
+    if person.last_checkin_at:
+        last_date = timezone.localdate(person.last_checkin_at)
         days_since = (timezone.localdate() - last_date).days
 
     return render(request, "people/_widget_last_checkin.html", {
@@ -571,17 +625,8 @@ def invoice_delete(request, pk):
     })
 
 def _invoice_context(person):
-    rows = []
-    total_amt = Decimal('0')
-    total_paid = Decimal('0')
-    for inv in person.invoices.all().prefetch_related('receipts'):
-        paid = inv.receipts.aggregate(s=Sum('amount'))['s'] or Decimal('0')
-        amt = inv.amount or Decimal('0')
-        rows.append({"inv": inv, "paid": paid, "balance": amt - paid})
-        total_amt += amt
-        total_paid += paid
-    totals = {"amount": total_amt, "paid": total_paid, "balance": total_amt - total_paid}
-    return rows, totals
+    # one annotated query for every invoice's paid/balance (see core.billing)
+    return person_ledger(person)
 
 @login_required
 def invoices_section_partial(request, person_pk):
@@ -602,13 +647,10 @@ def billing_summary_widget(request, person_pk):
     tenant = get_current_tenant(request)
     person = get_object_or_404(Person, pk=person_pk, tenant=tenant)
 
-    total_amt = person.invoices.aggregate(s=Sum('amount'))['s'] or Decimal('0')
-    total_paid = Receipt.objects.filter(invoice__person=person, invoice__tenant=tenant) \
-                                .aggregate(s=Sum('amount'))['s'] or Decimal('0')
-    balance = total_amt - total_paid
+    ledger = get_person_balance(person)
+    balance = ledger.balance
 
-    last_dt = Receipt.objects.filter(invoice__person=person, invoice__tenant=tenant) \
-                             .aggregate(m=Max('date'))['m']
+    last_dt = ledger.last_payment_date
     days_since = None
     if last_dt:
         days_since = (timezone.localdate() - last_dt).days
@@ -745,11 +787,10 @@ def receipt_print(request, pk):
     invoice = receipt.invoice
     person = invoice.person
 
-    invoice_total = invoice.amount or 0
-    total_paid_to_date = Receipt.objects.filter(invoice=invoice).aggregate(
-        s=Sum("amount")
-    )["s"] or 0
-    balance_after = max((invoice_total or 0) - (total_paid_to_date or 0), 0)
+    ledger = invoice_totals(invoice)
+    invoice_total = ledger["amount"]
+    total_paid_to_date = ledger["paid"]
+    balance_after = max(ledger["balance"], 0)
 
     return render(request, "people/print_receipt.html", {
         "tenant": tenant,
@@ -761,20 +802,13 @@ def receipt_print(request, pk):
         "balance_after": balance_after,
     })
 
-# --- helpers ---
-def _add_period(d: date, frequency: str, seq: int) -> date:
-    if frequency == PaymentPlan.FREQ_WEEKLY:
-        return d + timedelta(weeks=seq-1)
-    if frequency == PaymentPlan.FREQ_BIWEEKLY:
-        return d + timedelta(weeks=(2*(seq-1)))
-    # monthly (simple month add: 30 days per step to avoid dateutil dep)
-    return d + timedelta(days=30*(seq-1))
-
-
 @login_required
 def payment_plan_section_partial(request, person_pk):
-    person = get_object_or_404(Person, pk=person_pk)
-    plans = person.payment_plans.order_by("-created_at")
+    person = _get_person_scoped(request, person_pk)
+    # installments for every plan in one extra query
+    plans = (person.payment_plans
+             .order_by("-created_at")
+             .prefetch_related(Prefetch("installments", queryset=PlanInstallment.objects.order_by("sequence"))))
     return render(request, "people/_section_payment_plan.html",
                   {"person": person, "plans": plans, "today": timezone.localdate()})
 
@@ -799,12 +833,7 @@ def payment_plan_new_partial(request, person_pk):
     plan: PaymentPlan = form.save(commit=False)
     plan.person = person
     plan.save()
-
-    for i in range(1, plan.n_payments + 1):
-        due = _add_period(plan.start_date, plan.frequency, i)
-        PlanInstallment.objects.create(
-            plan=plan, sequence=i, due_date=due, amount=plan.installment_amount
-        )
+    create_installments(plan)
 
     # Return OOB to refresh the section and close any modal/inline form
     html = f"""
@@ -816,11 +845,38 @@ def payment_plan_new_partial(request, person_pk):
     return HttpResponse(html)
 
 
+@login_required
+@require_http_methods(["GET","POST"])
+@transaction.atomic
+def payment_plan_edit_partial(request, pk):
+    plan = get_object_or_404(PaymentPlan.objects.select_related("person"), pk=pk, person__tenant=get_current_tenant(request))
+    person = plan.person
+    post_url = reverse("payment_plan_edit_partial", args=[plan.pk])
+
+    form = PaymentPlanForm(request.POST or None, instance=plan)
+    form.fields["invoice"].queryset = Invoice.objects.filter(person=person)
+    if request.method == "GET" or not form.is_valid():
+        return render(request, "people/_form_payment_plan.html",
+                      {"form": form, "person": person, "plan": plan, "post_url": post_url})
+
+    plan = form.save()
+    reschedule(plan)
+
+    html = f"""
+      <div id="payment-plan-section"
+           hx-get="{reverse('payment_plan_section_partial', args=[person.pk])}"
+           hx-trigger="load"
+           hx-swap-oob="true"></div>
+    """
+    return HttpResponse(html)
+
+
 @login_required
 @require_POST
 def installment_mark_paid(request, pk):
-    inst = get_object_or_404(PlanInstallment, pk=pk)
+    inst = get_object_or_404(PlanInstallment, pk=pk, plan__person__tenant=get_current_tenant(request))
     inst.mark_paid()
+    deactivate_finished_plans(plans=[inst.plan_id])
     # return refreshed section
     html = f"""
       <div id="payment-plan-section"
@@ -847,53 +903,49 @@ def payment_plan_cancel(request, pk):
 
 # --- Court calendar + ICS ---
 
-def _court_dt(cd) -> datetime:
-    """Get a datetime for a CourtDate record regardless of field naming."""
-    for fld in ("scheduled_at", "hearing_at", "datetime", "date_time"):
-        if hasattr(cd, fld) and getattr(cd, fld):
-            return getattr(cd, fld)
-    d = getattr(cd, "date", None)
-    t = getattr(cd, "time", None)
-    if d and t:
-        return datetime.combine(d, t)
-    if d:
-        return datetime.combine(d, datetime.min.time())
-    return timezone.now()
+COURT_CALENDAR_DAYS = 90       # default window: today .. today + 90 days
+COURT_CALENDAR_PAGE_SIZE = 50
 
 @login_required
 def court_calendar(request):
-    qs = CourtDate.objects.select_related("person").all()
+    """
+    Court dates for the tenant inside a ?from=/?to= window (default: the next
+    COURT_CALENDAR_DAYS days), ordered and paged by the database on the
+    (tenant, date) index.
+    """
+    today = timezone.localdate()
+    start = _parse_date(request.GET.get("from")) or today
+    end = _parse_date(request.GET.get("to")) or start + timedelta(days=COURT_CALENDAR_DAYS)
     agency = request.GET.get("agency") or ""
     county = request.GET.get("county") or ""
+
+    qs = (CourtDate.objects
+          .filter(tenant=_resolve_tenant(request), date__range=(start, end))
+          .select_related("person"))
     if agency:
-        # adjust to your field name
-        qs = qs.filter(agency__icontains=agency)
+        # agency is recorded on the person's bonds
+        qs = qs.filter(Exists(Bond.objects.filter(person_id=OuterRef("person_id"), agency__icontains=agency)))
     if county:
-        # adjust to your field name
         qs = qs.filter(county__icontains=county)
-
-    # Upcoming first
-    qs = sorted(qs, key=_court_dt)
-    return render(request, "calendar/main.html", {"items": qs, "agency": agency, "county": county})
-
-def _ensure_aware(d: dt.datetime | None) -> dt.datetime | None:
-    if d is None:
-        return None
-    if timezone.is_naive(d):
-        return timezone.make_aware(d, timezone.get_current_timezone())
-    return d
-
-def _combine_date_time_aware(d: dt.date | None, t: dt.time | None) -> dt.datetime | None:
-    if not d:
-        return None
-    if t is None:
-        t = dt.time(0, 0)
-    return _ensure_aware(dt.datetime.combine(d, t))
+    qs = qs.order_by("date", "time", "pk")
+
+    page = Paginator(qs, COURT_CALENDAR_PAGE_SIZE).get_page(request.GET.get("page"))
+    params = request.GET.copy()
+    params.pop("page", None)
+    return render(request, "calendar/main.html", {
+        "items": page.object_list,
+        "page": page,
+        "qs": params.urlencode(),
+        "start": start,
+        "end": end,
+        "agency": agency,
+        "county": county,
+    })
 
     
 @login_required
 def person_calendar_partial(request, person_pk):
-    person = get_object_or_404(Person, pk=person_pk)
+    person = _get_person_scoped(request, person_pk)
 
     today = timezone.localdate()
     y = int(request.GET.get("y", today.year))
@@ -909,19 +961,17 @@ def person_calendar_partial(request, person_pk):
     _, days_in_month = monthrange(y, m)
     last_day = date(y, m, days_in_month)
 
-    # Pull this person's court dates and filter to this month
-    cds = CourtDate.objects.select_related("person").filter(person_id=person.pk)
-    month_items = []
-    for cd in cds:
-        dt = _court_dt(cd)
-        if first_day <= dt.date() <= last_day:
-            month_items.append((dt, cd))
-    month_items.sort(key=lambda x: x[0])
+    # Only this month's court dates, already in order
+    cds = (CourtDate.objects
+           .filter(tenant_id=person.tenant_id, person=person, date__range=(first_day, last_day))
+           .order_by("date", "time", "pk"))
 
     # Group into a structure that's easy for templates (avoid dict lookups by var key)
     items_by_day = {}
-    for dt, cd in month_items:
-        items_by_day.setdefault(dt.day, []).append((dt, cd))
+    for cd in cds:
+        cd.person = person
+        when = datetime.combine(cd.date, cd.time or dtime(0, 0))
+        items_by_day.setdefault(cd.date.day, []).append((when, cd))
     days_data = [{"day": d, "items": items_by_day.get(d, [])} for d in range(1, days_in_month + 1)]
 
     # Prev/Next helpers
@@ -960,6 +1010,12 @@ def calendar_partial(request):
     else:
         month_start = today_local.replace(day=1)
 
+    # Rendered grids are cached per tenant and month; court date writes invalidate them (core.signals)
+    key = fragment_key(request.tenant.pk if request.tenant else None, month_start, today_local)
+    html = cache.get(key)
+    if html is not None:
+        return HttpResponse(html)
+
     # Grid starts on the previous Sunday
     days_back = (month_start.weekday() + 1) % 7  # Monday=0..Sunday=6 -> 0 back if Sunday
     grid_start = month_start - timedelta(days=days_back)
@@ -1016,74 +1072,49 @@ def calendar_partial(request):
     }
 
     tpl = loader.select_template(["people/_calendar_global.html"])
-    return HttpResponse(tpl.render(ctx, request))
+    html = tpl.render(ctx, request)
+    cache.set(key, html, FRAGMENT_TIMEOUT)
+    return HttpResponse(html)
         
+def _ics_window(request):
+    """Optional ?from=YYYY-MM-DD&to=YYYY-MM-DD limits for the ICS feeds."""
+    return _parse_date(request.GET.get("from")), _parse_date(request.GET.get("to"))
+
+def _ics_etag(request, person_pk=None):
+    tenant = _resolve_tenant(request)
+    if tenant is None:
+        return None
+    return feed_etag(tenant, f"p{person_pk}" if person_pk else "all", *_ics_window(request))
+
+def _ics_last_modified(request, person_pk=None):
+    tenant = _resolve_tenant(request)
+    return tenant.court_dates_changed_at if tenant else None
+
+def _ics_response(body) -> StreamingHttpResponse:
+    resp = StreamingHttpResponse(body, content_type="text/calendar; charset=utf-8")
+    resp["Cache-Control"] = "private, no-cache"  # always revalidate; unchanged feeds get a 304
+    return resp
+
 @login_required
+@condition(etag_func=_ics_etag, last_modified_func=_ics_last_modified)
 def person_calendar_ics(request, person_pk):
     """ICS feed for a single person's court dates."""
-    person = get_object_or_404(Person, pk=person_pk)
-    cds = CourtDate.objects.filter(person_id=person.pk)
-    now = timezone.now()
-
-    def _ics_dt(dt: datetime) -> str:
-        # Use UTC; if your datetimes are naive/local, this is fine for a simple feed
-        return dt.strftime("%Y%m%dT%H%M%SZ")
-
-    lines = [
-        "BEGIN:VCALENDAR",
-        "VERSION:2.0",
-        "PRODID:-//BondKeeper//Person Court Calendar//EN",
-    ]
-    for cd in cds:
-        dt = _court_dt(cd)
-        uid = f"court-{person.pk}-{cd.pk}@bondkeeper"
-        loc = getattr(cd, "location", "") or getattr(cd, "court", "") or ""
-        title = f"Court: {person}"
-        lines += [
-            "BEGIN:VEVENT",
-            f"UID:{uid}",
-            f"DTSTAMP:{_ics_dt(now)}",
-            f"DTSTART:{_ics_dt(dt)}",
-            f"SUMMARY:{title}",
-            f"LOCATION:{loc}",
-            "END:VEVENT",
-        ]
-    lines.append("END:VCALENDAR")
-
-    return HttpResponse("\r\n".join(lines), content_type="text/calendar; charset=utf-8")
+    tenant = _resolve_tenant(request)
+    person = get_object_or_404(Person, pk=person_pk, tenant=tenant)
+    start, end = _ics_window(request)
+    body = cached_feed(tenant, f"p{person.pk}", feed_queryset(tenant, person, start, end),
+                       "Person Court Calendar", start, end)
+    return _ics_response(body)
 
 @login_required
+@condition(etag_func=_ics_etag, last_modified_func=_ics_last_modified)
 def calendar_ics(request):
-    """ICS feed for ALL court dates (global)."""
-    now = timezone.now()
-    qs = CourtDate.objects.select_related("person")
-
-    def _ics_dt(dt: datetime) -> str:
-        return dt.strftime("%Y%m%dT%H%M%SZ")  # simple UTC stamp
-
-    lines = [
-        "BEGIN:VCALENDAR",
-        "VERSION:2.0",
-        "PRODID:-//BondKeeper//Global Court Calendar//EN",
-    ]
-    for cd in qs:
-        dt = _court_dt(cd)
-        person = getattr(cd, "person", None)
-        display_person = str(person) if person else "Unknown"
-        uid = f"court-{getattr(person,'pk',0)}-{cd.pk}@bondkeeper"
-        loc = getattr(cd, "location", "") or getattr(cd, "court", "") or ""
-        title = f"Court: {display_person}"
-        lines += [
-            "BEGIN:VEVENT",
-            f"UID:{uid}",
-            f"DTSTAMP:{_ics_dt(now)}",
-            f"DTSTART:{_ics_dt(dt)}",
-            f"SUMMARY:{title}",
-            f"LOCATION:{loc}",
-            "END:VEVENT",
-        ]
-    lines.append("END:VCALENDAR")
-    return HttpResponse("\r\n".join(lines), content_type="text/calendar; charset=utf-8")
+    """ICS feed for all of the tenant's court dates."""
+    tenant = _resolve_tenant(request)
+    start, end = _ics_window(request)
+    body = cached_feed(tenant, "all", feed_queryset(tenant, None, start, end),
+                       "Global Court Calendar", start, end)
+    return _ics_response(body)
 
 def _norm(s: str) -> str: return (s or "").strip().lower()
 def _best_guess_field(header: str) -> Optional[str]:
@@ -1093,41 +1124,9 @@ def _best_guess_field(header: str) -> Optional[str]:
         if h == field or h in (_norm(x) for x in syns): return field
     return None
 
-def _read_csv_to_rows(b64: str) -> List[List[str]]:
-    raw = base64.b64decode(b64.encode("utf-8"))
-    try: text = raw.decode("utf-8-sig")
-    except UnicodeDecodeError: text = raw.decode("latin-1", errors="ignore")
-    try:
-        dialect = csv.Sniffer().sniff(text[:2048])
-    except Exception:
-        dialect = csv.excel
-    return [row for row in csv.reader(io.StringIO(text), dialect)]
-
-@dataclass
-class RowResult:
-    ok: bool
-    msg: str
-    data: Dict[str, Any]
-
 @login_required
 @require_http_methods(["GET","POST"])
 def person_import(request: HttpRequest) -> HttpResponse:
-    import datetime  # for DOB parsing
-
-    def _clean_quotes(s: str) -> str:
-        return (s or "").strip().strip('"').strip("'").strip("“").strip("”").strip()
-
-    def parse_date_flex(s: str):
-        s = _clean_quotes(s).replace("—", "-").replace("–", "-")
-        if not s:
-            return None
-        for fmt in ("%Y-%m-%d", "%m/%d/%Y", "%m-%d-%Y", "%m/%d/%y", "%Y/%m/%d", "%d-%b-%Y", "%b %d %Y"):
-            try:
-                return datetime.datetime.strptime(s, fmt).date()
-            except ValueError:
-                pass
-        return None
-
     step = request.POST.get("step")
     if request.method == "GET" or not step:
         return render(request, "people/_subtab_import_upload.html", {})
@@ -1137,41 +1136,47 @@ def person_import(request: HttpRequest) -> HttpResponse:
         if not f:
             messages.error(request, "Please choose a CSV file.")
             return render(request, "people/_subtab_import_upload.html", {})
-        b64 = base64.b64encode(f.read()).decode("utf-8")
-        rows = _read_csv_to_rows(b64)
-        if not rows:
+        tenant = _resolve_tenant(request)
+        if tenant is None:
+            messages.error(request, "No tenant associated with your user; cannot import.")
+            return render(request, "people/_subtab_import_upload.html", {})
+        # stage the file server-side; the mapping form only carries its id
+        upload = stage_upload(tenant, f, user=request.user)
+        headers, preview_rows = read_preview(upload)
+        if not headers:
+            upload.delete()
             messages.error(request, "The file appears to be empty.")
             return render(request, "people/_subtab_import_upload.html", {})
-        headers, data_rows = rows[0], rows[1:]
         guesses = [_best_guess_field(h) for h in headers]
         cols = [
             {"i": i, "header": h, "guess": (guesses[i] or "")}
             for i, h in enumerate(headers)
         ]
         return render(request, "people/_subtab_import_preview.html", {
-            "csv_b64": b64,
+            "upload_id": upload.pk,
             "headers": headers,
             "guesses": guesses,
             "cols": cols,
             "allowed_fields": ALLOWED_FIELDS,
-            "preview_rows": data_rows[:8],
+            "preview_rows": preview_rows,
         })
 
     if step == "import":
         # Resolve tenant (required on Person)
-        tenant = getattr(request.user, "tenant", None)
-        if tenant is None and hasattr(request, "tenant"):
-            tenant = request.tenant
+        tenant = _resolve_tenant(request)
         if tenant is None:
             messages.error(request, "No tenant associated with your user; cannot import.")
             return render(request, "people/_subtab_import_upload.html", {})
 
-        csv_b64 = request.POST.get("csv_b64", "")
-        rows = _read_csv_to_rows(csv_b64)
-        if not rows:
+        try:
+            upload = ImportUpload.objects.get(pk=request.POST.get("upload_id", ""), tenant=tenant)
+        except (ImportUpload.DoesNotExist, ValidationError):
+            messages.error(request, "The uploaded file has expired; please upload it again.")
+            return render(request, "people/_subtab_import_upload.html", {})
+        headers, _ = read_preview(upload, limit=0)
+        if not headers:
             messages.error(request, "Could not read the uploaded file.")
             return render(request, "people/_subtab_import_upload.html", {})
-        headers, data_rows = rows[0], rows[1:]
 
         mapping = {}
         for i in range(len(headers)):
@@ -1179,86 +1184,49 @@ def person_import(request: HttpRequest) -> HttpResponse:
             if field in ALLOWED_FIELDS:
                 mapping[i] = field
 
-        commit = request.POST.get("commit") == "1"
-        dedupe_by_phone = request.POST.get("dedupe_by_phone") == "1"
-
-        results: List[RowResult] = []
-        created = updated = failed = 0
-
-        @transaction.atomic
-        def _perform(commit_flag: bool):
-            nonlocal created, updated, failed
-            for idx, row in enumerate(data_rows, start=2):
-                # Build record dict for this row based on mapping
-                record = {
-                    field: _clean_quotes(row[i]) if i < len(row) and row[i] is not None else ""
-                    for i, field in mapping.items()
-                }
-
-                # Normalize/validate DOB (if present)
-                # DOB cleanup (treat blank as None; parse if non-blank)
-                if "dob" in record:
-                    raw = record["dob"]
-                    if not raw:  # after cleaning, it's empty -> allow null
-                        record["dob"] = None
-                    else:
-                        d = parse_date_flex(raw)
-                        if d is None:
-                            failed += 1
-                            results.append(
-                                RowResult(False, f"Row {idx}: Invalid DOB format (try YYYY-MM-DD or MM/DD/YYYY).",
-                                          record))
-                            continue
-                        record["dob"] = d  # store actual date object
-
-                # Minimal required fields
-                if not record.get("first_name") or not record.get("last_name"):
-                    failed += 1
-                    results.append(RowResult(False, f"Row {idx}: Missing first/last name", record))
-                    continue
-
-                try:
-                    person = None
-                    if dedupe_by_phone and record.get("phone"):
-                        # Match within same tenant
-                        person = Person.objects.filter(tenant=tenant, phone__iexact=record["phone"]).first()
-
-                    if person:
-                        for k, v in record.items():
-                            setattr(person, k, v)
-                        if commit_flag:
-                            person.full_clean()
-                            person.save()
-                        updated += 1
-                        results.append(RowResult(True, f"Row {idx}: updated", record))
-                    else:
-                        # Pass tenant on create
-                        person = Person(tenant=tenant, **record)
-                        if commit_flag:
-                            person.full_clean()
-                            person.save()
-                        created += 1
-                        results.append(RowResult(True, f"Row {idx}: created", record))
-                except Exception as e:
-                    failed += 1
-                    results.append(RowResult(False, f"Row {idx}: {e}", record))
-
-            if not commit_flag:
-                transaction.set_rollback(True)
-
-        _perform(commit)
-
-        return render(request, "people/_subtab_import_results.html", {
-            "headers": headers,
-            "results": results[:200],
-            "created": created,
-            "updated": updated,
-            "failed": failed,
-            "committed": commit,
-        })
+        # small files run right here; larger ones in `manage.py run_import_jobs`,
+        # and this fragment polls for progress
+        job = ImportJob.objects.create(
+            tenant=tenant,
+            user=request.user if request.user.is_authenticated else None,
+            upload=upload,
+            filename=upload.filename,
+            mapping={str(i): field for i, field in mapping.items()},
+            dedupe_by_phone=request.POST.get("dedupe_by_phone") == "1",
+            commit=request.POST.get("commit") == "1",
+        )
+        return _import_job_response(request, run_import_job_inline(job))
 
     return render(request, "people/_subtab_import_upload.html", {})
 
+def _import_job_response(request, job):
+    if job.status != ImportJob.STATUS_DONE:
+        return render(request, "people/_subtab_import_progress.html", {"job": job})
+    results = list(job.rows.order_by("ok", "row_number")[:MAX_RESULTS])  # failures first
+    return render(request, "people/_subtab_import_results.html", {
+        "job": job,
+        "results": results,
+        "created": job.created_count,
+        "updated": job.updated_count,
+        "failed": job.failed_count,
+        "committed": job.commit,
+    })
+
+@login_required
+@require_http_methods(["GET"])
+def person_import_job(request, pk: int):
+    job = get_object_or_404(ImportJob, pk=pk, tenant=_resolve_tenant(request))
+    return _import_job_response(request, job)
+
+@login_required
+@require_POST
+def person_import_job_resume(request, pk: int):
+    job = get_object_or_404(ImportJob, pk=pk, tenant=_resolve_tenant(request))
+    if not resume_import_job(job):
+        messages.error(request, "This import can no longer be resumed; please upload the file again.")
+    job.refresh_from_db()
+    return _import_job_response(request, job)
+
 @login_required
 @require_http_methods(["GET"])
 def person_field_edit(request, pk: int, field: str):
@@ -1266,36 +1234,20 @@ def person_field_edit(request, pk: int, field: str):
         return HttpResponseBadRequest("Field not allowed")
 
     person = _get_person_scoped(request, pk)
-    meta = ALLOWED_INLINE_FIELDS[field]
-    val = getattr(person, field, "")
-    if meta["input"] == "date" and val:
-        try:
-            val = val.strftime("%Y-%m-%d")
-        except Exception:
-            val = ""
-
     return render(request, "people/_person_field_edit.html", {
         "person": person,
         "field": field,
-        "meta": meta,
-        "value": val or "",
+        "meta": ALLOWED_INLINE_FIELDS[field],
+        "value": _inline_field_value(person, field),
         "autofocus": True,   # only on first load
     })
 
 
 def _resolve_tenant(request):
-    tenant = getattr(request.user, "tenant", None)
-    if tenant is None and hasattr(request, "tenant"):
-        tenant = request.tenant
-    return tenant
+    return get_current_tenant(request, required=False)
 
 def _get_person_scoped(request, pk: int):
-    tenant = _resolve_tenant(request)
-    try:
-        # scope by tenant if your model has it
-        return get_object_or_404(Person, pk=pk, tenant=tenant) if tenant else get_object_or_404(Person, pk=pk)
-    except Exception:
-        return get_object_or_404(Person, pk=pk)
+    return get_object_or_404(Person, pk=pk, tenant=get_current_tenant(request))
 
 ALLOWED_INLINE_FIELDS = {
     "first_name": {"label": "First Name", "input": "text"},
@@ -1311,6 +1263,23 @@ ALLOWED_INLINE_FIELDS = {
     "notes":   {"label": "Notes",  "input": "textarea"},
 }
 
+def _inline_field_value(person, field: str) -> str:
+    """String value for an inline field editor (dates as YYYY-MM-DD)."""
+    val = getattr(person, field, "")
+    if ALLOWED_INLINE_FIELDS[field]["input"] == "date" and val:
+        try:
+            val = val.strftime("%Y-%m-%d")
+        except Exception:
+            val = ""
+    return val or ""
+
+def _inline_fields_ctx(person):
+    """Edit-fragment context for every inline field, keyed by field name."""
+    return {
+        field: {"field": field, "meta": meta, "value": _inline_field_value(person, field)}
+        for field, meta in ALLOWED_INLINE_FIELDS.items()
+    }
+
 def _clean_quotes(s: str) -> str:
     return (s or "").strip().strip('"').strip("'").strip("“").strip("”").strip()
 
@@ -1355,16 +1324,10 @@ def person_field_save(request, pk: int, field: str):
         })
 
     # Re-render the EDIT fragment (keep inputs visible; NO autofocus now)
-    meta = ALLOWED_INLINE_FIELDS[field]
-    val = getattr(person, field, "")
-    if meta.get("input") == "date" and val:
-        try:
-            val = val.strftime("%Y-%m-%d")
-        except Exception:
-            val = ""
     field_html = render_to_string(
         "people/_person_field_edit.html",
-        {"person": person, "field": field, "meta": meta, "value": val or "", "autofocus": False},
+        {"person": person, "field": field, "meta": ALLOWED_INLINE_FIELDS[field],
+         "value": _inline_field_value(person, field), "autofocus": False},
         request=request,
     )
 
@@ -1399,22 +1362,11 @@ def person_field_display(request, pk: int, field: str):
         return HttpResponseBadRequest("Field not allowed")
 
     person = _get_person_scoped(request, pk)
-    # Compute a plain string for the template
-    val = getattr(person, field, "")
-    if field == "dob" and val:
-        try:
-            val = val.strftime("%Y-%m-%d")
-        except Exception:
-            val = ""
-
     return render(request, "people/_person_field_display.html", {
         "person": person,
         "field": field,
-        "value": val or "",
+        "value": _inline_field_value(person, field),
     })
-def _tenant(request):
-    return getattr(request.user, "tenant", getattr(request, "tenant", None))
-
 def _parse_date(s):
     if not s:
         return None
@@ -1423,6 +1375,43 @@ def _parse_date(s):
     except Exception:
         return None
 
+# --- CSV export (streamed) ---
+EXPORT_CHUNK_SIZE = 2000
+
+class _Echo:
+    """csv.writer target that hands each formatted line straight back."""
+    def write(self, value):
+        return value
+
+def _csv_stream(filename, headers, rows, totals=None):
+    """
+    StreamingHttpResponse for a report export. `rows` should be a lazy
+    iterable (values_list(...).iterator()) so memory stays flat.
+    """
+    writer = csv.writer(_Echo())
+
+    def _lines():
+        yield writer.writerow(headers)
+        for r in rows:
+            yield writer.writerow(r)
+        if totals:
+            yield writer.writerow(totals)
+
+    resp = StreamingHttpResponse(_lines(), content_type="text/csv")
+    resp["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return resp
+
+def _display_name(first, last, pk):
+    # same as Person.__str__ without loading the model
+    return (f"{first or ''} {last or ''}").strip() or f"Person {pk}"
+
+@login_required
+@require_http_methods(["GET"])
+def dashboard_partial(request):
+    """KPI tiles for home.html, loaded after first paint; cached per tenant (core.dashboard)."""
+    tenant = get_current_tenant(request)
+    return render(request, "people/_dashboard.html", {"k": dashboard_kpis(tenant)})
+
 @login_required
 @require_http_methods(["GET"])
 def reports_panel(request):
@@ -1433,9 +1422,10 @@ def reports_panel(request):
 @require_http_methods(["GET"])
 def report_bonds_by_date(request):
     """
-    Works with Bond.date (DateField) and sums using Coalesce(bond_amount, amount).
+    Bonds per day. Grouped output reads BondDailyRollup; ?detailed=1 lists the
+    Bond rows, using Coalesce(bond_amount, amount) as the amount.
     """
-    tenant = _tenant(request)
+    tenant = _resolve_tenant(request)
     start = _parse_date(request.GET.get("start")) or (date.today() - timedelta(days=30))
     end   = _parse_date(request.GET.get("end"))   or date.today()
     detailed = (request.GET.get("detailed") == "1")
@@ -1450,24 +1440,25 @@ def report_bonds_by_date(request):
     if tenant:
         qs = qs.filter(tenant=tenant)
     qs = qs.filter(date__gte=start, date__lte=end).select_related("person")
+    daily = BondDailyRollup.objects.filter(date__gte=start, date__lte=end)
+    if tenant:
+        daily = daily.filter(tenant=tenant)
 
     if as_csv:
-        resp = HttpResponse(content_type="text/csv")
-        resp["Content-Disposition"] = f'attachment; filename="bonds_{start}_{end}.csv"'
-        w = csv.writer(resp)
+        filename = f"bonds_{start}_{end}.csv"
         if detailed:
-            w.writerow(["Date", "Defendant", "County", "Amount"])
-            for b in qs.order_by("date"):
-                amt = b.bond_amount if b.bond_amount is not None else (b.amount or 0)
-                w.writerow([b.date, b.person.full_name or str(b.person), b.county or "", amt])
-        else:
-            agg = (qs.values("date")
-                     .annotate(count=Count("id"), total=Sum(amount_expr))
-                     .order_by("date"))
-            w.writerow(["Date", "Bonds", "Total Amount"])
-            for r in agg:
-                w.writerow([r["date"], r["count"], r["total"]])
-        return resp
+            rows = ((d, _display_name(first, last, pid), county or "", amt)
+                    for d, first, last, pid, county, amt in
+                    qs.annotate(amt=amount_expr)
+                      .order_by("date", "id")
+                      .values_list("date", "person__first_name", "person__last_name", "person_id", "county", "amt")
+                      .iterator(chunk_size=EXPORT_CHUNK_SIZE))
+            return _csv_stream(filename, ["Date", "Defendant", "County", "Amount"], rows)
+        agg = (daily.values("date")
+                    .annotate(n=Sum("count"), amt=Sum("total"))
+                    .order_by("date")
+                    .values_list("date", "n", "amt"))
+        return _csv_stream(filename, ["Date", "Bonds", "Total Amount"], agg.iterator(chunk_size=EXPORT_CHUNK_SIZE))
 
     if detailed:
         headers = ["Date", "Defendant", "County", "Amount"]
@@ -1477,13 +1468,13 @@ def report_bonds_by_date(request):
             rows.append([b.date, b.person.full_name or str(b.person), b.county or "-", amt])
         return render(request, "people/_report_table.html", {"headers": headers, "rows": rows})
 
-    # grouped
-    agg = (qs.values("date")
-             .annotate(count=Count("id"), total=Sum(amount_expr))
-             .order_by("date"))
+    # grouped, from the daily rollup
+    agg = list(daily.values("date")
+                    .annotate(n=Sum("count"), amt=Sum("total"))
+                    .order_by("date"))
     headers = ["Date", "Bonds", "Total Amount"]
-    rows = [[r["date"], r["count"], r["total"]] for r in agg]
-    totals = ["Total", sum(r["count"] for r in agg), sum(r["total"] for r in agg)]
+    rows = [[r["date"], r["n"], r["amt"]] for r in agg]
+    totals = ["Total", sum(r["n"] for r in agg), sum(r["amt"] for r in agg)]
     return render(request, "people/_report_table.html", {"headers": headers, "rows": rows, "totals": totals})
 
 
@@ -1491,19 +1482,15 @@ def report_bonds_by_date(request):
 @require_http_methods(["GET"])
 def report_bonds_by_county(request):
     """
-    Groups by Bond.county; sums Coalesce(bond_amount, amount). Optional date range.
+    Bonds per county from BondDailyRollup (totals use Coalesce(bond_amount, amount)).
+    Optional date range.
     """
-    tenant = _tenant(request)
+    tenant = _resolve_tenant(request)
     start = _parse_date(request.GET.get("start"))
     end   = _parse_date(request.GET.get("end"))
     as_csv = (request.GET.get("format") == "csv")
 
-    amount_expr = Coalesce(
-        F("bond_amount"), F("amount"),
-        Value(0, output_field=DecimalField(max_digits=12, decimal_places=2))
-    )
-
-    qs = Bond.objects.all()
+    qs = BondDailyRollup.objects.all()
     if tenant:
         qs = qs.filter(tenant=tenant)
     if start:
@@ -1512,21 +1499,20 @@ def report_bonds_by_county(request):
         qs = qs.filter(date__lte=end)
 
     agg = qs.values("county").annotate(
-        count=Count("id"),
-        total=Sum(amount_expr),
-    ).order_by("-count", "county")
+        n=Sum("count"),
+        amt=Sum("total"),
+    ).order_by("-n", "county")
 
     headers = ["County", "Bonds", "Total Amount"]
-    rows = [[r["county"] or "-", r["count"], r["total"]] for r in agg]
-    totals = ["All", sum(r["count"] for r in agg), sum(r["total"] for r in agg)]
+    grand = qs.aggregate(n=Sum("count"), amt=Sum("total"))
+    totals = ["All", grand["n"] or 0, grand["amt"] or 0]
 
     if as_csv:
-        resp = HttpResponse(content_type="text/csv")
-        resp["Content-Disposition"] = 'attachment; filename="bonds_by_county.csv"'
-        w = csv.writer(resp); w.writerow(headers)
-        for r in rows: w.writerow(r)
-        w.writerow(totals)
-        return resp
+        rows = ([county or "-", n, amt] for county, n, amt in
+                agg.values_list("county", "n", "amt").iterator(chunk_size=EXPORT_CHUNK_SIZE))
+        return _csv_stream("bonds_by_county.csv", headers, rows, totals)
+
+    rows = [[r["county"] or "-", r["n"], r["amt"]] for r in agg]
 
     return render(request, "people/_report_table.html", {"headers": headers, "rows": rows, "totals": totals})
 
@@ -1536,59 +1522,38 @@ def report_bonds_by_county(request):
 def report_people_with_balance(request):
     """
     People with (sum invoices.amount) - (sum receipts.amount) > 0.
-    Uses subqueries to avoid double counting joins.
+    Reads the denormalized PersonBalance table (indexed on tenant, balance).
     """
-    tenant = _tenant(request)
+    tenant = _resolve_tenant(request)
     only_overdue = (request.GET.get("only_overdue") == "1")
     as_csv = (request.GET.get("format") == "csv")
 
-    inv_sum_q = (Invoice.objects
-                 .filter(person=OuterRef("pk"), tenant=tenant if tenant else OuterRef("person__tenant"))
-                 .values("person")
-                 .annotate(total=Coalesce(Sum("amount"), Value(0, output_field=DecimalField(max_digits=12, decimal_places=2))))
-                 .values("total")[:1])
-
-    rec_sum_q = (Receipt.objects
-                 .filter(invoice__person=OuterRef("pk"), tenant=tenant if tenant else OuterRef("invoice__person__tenant"))
-                 .values("invoice__person")
-                 .annotate(total=Coalesce(Sum("amount"), Value(0, output_field=DecimalField(max_digits=12, decimal_places=2))))
-                 .values("total")[:1])
-
-    people = Person.objects.all()
+    balances = PersonBalance.objects.filter(balance__gt=0)
     if tenant:
-        people = people.filter(tenant=tenant)
-
-    people = (people
-              .annotate(invoiced=Coalesce(Subquery(inv_sum_q, output_field=DecimalField(max_digits=12, decimal_places=2)),
-                                          Value(0, output_field=DecimalField(max_digits=12, decimal_places=2))))
-              .annotate(paid=Coalesce(Subquery(rec_sum_q, output_field=DecimalField(max_digits=12, decimal_places=2)),
-                                      Value(0, output_field=DecimalField(max_digits=12, decimal_places=2))))
-              .annotate(balance=ExpressionWrapper(F("invoiced") - F("paid"),
-                                                 output_field=DecimalField(max_digits=12, decimal_places=2)))
-              .filter(balance__gt=0))
+        balances = balances.filter(tenant=tenant)
 
     if only_overdue:
-        # Overdue = has any invoice due_date <= today (and still balance > 0)
-        people = people.filter(invoices__due_date__lte=date.today()).distinct()
+        # Overdue = oldest unpaid invoice is due today or earlier
+        balances = balances.filter(oldest_due_date__lte=date.today())
 
     headers = ["Person", "Phone", "Balance"]
-    rows = [[p.full_name or str(p), p.phone or "-", p.balance] for p in people.order_by("-balance")]
+    balances = balances.order_by("-balance")
+    values = balances.values_list("person__first_name", "person__last_name", "person_id", "person__phone", "balance")
 
     if as_csv:
-        resp = HttpResponse(content_type="text/csv")
-        resp["Content-Disposition"] = 'attachment; filename="people_with_balance.csv"'
-        w = csv.writer(resp); w.writerow(headers)
-        for r in rows: w.writerow(r)
-        return resp
+        rows = ([_display_name(first, last, pid), phone or "-", bal]
+                for first, last, pid, phone, bal in values.iterator(chunk_size=EXPORT_CHUNK_SIZE))
+        return _csv_stream("people_with_balance.csv", headers, rows)
 
-    totals = ["", "Total", sum(r[2] for r in rows)]
+    rows = [[_display_name(first, last, pid), phone or "-", bal] for first, last, pid, phone, bal in values]
+    totals = ["", "Total", balances.aggregate(s=Sum("balance"))["s"] or 0]
     return render(request, "people/_report_table.html", {"headers": headers, "rows": rows, "totals": totals})
 
 
 @login_required
 @require_http_methods(["GET"])
 def report_upcoming_court_dates(request):
-    tenant = _tenant(request)
+    tenant = _resolve_tenant(request)
     days = int(request.GET.get("days") or 14)
     start = date.today()
     end = start + timedelta(days=days)
@@ -1599,14 +1564,13 @@ def report_upcoming_court_dates(request):
     qs = qs.filter(date__gte=start, date__lte=end).select_related("person").order_by("date", "time", "id")
 
     if as_csv:
-        resp = HttpResponse(content_type="text/csv")
-        resp["Content-Disposition"] = f'attachment; filename="upcoming_court_dates_{start}_{end}.csv"'
-        w = csv.writer(resp)
-        w.writerow(["Date", "Time", "Person", "County", "Court", "Case #", "Notes"])
-        for cd in qs:
-            w.writerow([cd.date, cd.time or "", cd.person.full_name or str(cd.person),
-                        cd.county or "", cd.court or "", cd.case_number or "", cd.notes or ""])
-        return resp
+        rows = ([d, t or "", _display_name(first, last, pid), county or "", court or "", case or "", notes or ""]
+                for d, t, first, last, pid, county, court, case, notes in
+                qs.values_list("date", "time", "person__first_name", "person__last_name", "person_id",
+                               "county", "court", "case_number", "notes")
+                  .iterator(chunk_size=EXPORT_CHUNK_SIZE))
+        return _csv_stream(f"upcoming_court_dates_{start}_{end}.csv",
+                           ["Date", "Time", "Person", "County", "Court", "Case #", "Notes"], rows)
 
     headers = ["Date", "Time", "Person", "County", "Court", "Case #", "Notes"]
     rows = [[cd.date, cd.time or "-", cd.person.full_name or str(cd.person),
@@ -1618,67 +1582,59 @@ def report_upcoming_court_dates(request):
 @login_required
 @require_http_methods(["GET"])
 def report_people_without_recent_checkin(request):
-    tenant = _tenant(request)
-    days = int(request.GET.get("days") or 14)
+    tenant = _resolve_tenant(request)
+    days = int(request.GET.get("days") or (tenant.checkin_interval_days if tenant else 0) or 14)
     cutoff_dt = timezone.now() - timedelta(days=days)
     as_csv = (request.GET.get("format") == "csv")
 
     people = Person.objects.all()
     if tenant: people = people.filter(tenant=tenant)
-    people = (people
-              .annotate(last_checkin=Max("checkins__created_at"))
-              .filter(Q(last_checkin__lt=cutoff_dt) | Q(last_checkin__isnull=True))
-              .order_by("last_name", "first_name"))
+    # Person.last_checkin_at is maintained on write; no per-request MAX over check-ins
+    people = missed_checkins(people, cutoff_dt).order_by("last_name", "first_name")
 
     if as_csv:
-        resp = HttpResponse(content_type="text/csv")
-        resp["Content-Disposition"] = f'attachment; filename="no_recent_checkin_{days}d.csv"'
-        w = csv.writer(resp)
-        w.writerow(["Person", "Phone", "Last Check-in"])
-        for p in people:
-            w.writerow([p.full_name or f"Person {p.pk}", p.phone or "", p.last_checkin or ""])
-        return resp
+        rows = ([_display_name(first, last, pid), phone or "", last_ci or ""]
+                for first, last, pid, phone, last_ci in
+                people.values_list("first_name", "last_name", "pk", "phone", "last_checkin_at")
+                      .iterator(chunk_size=EXPORT_CHUNK_SIZE))
+        return _csv_stream(f"no_recent_checkin_{days}d.csv", ["Person", "Phone", "Last Check-in"], rows)
 
     headers = ["Person", "Phone", "Last Check-in"]
-    rows = [[p.full_name or f"Person {p.pk}", p.phone or "-", p.last_checkin or "-"] for p in people]
+    rows = [[p.full_name or f"Person {p.pk}", p.phone or "-", p.last_checkin_at or "-"] for p in people]
     return render(request, "people/_report_table.html", {"headers": headers, "rows": rows})
 
 
 @login_required
 @require_http_methods(["GET"])
 def report_overdue_invoices(request):
-    tenant = _tenant(request)
+    tenant = _resolve_tenant(request)
     overdue_days = int(request.GET.get("days") or 30)
     cutoff = date.today() - timedelta(days=overdue_days)
     as_csv = (request.GET.get("format") == "csv")
 
     inv = Invoice.objects.all()
     if tenant: inv = inv.filter(tenant=tenant)
-    inv = (inv.filter(due_date__isnull=False, due_date__lte=cutoff)
-              .annotate(paid=Coalesce(Sum("receipts__amount"),
-                                      Value(0, output_field=DecimalField(max_digits=12, decimal_places=2))))
-              .annotate(balance=Coalesce(F("amount"), Value(0, output_field=DecimalField(max_digits=12, decimal_places=2))) - F("paid"))
+    inv = (with_ledger(inv.filter(due_date__isnull=False, due_date__lte=cutoff))
               .filter(balance__gt=0)
-              .select_related("person")
               .order_by("-balance", "-due_date", "-id"))
 
-    if as_csv:
-        resp = HttpResponse(content_type="text/csv")
-        resp["Content-Disposition"] = f'attachment; filename="overdue_invoices_{overdue_days}d.csv"'
-        w = csv.writer(resp)
-        w.writerow(["Invoice #", "Person", "Due Date", "Amount", "Paid", "Balance"])
-        for i in inv:
-            w.writerow([i.number or i.pk, i.person.full_name or str(i.person),
-                        i.due_date, i.amount or 0, i.paid or 0, i.balance or 0])
-        return resp
-
     headers = ["Invoice #", "Person", "Due Date", "Amount", "Paid", "Balance"]
-    rows = [[i.number or i.pk, i.person.full_name or str(i.person),
-             i.due_date, i.amount or 0, i.paid or 0, i.balance or 0] for i in inv]
-    totals = ["", "", "Totals",
-              sum((i.amount or 0) for i in inv),
-              sum((i.paid or 0) for i in inv),
-              sum((i.balance or 0) for i in inv)]
+    values = inv.values_list("number", "pk", "person__first_name", "person__last_name", "person_id",
+                             "due_date", "amount", "paid", "balance")
+
+    def _row(number, pk, first, last, pid, due, amount, paid, balance):
+        return [number or pk, _display_name(first, last, pid), due, amount or 0, paid or 0, balance or 0]
+
+    if as_csv:
+        return _csv_stream(f"overdue_invoices_{overdue_days}d.csv", headers,
+                           (_row(*v) for v in values.iterator(chunk_size=EXPORT_CHUNK_SIZE)))
+
+    rows = [_row(*v) for v in values]
+    # totals in the database (aggregating over the subquery annotations directly isn't portable)
+    overdue_ids = inv.values("pk")
+    total_amt = Invoice.objects.filter(pk__in=overdue_ids).aggregate(s=Sum("amount"))["s"] or 0
+    total_paid = Receipt.objects.filter(invoice__in=overdue_ids).aggregate(s=Sum("amount"))["s"] or 0
+    totals = ["", "", "Totals", total_amt, total_paid, total_amt - total_paid]
     return render(request, "people/_report_table.html", {"headers": headers, "rows": rows, "totals": totals})
 
 @login_required
@@ -1702,7 +1658,7 @@ def push_subscribe(request):
         PushSubscription.objects.update_or_create(
             endpoint=endpoint,
             defaults={
-                "tenant": getattr(request.user, "tenant_profile", None) or request.user.tenant,  # whichever you use
+                "tenant": get_current_tenant(request),
                 "user": request.user,
                 "p256dh": keys["p256dh"],
                 "auth": keys["auth"],
@@ -1722,31 +1678,15 @@ def push_unsubscribe(request):
         PushSubscription.objects.filter(endpoint=endpoint).delete()
     return JsonResponse({"ok": True})
 
-def _send_push_to_tenant(tenant, payload: dict):
-    subs = PushSubscription.objects.filter(tenant=tenant)
-    for s in subs:
-        try:
-            webpush(
-                subscription_info={
-                    "endpoint": s.endpoint,
-                    "keys": {"p256dh": s.p256dh, "auth": s.auth}
-                },
-                data=json.dumps(payload),
-                vapid_private_key=settings.VAPID_PRIVATE_KEY,
-                vapid_claims={"sub": settings.VAPID_CLAIM_EMAIL},
-            )
-        except WebPushException:
-            # remove dead endpoints
-            s.delete()
-
 @login_required
 @require_http_methods(["POST"])
 def push_test(request):
-    tenant = getattr(request.user, "tenant_profile", None) or request.user.tenant
-    _send_push_to_tenant(tenant, {"title": "Test", "body": "Hello from BailSaaS", "url": "/"})
-    return JsonResponse({"ok": True})
+    tenant = get_current_tenant(request)
+    msg = enqueue_push(tenant, {"title": "Test", "body": "Hello from BailSaaS", "url": "/"},
+                       ttl=300, urgency="high")
+    return JsonResponse({"ok": True, "queued": msg.pk})
 
-SIGNER = TimestampSigner(salt="self-checkin")
+SIGNER = SELF_CHECKIN_SIGNER
 
 def _make_self_link(request, person):
     # 7 days expiry token
@@ -1819,15 +1759,12 @@ def self_checkin(request, token: str):
     if doc: ci.document = doc
     ci.save()
 
-    # (optional) push a notification to tenant devices
-    try:
-        _send_push_to_tenant(person.tenant, {
-            "title": "New check-in",
-            "body": f"{person.full_name} via {method.replace('_',' ')}",
-            "url": f"/tab/main/{person.pk}/"
-        })
-    except Exception:
-        pass
+    # notify tenant devices; delivered by `manage.py run_outbox`, not in this request
+    enqueue_push(person.tenant, {
+        "title": "New check-in",
+        "body": f"{person.full_name} via {method.replace('_',' ')}",
+        "url": f"/tab/main/{person.pk}/"
+    }, urgency="high")
 
     return render(request, "people/self_checkin_success.html", {"person": person, "ok": True})
 
@@ -1865,25 +1802,6 @@ def push_subscribe_defendant(request, token: str):
     except Exception as e:
         return HttpResponseBadRequest(str(e))
 
-# views_people.py or a utils module
-def send_push_to_person(person, payload: dict):
-    from .models import PushSubscription
-    subs = list(PushSubscription.objects.filter(person=person))
-    sent = 0; errors = []
-    for s in subs:
-        try:
-            webpush(
-                subscription_info={"endpoint": s.endpoint, "keys": {"p256dh": s.p256dh, "auth": s.auth}},
-                data=json.dumps(payload),
-                vapid_private_key=settings.VAPID_PRIVATE_KEY,
-                vapid_claims={"sub": settings.VAPID_CLAIM_EMAIL},
-            )
-            sent += 1
-        except WebPushException as e:
-            errors.append(str(e))
-            s.delete()  # clean dead endpoints
-    return {"sent": sent, "failed": len(errors), "errors": errors}
-
 def _abs_url(path, request=None):
     # If you're currently on an ngrok host, use it dynamically
     if request:
@@ -1908,12 +1826,12 @@ def _make_self_link(request, person):
 @require_http_methods(["POST"])
 def push_test_person(request, person_pk: int):
     person = get_object_or_404(Person, pk=person_pk)
-    res = send_push_to_person(person, {
+    msg = enqueue_push(person.tenant, {
         "title": request.POST.get("title") or "Test notification",
         "body":  request.POST.get("body")  or f"Hello {person.full_name or 'there'}!",
         "url":   request.POST.get("url")   or f"/tab/main/{person.pk}/",
-    })
-    return JsonResponse(res)
+    }, person=person, ttl=300, urgency="high")
+    return JsonResponse({"ok": True, "queued": msg.pk})
 
 
 from django.views.decorators.http import require_GET